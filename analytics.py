@@ -0,0 +1,184 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for loan history reports in the Book Management System (BMS). Answers most-borrowed, active-loan and per-day questions from summary tables that triggers on Loans keep up to date, instead of aggregating the whole loan history on every request.
+"""
+
+import argparse
+
+from book_management import isbn_lookup
+from connection_pool import get_pool
+from isbn import canonical_isbn
+from migrations import ensure_schema, rebuild_loan_stats
+
+
+class LoanAnalytics:
+    """
+    Read-only reports over the loan summary tables.
+
+    Every borrow, return and deleted loan updates BookLoanStats, UserLoanStats and
+    DailyLoanStats in the same transaction, so the reports are always consistent with Loans
+    and each one reads only the rows it returns.
+    """
+
+    def __init__(self, db_name="book_management.db"):
+        """
+        Initializes the LoanAnalytics object.
+
+        Args:
+            db_name (str): The name of the SQLite database file.
+        """
+        self.db_name = db_name
+        self.pool = get_pool(db_name)
+        ensure_schema(db_name)
+
+    def connect_db(self):
+        """
+        Returns the calling thread's pooled connection to the SQLite database.
+
+        Returns:
+            sqlite3.Connection: A long-lived connection object to the SQLite database.
+        """
+        return self.pool.connection()
+
+    def most_borrowed_books(self, limit=10):
+        """
+        Lists the books borrowed most often, counting loans that have been returned.
+
+        Args:
+            limit (int): The number of books to return.
+
+        Returns:
+            list: (isbn, title, author, borrows) tuples, most borrowed first.
+        """
+        return self.connect_db().execute(
+            """
+            SELECT Books.isbn, Books.title, Books.author, BookLoanStats.borrows
+            FROM BookLoanStats JOIN Books ON Books.id = BookLoanStats.book_id
+            WHERE BookLoanStats.borrows > 0
+            ORDER BY BookLoanStats.borrows DESC, BookLoanStats.book_id DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+
+    def top_borrowers(self, limit=10):
+        """
+        Lists the users with the most books currently on loan.
+
+        Args:
+            limit (int): The number of users to return.
+
+        Returns:
+            list: (username, active, borrows) tuples, most active loans first.
+        """
+        return self.connect_db().execute(
+            """
+            SELECT Users.username, UserLoanStats.active, UserLoanStats.borrows
+            FROM UserLoanStats JOIN Users ON Users.id = UserLoanStats.user_id
+            WHERE UserLoanStats.active > 0
+            ORDER BY UserLoanStats.active DESC, UserLoanStats.user_id DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+
+    def user_loans(self, user_name):
+        """
+        Returns one user's loan counts.
+
+        Args:
+            user_name (str): The name of the user.
+
+        Returns:
+            tuple: The (active, borrows) counts of the user, (0, 0) for a user who never
+                borrowed, or None if the user does not exist.
+        """
+        return self.connect_db().execute(
+            """
+            SELECT COALESCE(UserLoanStats.active, 0), COALESCE(UserLoanStats.borrows, 0)
+            FROM Users LEFT JOIN UserLoanStats ON UserLoanStats.user_id = Users.id
+            WHERE Users.username = ?
+            """,
+            (user_name,),
+        ).fetchone()
+
+    def book_loans(self, book_isbn):
+        """
+        Returns one book's loan counts.
+
+        Args:
+            book_isbn (str): The ISBN of the book, in ISBN-10 or ISBN-13 form, with or without hyphens.
+
+        Returns:
+            tuple: The (active, borrows) counts of the book, (0, 0) for a book never
+                borrowed, or None if the book does not exist.
+        """
+        column, value = isbn_lookup(canonical_isbn(book_isbn))
+        return self.connect_db().execute(
+            f"""
+            SELECT COALESCE(BookLoanStats.active, 0), COALESCE(BookLoanStats.borrows, 0)
+            FROM Books LEFT JOIN BookLoanStats ON BookLoanStats.book_id = Books.id
+            WHERE Books.{column} = ?
+            """,
+            (value,),
+        ).fetchone()
+
+    def loans_per_day(self, since=None, until=None):
+        """
+        Lists the number of borrows and returns per UTC day.
+
+        Args:
+            since (str): The first day to include, as YYYY-MM-DD, or None for the earliest day.
+            until (str): The last day to include, as YYYY-MM-DD, or None for the latest day.
+
+        Returns:
+            list: (day, borrows, returns) tuples in day order, only for days with activity.
+        """
+        query = "SELECT day, borrows, returns FROM DailyLoanStats WHERE 1=1"
+        params = []
+        if since is not None:
+            query += " AND day >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND day <= ?"
+            params.append(until)
+        return self.connect_db().execute(query + " ORDER BY day", params).fetchall()
+
+    def rebuild(self):
+        """
+        Recomputes the summary tables from the Loans table, for example after editing Loans by hand with triggers disabled.
+        """
+        conn = self.connect_db()
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rebuild_loan_stats(conn.cursor())
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report on the BMS loan history.")
+    parser.add_argument("--db", default="book_management.db", help="The SQLite database file.")
+    parser.add_argument("--top", type=int, default=10, help="The number of books and users to list.")
+    parser.add_argument("--since", help="The first day of the per-day report, as YYYY-MM-DD.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the summary tables first.")
+    args = parser.parse_args()
+
+    analytics = LoanAnalytics(args.db)
+    if args.rebuild:
+        analytics.rebuild()
+    print("Most borrowed books:")
+    for isbn, title, author, borrows in analytics.most_borrowed_books(args.top):
+        print(f"  {borrows:>6}  {title} by {author} ({isbn})")
+    print("Most books on loan:")
+    for username, active, borrows in analytics.top_borrowers(args.top):
+        print(f"  {active:>6}  {username} ({borrows} borrowed in total)")
+    print("Loans per day:")
+    for day, borrows, returns in analytics.loans_per_day(since=args.since):
+        print(f"  {day}  {borrows:>6} borrowed  {returns:>6} returned")
@@ -5,91 +5,261 @@ Python3 Version: Python 3.9.6
 Description: Module for user authentication in the Book Management System (BMS). Includes login, logout, and role-checking functionalities.
 """
 
-import sqlite3
+from connection_pool import get_pool
+from existence_filter import get_existence_filter
+from instrumentation import instrumented, metrics
+from migrations import ensure_schema
+from security import (
+    DEFAULT_HASH_ITERATIONS,
+    DEFAULT_MAX_SESSIONS,
+    DEFAULT_SESSION_TTL,
+    DEFAULT_VERIFY_CACHE_SIZE,
+    PasswordVerifier,
+    SessionStore,
+)
 
 class Authentication:
     """
     Handles user authentication, including login, logout, and role-based access control for the Book Management System.
+
+    Passwords are stored as salted hashes. A successful login opens a session in an in-memory SessionStore and returns
+    a signed token, so role checks on later requests need no database round-trip and many users can be logged in at once.
     """
 
-    def __init__(self, db_name="book_management.db"):
+    def __init__(
+        self,
+        db_name="book_management.db",
+        verbose=True,
+        hash_iterations=DEFAULT_HASH_ITERATIONS,
+        session_ttl=DEFAULT_SESSION_TTL,
+        max_sessions=DEFAULT_MAX_SESSIONS,
+        verify_cache_size=DEFAULT_VERIFY_CACHE_SIZE,
+        existence_filter=None,
+    ):
         """
         Initializes the Authentication object.
 
         Args:
             db_name (str): The name of the SQLite database file.
+            verbose (bool): Whether login and logout print their outcome for interactive use.
+            hash_iterations (int): The PBKDF2 iteration count for stored passwords.
+            session_ttl (float): The number of seconds a session token stays valid.
+            max_sessions (int): The maximum number of live sessions kept in memory.
+            verify_cache_size (int): The number of recent successful password checks remembered, or 0 to always hash.
+            existence_filter (float): The false-positive rate of an in-memory filter of the usernames,
+                which rejects unknown users without a query, or None to look every username up.
+                Users added by other processes are rejected until `user_filter.refresh()` is called.
         """
         self.db_name = db_name
-        self.current_user = None
+        self.verbose = verbose
+        self.token = None
+        self.pool = get_pool(db_name)
+        ensure_schema(db_name)
+        self.verifier = PasswordVerifier(iterations=hash_iterations, cache_size=verify_cache_size)
+        self.sessions = SessionStore(ttl=session_ttl, max_sessions=max_sessions)
+        self.user_filter = None
+        if existence_filter is not None:
+            self.user_filter = get_existence_filter(db_name, "Users", "username", existence_filter)
+        metrics.watch_caches(self)
 
     def connect_db(self):
         """
-        Connects to the SQLite database.
+        Returns the calling thread's pooled connection to the SQLite database.
 
         Returns:
-            sqlite3.Connection: A connection object to the SQLite database.
+            sqlite3.Connection: A long-lived connection object to the SQLite database.
         """
-        return sqlite3.connect(self.db_name)
+        return self.pool.connection()
 
-    def login(self, user_name, user_password):
+    def report(self, message):
         """
-        Logs in a user by validating their credentials.
+        Prints an outcome when running interactively.
+
+        Args:
+            message (str): The message to print.
+        """
+        if self.verbose:
+            print(message)
+
+    def cache_stats(self):
+        """
+        Returns the counters of the password verification cache and the session store, and of the username filter if there is one.
+
+        Returns:
+            dict: The counters of each cache keyed by cache name.
+        """
+        stats = {"verify": self.verifier.cache.stats(), "sessions": self.sessions.stats()}
+        if self.user_filter is not None:
+            stats["user_filter"] = self.user_filter.stats()
+        return stats
+
+    @instrumented("authentication.check_credentials")
+    def check_credentials(self, user_name, user_password):
+        """
+        Validates a username and password without changing the logged-in user.
+
+        Legacy plaintext passwords and hashes with an outdated cost are rehashed after a successful check.
 
         Args:
             user_name (str): The username of the user.
             user_password (str): The password of the user.
 
         Returns:
-            bool: True if login is successful, False otherwise.
+            tuple: The (username, user_type) of the user, or None if the credentials are invalid.
         """
+        if self.user_filter is not None and not self.user_filter.might_contain(user_name):
+            return None
         conn = self.connect_db()
-        cursor = conn.cursor()
+        row = conn.execute(
+            "SELECT username, user_type, password FROM Users WHERE username = ?", (user_name,)
+        ).fetchone()
+        if row is None and self.user_filter is not None:
+            self.user_filter.record_false_positive()
+        if row is None or not self.verifier.verify(user_password, row[2]):
+            return None
+        if self.verifier.needs_rehash(row[2]):
+            self.update_password(user_name, user_password)
+        return row[0], row[1]
 
-        cursor.execute(
-            """
-            SELECT username, user_type FROM Users WHERE username = ? AND password = ?
-            """,
-            (user_name, user_password),
-        )
+    def update_password(self, user_name, user_password):
+        """
+        Stores a new password hash for a user.
 
-        user = cursor.fetchone()
-        conn.close()
+        Args:
+            user_name (str): The username of the user.
+            user_password (str): The new password.
+        """
+        conn = self.connect_db()
+        if conn.in_transaction:
+            conn.commit()
+        with conn:
+            conn.execute(
+                "UPDATE Users SET password = ? WHERE username = ?",
+                (self.verifier.hash(user_password), user_name),
+            )
 
-        if user:
-            self.current_user = user
-            print(f"Login successful! Welcome, {user_name} ({user[1]}).")
+    def authenticate(self, user_name, user_password):
+        """
+        Validates credentials and opens a session.
+
+        Args:
+            user_name (str): The username of the user.
+            user_password (str): The password of the user.
+
+        Returns:
+            str: A signed session token, or None if the credentials are invalid.
+        """
+        user = self.check_credentials(user_name, user_password)
+        if user is None:
+            return None
+        return self.sessions.create(*user)
+
+    def validate_token(self, token):
+        """
+        Resolves a session token to its user from memory.
+
+        Args:
+            token (str): A token returned by authenticate.
+
+        Returns:
+            tuple: The (username, user_type) of the session's user, or None if the token is invalid or expired.
+        """
+        session = self.sessions.get(token)
+        return session.user() if session else None
+
+    def revoke_token(self, token):
+        """
+        Ends a session.
+
+        Args:
+            token (str): A token returned by authenticate.
+
+        Returns:
+            bool: True if a live session was ended.
+        """
+        return self.sessions.revoke(token)
+
+    @property
+    def current_user(self):
+        """
+        The user of the interactive session opened by login.
+
+        Returns:
+            tuple: The (username, user_type) of the logged-in user, or None.
+        """
+        return self.validate_token(self.token)
+
+    @instrumented("authentication.login")
+    def login(self, user_name, user_password):
+        """
+        Logs in a user by validating their credentials.
+
+        Args:
+            user_name (str): The username of the user.
+            user_password (str): The password of the user.
+
+        Returns:
+            bool: True if login is successful, False otherwise.
+        """
+        token = self.authenticate(user_name, user_password)
+
+        if token:
+            self.token = token
+            self.report(f"Login successful! Welcome, {user_name} ({self.current_user[1]}).")
             return True
 
-        print("Invalid username or password.")
+        self.report("Invalid username or password.")
         return False
 
     def logout(self):
         """
         Logs out the current user.
         """
-        if self.current_user:
-            print(f"Goodbye, {self.current_user[0]}!")
-            self.current_user = None
+        user = self.current_user
+        if user:
+            self.report(f"Goodbye, {user[0]}!")
+            self.revoke_token(self.token)
         else:
-            print("No user is currently logged in.")
+            self.report("No user is currently logged in.")
+        self.token = None
+
+    def has_role(self, role, token=None):
+        """
+        Checks the role behind a session token without querying the database.
 
-    def is_admin(self):
+        Args:
+            role (str): The user type to check for.
+            token (str): A session token, or None for the interactive session opened by login.
+
+        Returns:
+            bool: True if the session is live and its user has the role.
+        """
+        user = self.validate_token(token or self.token)
+        return bool(user) and user[1] == role
+
+    def is_admin(self, token=None):
         """
         Checks if the current user has admin privileges.
 
+        Args:
+            token (str): A session token, or None for the interactive session opened by login.
+
         Returns:
             bool: True if the current user is an admin, False otherwise.
         """
-        return self.current_user and self.current_user[1] == "admin"
+        return self.has_role("admin", token)
 
-    def is_user(self):
+    def is_user(self, token=None):
         """
         Checks if the current user is a regular user.
 
+        Args:
+            token (str): A session token, or None for the interactive session opened by login.
+
         Returns:
             bool: True if the current user is a regular user, False otherwise.
         """
-        return self.current_user and self.current_user[1] == "user"
+        return self.has_role("user", token)
 
 if __name__ == "__main__":
     # Entry point for running the authentication module as a standalone script.
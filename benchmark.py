@@ -0,0 +1,1115 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for benchmarking the Book Management System (BMS). Builds a synthetic catalog of configurable size, times setup, login, every BookManagement operation, concurrent mixed workloads and the HTTP service, and writes p50/p99 latency and throughput as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from analytics import LoanAnalytics
+from authentication import Authentication
+from bulk_loader import BulkLoader
+from book_management import ACCEPTED, BOOK_COLUMNS, BORROWED, LOGGED, SHARED, SPLIT, BookManagement
+from catalog_file import CatalogFile, write_catalog_file
+from catalog_snapshot import CatalogSnapshot
+from connection_pool import ConnectionPool, get_pool
+from database import DatabaseSetup
+from existence_filter import DEFAULT_ERROR_RATE
+from instrumentation import metrics
+from migrations import migrate
+from parallel_loader import DEFAULT_WORKERS, ParallelLoader
+from security import DEFAULT_HASH_ITERATIONS
+from service import BookService
+from sharding import ShardedBookManagement, setup_shards
+from synthetic_data import generate_files, isbn13, iter_books, write_csv
+
+
+def percentile(sorted_values, fraction):
+    """
+    Picks a percentile from an already sorted list using the nearest-rank method.
+
+    Args:
+        sorted_values (list): The values in ascending order.
+        fraction (float): The percentile as a fraction, for example 0.99.
+
+    Returns:
+        float: The value at that percentile, or 0.0 for an empty list.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(durations, elapsed):
+    """
+    Summarizes the latencies of a scenario.
+
+    Args:
+        durations (list): The duration of each operation in seconds.
+        elapsed (float): The wall-clock time of the whole scenario in seconds.
+
+    Returns:
+        dict: The operation count, throughput and p50/p99/max latency in milliseconds.
+    """
+    durations = sorted(durations)
+    return {
+        "count": len(durations),
+        "ops_per_sec": len(durations) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(durations, 0.50) * 1000,
+        "p99_ms": percentile(durations, 0.99) * 1000,
+        "max_ms": (durations[-1] if durations else 0.0) * 1000,
+    }
+
+
+def measure(operation, iterations):
+    """
+    Runs an operation repeatedly and records the latency of each call.
+
+    Args:
+        operation (callable): Called with the iteration number.
+        iterations (int): The number of times to run the operation.
+
+    Returns:
+        dict: The summary produced by summarize.
+    """
+    durations = []
+    clock = time.perf_counter
+    start = clock()
+    for i in range(iterations):
+        began = clock()
+        operation(i)
+        durations.append(clock() - began)
+    return summarize(durations, clock() - start)
+
+
+def bench_setup(db_name, books_file, users_file, book_count, hash_iterations):
+    """
+    Times DatabaseSetup.setup_database on a fresh database.
+
+    Args:
+        db_name (str): The name of the SQLite database file to create.
+        books_file (str): The Books.txt style file to load.
+        users_file (str): The Users.txt style file to load.
+        book_count (int): The number of books in the file.
+        hash_iterations (int): The PBKDF2 iteration count for imported passwords.
+
+    Returns:
+        dict: The elapsed time and the number of books loaded per second.
+    """
+    start = time.perf_counter()
+    DatabaseSetup(
+        db_name, users_file=users_file, books_file=books_file, hash_iterations=hash_iterations
+    ).setup_database()
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "ops_per_sec": book_count / elapsed if elapsed else 0.0}
+
+
+# Timed in a fresh interpreter by bench_cold_start: imports, construction (which checks the
+# schema version) and the first query, in milliseconds.
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from book_management import BookManagement
+imported = time.perf_counter()
+book_manager = BookManagement(sys.argv[1], verbose=False)
+ready = time.perf_counter()
+book_manager.get_book(sys.argv[2])
+done = time.perf_counter()
+print(json.dumps([(imported - start) * 1000, (ready - imported) * 1000, (done - ready) * 1000]))
+"""
+
+
+def bench_cold_start(db_name, isbn, runs=5):
+    """
+    Measures how long a new process takes to answer its first query on an existing database.
+
+    Args:
+        db_name (str): The name of the SQLite database file, already migrated.
+        isbn (str): The ISBN looked up as the first query.
+        runs (int): The number of processes started; the median of each phase is reported.
+
+    Returns:
+        dict: The median import, startup and first query times, in milliseconds.
+    """
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT, os.path.abspath(db_name), isbn],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        samples.append(json.loads(output))
+    phases = [sorted(values) for values in zip(*samples)]
+    import_ms, startup_ms, first_query_ms = (values[len(values) // 2] for values in phases)
+    return {
+        "runs": runs,
+        "import_ms": import_ms,
+        "startup_ms": startup_ms,
+        "first_query_ms": first_query_ms,
+        "ready_ms": import_ms + startup_ms + first_query_ms,
+    }
+
+
+# Run in a fresh interpreter by bench_catalog_file: starts a search worker on the catalog file,
+# the in-memory snapshot or SQLite, answers one author search, and reports the timings in
+# milliseconds and the private memory of the process in kilobytes.
+WORKER_START_SCRIPT = """
+import json, sys, time
+mode, db_name, catalog_path, author = sys.argv[1:5]
+start = time.perf_counter()
+if mode == "catalog_file":
+    from catalog_file import CatalogFile
+    imported = time.perf_counter()
+    worker = CatalogFile(catalog_path)
+    search = lambda: worker.search(author=author)
+elif mode == "snapshot":
+    from catalog_snapshot import CatalogSnapshot
+    imported = time.perf_counter()
+    worker = CatalogSnapshot(db_name)
+    worker.load()
+    search = lambda: worker.search(author=author)
+else:
+    from book_management import BookManagement
+    imported = time.perf_counter()
+    worker = BookManagement(db_name, verbose=False)
+    search = lambda: worker.search_books(author=author)
+ready = time.perf_counter()
+found = len(search())
+done = time.perf_counter()
+private_kb = None
+try:
+    with open("/proc/self/smaps_rollup") as rollup:
+        private_kb = sum(int(line.split()[1]) for line in rollup if line.startswith("Private_"))
+except OSError:
+    pass
+print(json.dumps([(imported - start) * 1000, (ready - imported) * 1000, (done - ready) * 1000, private_kb, found]))
+"""
+
+
+def bench_connections(db_name, iterations, isbn, username):
+    """
+    Compares per-operation connections with pooled connections for ISBN lookups and credential lookups.
+
+    Args:
+        db_name (str): The name of the SQLite database file to benchmark against.
+        iterations (int): The number of operations to run per scenario.
+        isbn (str): An ISBN that exists in the catalog.
+        username (str): A username that exists in the database.
+
+    Returns:
+        dict: A summary per scenario.
+    """
+    isbn_query = "SELECT * FROM Books WHERE isbn = ?"
+    login_query = "SELECT username, user_type, password FROM Users WHERE username = ?"
+
+    def fresh(query, params):
+        def operation(_):
+            conn = sqlite3.connect(db_name)
+            conn.execute(query, params).fetchone()
+            conn.close()
+        return operation
+
+    pool = ConnectionPool(db_name)
+
+    def pooled(query, params):
+        def operation(_):
+            pool.connection().execute(query, params).fetchone()
+        return operation
+
+    results = {
+        "isbn_lookup_fresh_connection": measure(fresh(isbn_query, (isbn,)), iterations),
+        "isbn_lookup_pooled_connection": measure(pooled(isbn_query, (isbn,)), iterations),
+        "login_query_fresh_connection": measure(fresh(login_query, (username,)), iterations),
+        "login_query_pooled_connection": measure(pooled(login_query, (username,)), iterations),
+    }
+    pool.close_all()
+    return results
+
+
+def bench_operations(db_name, iterations, book_count, user_count, seed, hash_iterations):
+    """
+    Times Authentication.login and each BookManagement operation against the synthetic catalog.
+
+    Caching is disabled so that every call reaches SQLite or hashes the password, except in the *_cached scenarios.
+
+    Args:
+        db_name (str): The name of the SQLite database file to benchmark against.
+        iterations (int): The number of operations to run per scenario.
+        book_count (int): The number of books in the catalog.
+        user_count (int): The number of users in the database.
+        seed (int): The random seed used to pick books and users.
+        hash_iterations (int): The PBKDF2 iteration count the users were imported with.
+
+    Returns:
+        dict: A summary per operation.
+    """
+    rng = random.Random(seed)
+    auth = Authentication(db_name, verbose=False, hash_iterations=hash_iterations, verify_cache_size=0)
+    cached_auth = Authentication(db_name, verbose=False, hash_iterations=hash_iterations)
+    book_manager = BookManagement(db_name, cache_size=0, verbose=False)
+    cached_manager = BookManagement(db_name, verbose=False)
+
+    users = [f"user{rng.randrange(user_count)}" for _ in range(iterations)]
+    isbns = [isbn13(rng.randrange(book_count)) for _ in range(iterations)]
+    hot_isbns = isbns[:max(1, iterations // 100)]
+    books = [book_manager.get_book(isbn) for isbn in isbns]
+    new_isbns = [isbn13(book_count + i) for i in range(iterations)]
+    hot_logins = [(user, "pass" + user[4:]) for user in users[:max(1, iterations // 100)]]
+    tokens = [cached_auth.authenticate(*login) for login in hot_logins]
+
+    return {
+        "login": measure(lambda i: auth.login(users[i], "pass" + users[i][4:]), iterations),
+        "login_failed": measure(lambda i: auth.login(users[i], "wrong"), iterations),
+        "login_cached": measure(
+            lambda i: cached_auth.authenticate(*hot_logins[i % len(hot_logins)]), iterations
+        ),
+        "validate_token": measure(lambda i: cached_auth.validate_token(tokens[i % len(tokens)]), iterations),
+        "get_book": measure(lambda i: book_manager.get_book(isbns[i]), iterations),
+        "get_book_cached": measure(
+            lambda i: cached_manager.get_book(hot_isbns[i % len(hot_isbns)]), iterations
+        ),
+        "search_isbn": measure(lambda i: book_manager.search_books(isbn=isbns[i]), iterations),
+        "search_author": measure(lambda i: book_manager.search_books(author=books[i][2]), iterations),
+        "search_year_page": measure(
+            lambda i: book_manager.search_books(year=books[i][3], limit=50), iterations
+        ),
+        "search_keywords_top20": measure(
+            lambda i: book_manager.search_books(match=books[i][1].split()[0], limit=20), iterations
+        ),
+        "add_book": measure(
+            lambda i: book_manager.add_book(f"New Title {i}", "New Author", 2024, new_isbns[i]), iterations
+        ),
+        "delete_book": measure(lambda i: book_manager.delete_book(new_isbns[i]), iterations),
+        "borrow_book": measure(lambda i: book_manager.borrow_book(users[i], isbns[i]), iterations),
+        "list_borrowed_books_user": measure(
+            lambda i: book_manager.list_borrowed_books(users[i]), iterations
+        ),
+        "return_book": measure(lambda i: book_manager.return_book(users[i], isbns[i]), iterations),
+    }
+
+
+def bench_mixed(db_name, threads, operations_per_thread, book_count, user_count, seed, concurrency=SHARED):
+    """
+    Runs a read-heavy mixed workload from several threads at once.
+
+    Each thread looks up or searches books (70%), borrows (10%), returns (10%) and adds or
+    deletes books (10%). LOGGED writes return once they are durable, so the time until the last
+    of them has been applied is reported separately.
+
+    Args:
+        db_name (str): The name of the SQLite database file to benchmark against.
+        threads (int): The number of concurrent threads.
+        operations_per_thread (int): The number of operations each thread runs.
+        book_count (int): The number of books in the catalog.
+        user_count (int): The number of users in the database.
+        seed (int): The random seed used to pick operations.
+        concurrency (str): The BookManagement concurrency mode, SHARED, SPLIT or LOGGED.
+
+    Returns:
+        dict: The summary of every operation across all threads, plus a per-kind breakdown.
+    """
+    book_manager = BookManagement(db_name, verbose=False, concurrency=concurrency)
+    latencies = {}
+    lock = threading.Lock()
+
+    def worker(number):
+        rng = random.Random(seed + number)
+        local = {}
+        loans = []
+        added = []
+        clock = time.perf_counter
+        for i in range(operations_per_thread):
+            roll = rng.random()
+            isbn = isbn13(rng.randrange(book_count))
+            username = f"user{rng.randrange(user_count)}"
+            began = clock()
+            if roll < 0.35:
+                kind = "get_book"
+                book_manager.get_book(isbn)
+            elif roll < 0.70:
+                kind = "search"
+                book_manager.search_books(year=rng.randint(1900, 2024), limit=20)
+            elif roll < 0.80:
+                kind = "borrow"
+                if book_manager.borrow_book(username, isbn) in (BORROWED, ACCEPTED):
+                    loans.append((username, isbn))
+            elif roll < 0.90 and loans:
+                kind = "return"
+                book_manager.return_book(*loans.pop())
+            elif roll < 0.95 or not added:
+                kind = "add"
+                added.append(f"mixed-{concurrency}-{number}-{i}")
+                book_manager.add_book("Mixed", "Mixed Author", 2024, added[-1])
+            else:
+                kind = "delete"
+                book_manager.delete_book(added.pop())
+            local.setdefault(kind, []).append(clock() - began)
+        with lock:
+            for kind, values in local.items():
+                latencies.setdefault(kind, []).extend(values)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    book_manager.wait_for_writes()
+    applied = time.perf_counter() - start
+
+    everything = [value for values in latencies.values() for value in values]
+    result = summarize(everything, elapsed)
+    result["threads"] = threads
+    if concurrency == LOGGED:
+        result["applied_seconds"] = applied
+    if book_manager.write_queue is not None:
+        result["group_commits"] = book_manager.write_queue.stats()
+    result["by_kind"] = {kind: summarize(values, elapsed) for kind, values in sorted(latencies.items())}
+    return result
+
+
+def bench_analytics(db_name, iterations, history, seed):
+    """
+    Compares the loan reports read from the summary tables with the same reports aggregated from Loans.
+
+    A loan history spread over the past year is inserted first, so the summary triggers'
+    write cost is measured too.
+
+    Args:
+        db_name (str): The name of the SQLite database file to benchmark against.
+        iterations (int): The number of times each report is run.
+        history (int): The number of returned loans to add to the history.
+        seed (int): The random seed used to generate the history.
+
+    Returns:
+        dict: The history insert rate and the latency of each report both ways.
+    """
+    conn = BookManagement(db_name, verbose=False).connect_db()
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM Users")]
+    book_ids = [row[0] for row in conn.execute("SELECT id FROM Books")]
+    rng = random.Random(seed)
+    loans = []
+    for _ in range(history):
+        day = rng.randrange(365)
+        loans.append((
+            rng.choice(user_ids),
+            rng.choice(book_ids),
+            f"-{day} days",
+            f"-{max(day - rng.randrange(30), 0)} days",
+        ))
+    if conn.in_transaction:
+        conn.commit()
+    start = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    conn.executemany(
+        "INSERT INTO Loans (user_id, book_id, borrowed_at, returned_at) "
+        "VALUES (?, ?, datetime('now', ?), datetime('now', ?))",
+        loans,
+    )
+    conn.commit()
+    elapsed = time.perf_counter() - start
+
+    analytics = LoanAnalytics(db_name)
+    results = {"loan_history_insert": {"count": history, "seconds": elapsed, "ops_per_sec": history / elapsed}}
+    reports = (
+        (
+            "most_borrowed",
+            lambda i: analytics.most_borrowed_books(10),
+            "SELECT book_id, COUNT(*) AS borrows FROM Loans GROUP BY book_id ORDER BY borrows DESC LIMIT 10",
+        ),
+        (
+            "top_borrowers",
+            lambda i: analytics.top_borrowers(10),
+            "SELECT user_id, COUNT(*) AS active FROM Loans WHERE returned_at IS NULL "
+            "GROUP BY user_id ORDER BY active DESC LIMIT 10",
+        ),
+        (
+            "loans_per_day",
+            lambda i: analytics.loans_per_day(),
+            "SELECT date(borrowed_at), COUNT(*) FROM Loans GROUP BY date(borrowed_at)",
+        ),
+    )
+    for name, summarized, aggregate in reports:
+        results[f"analytics_{name}"] = measure(summarized, iterations)
+        results[f"aggregate_{name}"] = measure(lambda i: conn.execute(aggregate).fetchall(), max(iterations // 100, 5))
+    return results
+
+
+def bench_batches(db_name, sizes):
+    """
+    Times the batch add and delete APIs.
+
+    Args:
+        db_name (str): The name of the SQLite database file to benchmark against.
+        sizes (list): The numbers of books to add and delete per batch run.
+
+    Returns:
+        dict: The elapsed time and items per second for each batch run.
+    """
+    book_manager = BookManagement(db_name, verbose=False)
+    results = {}
+    for size in sizes:
+        batch = [
+            (f"Title {i}", f"Author {i % 1000}", 1900 + i % 120, f"batch{size}-{i:09d}")
+            for i in range(size)
+        ]
+        for name, run in (
+            (f"add_books_{size}", lambda: book_manager.add_books(batch)),
+            (f"delete_books_{size}", lambda: book_manager.delete_books(book[3] for book in batch)),
+        ):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            results[name] = {"count": size, "seconds": elapsed, "ops_per_sec": size / elapsed}
+    return results
+
+
+def bench_snapshot(db_name, iterations, seed):
+    """
+    Compares filtering the in-memory catalog snapshot with the equivalent SQL queries.
+
+    Memory is measured with tracemalloc for the snapshot and for the same rows held as a list of tuples.
+
+    Args:
+        db_name (str): The name of the SQLite database file to benchmark against.
+        iterations (int): The number of filters run per scenario.
+        seed (int): The random seed used to pick filter values.
+
+    Returns:
+        dict: The load time, memory per book, and the latency of each filter against SQL.
+    """
+    conn = BookManagement(db_name, verbose=False).connect_db()
+    tracemalloc.start()
+    rows = conn.execute(f"SELECT {BOOK_COLUMNS} FROM Books").fetchall()
+    tuple_bytes = tracemalloc.get_traced_memory()[0]
+    del rows
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    snapshot = CatalogSnapshot(db_name)
+    book_count = snapshot.load()
+    load_seconds = time.perf_counter() - start
+    snapshot_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rng = random.Random(seed)
+    authors = snapshot.authors
+    prefixes = [snapshot.title(position)[:3] for position in rng.sample(range(book_count), min(book_count, 100))]
+    results = {
+        "snapshot_load": {
+            "books": book_count,
+            "seconds": load_seconds,
+            "bytes_per_book": snapshot_bytes / max(book_count, 1),
+            "tuple_bytes_per_book": tuple_bytes / max(book_count, 1),
+        }
+    }
+    if not authors or not prefixes:
+        return results
+    scenarios = (
+        (
+            "year_range",
+            lambda year: snapshot.count(year_min=year, year_max=year + 4),
+            lambda year: conn.execute(
+                "SELECT COUNT(*) FROM Books WHERE year BETWEEN ? AND ?", (year, year + 4)
+            ).fetchone(),
+        ),
+        (
+            "author",
+            lambda year: snapshot.search(author=authors[year % len(authors)]),
+            lambda year: conn.execute(
+                f"SELECT {BOOK_COLUMNS} FROM Books WHERE author = ? ORDER BY id", (authors[year % len(authors)],)
+            ).fetchall(),
+        ),
+        (
+            "title_prefix",
+            lambda year: snapshot.search(title_prefix=prefixes[year % len(prefixes)], limit=20),
+            lambda year: conn.execute(
+                f"SELECT {BOOK_COLUMNS} FROM Books WHERE title LIKE ? ORDER BY id LIMIT 20",
+                (prefixes[year % len(prefixes)] + "%",),
+            ).fetchall(),
+        ),
+    )
+    for name, in_memory, in_sql in scenarios:
+        years = [rng.randint(1900, 2024) for _ in range(iterations)]
+        results[f"snapshot_{name}"] = measure(lambda i: in_memory(years[i]), iterations)
+        results[f"sql_{name}"] = measure(lambda i: in_sql(years[i]), iterations)
+    return results
+
+
+def bench_catalog_file(db_name, catalog_path, iterations, seed, runs=5):
+    """
+    Compares search workers started on the memory-mapped catalog file with workers that load
+    the in-memory snapshot or query SQLite, and times lookups on the mapped file.
+
+    Args:
+        db_name (str): The name of the SQLite database file to export.
+        catalog_path (str): Where to write the catalog file.
+        iterations (int): The number of lookups run per in-process scenario.
+        seed (int): The random seed used to pick ISBNs and authors.
+        runs (int): The number of worker processes started per kind; medians are reported.
+
+    Returns:
+        dict: The export time and size, each kind of worker's startup, and lookup latencies.
+    """
+    start = time.perf_counter()
+    exported = write_catalog_file(db_name, catalog_path)
+    results = {
+        "catalog_file_export": {
+            "seconds": time.perf_counter() - start,
+            "books": exported,
+            "bytes": os.path.getsize(catalog_path),
+        }
+    }
+    if not exported:
+        return results
+
+    rng = random.Random(seed)
+    with CatalogFile(catalog_path) as catalog:
+        books = [catalog.row(rng.randrange(exported)) for _ in range(iterations)]
+        author = books[0][2]
+        for mode in ("catalog_file", "snapshot", "sqlite"):
+            samples = []
+            for _ in range(runs):
+                output = subprocess.run(
+                    [sys.executable, "-c", WORKER_START_SCRIPT, mode, os.path.abspath(db_name),
+                     os.path.abspath(catalog_path), author],
+                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+                samples.append(json.loads(output))
+            import_ms, startup_ms, first_query_ms, private_kb, _ = (
+                sorted(values, key=lambda value: value or 0)[len(values) // 2] for values in zip(*samples)
+            )
+            results[f"worker_start_{mode}"] = {
+                "runs": runs,
+                "import_ms": import_ms,
+                "startup_ms": startup_ms,
+                "first_query_ms": first_query_ms,
+                "ready_ms": import_ms + startup_ms + first_query_ms,
+                "private_kb": private_kb,
+            }
+
+        results["catalog_file_get_book"] = measure(lambda i: catalog.get_book(books[i][4]), iterations)
+        results["catalog_file_author"] = measure(lambda i: catalog.search(author=books[i][2]), iterations)
+        results["catalog_file_year_range"] = measure(
+            lambda i: catalog.count(year_min=books[i][3] or 1900, year_max=(books[i][3] or 1900) + 4), iterations
+        )
+    return results
+
+
+def bench_existence(db_name, iterations, user_count, hash_iterations):
+    """
+    Compares lookups of ISBNs and usernames that do not exist with and without the existence filters.
+
+    Args:
+        db_name (str): The name of the SQLite database file to benchmark against.
+        iterations (int): The number of lookups run per scenario.
+        user_count (int): The number of users in the database.
+        hash_iterations (int): The PBKDF2 iteration count the users were imported with.
+
+    Returns:
+        dict: The filter build time, memory and observed false-positive rate, and the latency of
+            each kind of miss with and without the filter.
+    """
+    plain_manager = BookManagement(db_name, cache_size=0, verbose=False)
+    filtered_manager = BookManagement(db_name, cache_size=0, verbose=False, existence_filter=DEFAULT_ERROR_RATE)
+    plain_auth = Authentication(db_name, verbose=False, hash_iterations=hash_iterations)
+    filtered_auth = Authentication(
+        db_name, verbose=False, hash_iterations=hash_iterations, existence_filter=DEFAULT_ERROR_RATE
+    )
+    # Numbers far above any synthetic catalog size give valid ISBNs the library does not carry
+    absent = [isbn13(10 ** 8 + i) for i in range(iterations)]
+    strangers = [f"stranger{i}" for i in range(iterations)]
+
+    results = {}
+    for label, book_manager, auth in (
+        ("", plain_manager, plain_auth),
+        ("_filtered", filtered_manager, filtered_auth),
+    ):
+        results[f"get_book_missing{label}"] = measure(lambda i: book_manager.get_book(absent[i]), iterations)
+        results[f"delete_book_missing{label}"] = measure(lambda i: book_manager.delete_book(absent[i]), iterations)
+        results[f"borrow_book_missing{label}"] = measure(
+            lambda i: book_manager.borrow_book(f"user{i % user_count}", absent[i]), iterations
+        )
+        results[f"login_unknown_user{label}"] = measure(lambda i: auth.login(strangers[i], "secret"), iterations)
+
+    for name, stats in (
+        ("existence_filter_isbns", filtered_manager.isbn_filter.stats()),
+        ("existence_filter_users", filtered_auth.user_filter.stats()),
+    ):
+        results[name] = {
+            "seconds": stats["build_seconds"],
+            "keys": stats["keys"],
+            "memory_bytes": stats["memory_bytes"],
+            "bits_per_key": stats["bits"] / max(stats["keys"], 1),
+            "observed_error_rate": stats["false_positives"] / max(stats["checks"], 1),
+        }
+    return results
+
+
+def bench_shards(work_dir, books_file, users_file, shard_counts, threads, operations_per_thread, args):
+    """
+    Compares catalogs split across different numbers of shard files.
+
+    For each shard count the books are distributed by ISBN hash, then several threads run a
+    mix of ISBN lookups (40%), fan-out searches (40%) and borrows (20%).
+
+    Args:
+        work_dir (str): The directory for the shard files.
+        books_file (str): The Books.txt style file to split.
+        users_file (str): The Users.txt style file to replicate.
+        shard_counts (list): The numbers of shards to compare, for example [1, 4].
+        threads (int): The number of concurrent threads.
+        operations_per_thread (int): The number of operations each thread runs.
+        args (argparse.Namespace): The parsed command-line arguments.
+
+    Returns:
+        dict: The setup time and workload summary for each shard count.
+    """
+    results = {}
+    for count in shard_counts:
+        shard_files = [os.path.join(work_dir, f"shard{count}-{index}.db") for index in range(count)]
+        start = time.perf_counter()
+        setup_shards(shard_files, users_file, books_file, hash_iterations=args.hash_iterations)
+        results[f"shards_{count}_setup"] = {"seconds": time.perf_counter() - start}
+
+        catalog = ShardedBookManagement(shard_files, cache_size=0, verbose=False)
+        latencies = []
+        lock = threading.Lock()
+
+        def worker(number):
+            rng = random.Random(args.seed + number)
+            local = []
+            clock = time.perf_counter
+            for _ in range(operations_per_thread):
+                roll = rng.random()
+                isbn = isbn13(rng.randrange(args.books))
+                began = clock()
+                if roll < 0.4:
+                    catalog.get_book(isbn)
+                elif roll < 0.8:
+                    catalog.search_books(year=rng.randint(1900, 2024), limit=20)
+                else:
+                    catalog.borrow_book(f"user{rng.randrange(args.users)}", isbn)
+                local.append(clock() - began)
+            with lock:
+                latencies.extend(local)
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        results[f"shards_{count}_mixed"] = summarize(latencies, time.perf_counter() - start)
+        catalog.close()
+    return results
+
+
+def bench_parallel_load(work_dir, books_file, book_count, worker_counts):
+    """
+    Compares loading a books feed into an empty database with BulkLoader and with ParallelLoader.
+
+    Args:
+        work_dir (str): The directory for the databases and run files.
+        books_file (str): The Books.txt style feed to load.
+        book_count (int): The number of books in the feed.
+        worker_counts (list): The numbers of parsing processes to try with ParallelLoader.
+
+    Returns:
+        dict: The elapsed time, books per second and, for ParallelLoader, the parse and write times.
+    """
+    results = {}
+    for workers in [0] + worker_counts:
+        db_name = os.path.join(work_dir, f"load{workers}.db")
+        conn = get_pool(db_name).connection()
+        migrate(conn)
+        conn.commit()
+        if workers:
+            loader = ParallelLoader(conn, workers=workers, work_dir=work_dir)
+            name = f"parallel_load_{workers}"
+        else:
+            loader = BulkLoader(conn)
+            name = "bulk_load"
+        start = time.perf_counter()
+        loader.load(books_file=books_file)
+        elapsed = time.perf_counter() - start
+        results[name] = {"count": book_count, "seconds": elapsed, "ops_per_sec": book_count / elapsed}
+        if workers:
+            results[name].update(loader.timings)
+        get_pool(db_name).close_all()
+        os.remove(db_name)
+    return results
+
+
+async def http_request(reader, writer, method, path, body=None, token=None):
+    """
+    Sends one request over a keep-alive HTTP connection and reads the JSON response.
+
+    Args:
+        reader (asyncio.StreamReader): The connection's reader.
+        writer (asyncio.StreamWriter): The connection's writer.
+        method (str): The HTTP method.
+        path (str): The request path and query string.
+        body (dict): The JSON request body, if any.
+        token (str): The session token to send, if any.
+
+    Returns:
+        tuple: The HTTP status code and the decoded JSON response.
+    """
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n"
+    if token:
+        head += f"Authorization: Bearer {token}\r\n"
+    writer.write(head.encode("latin-1") + b"\r\n" + data)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def bench_service(db_name, clients, requests_per_client, workers, username, password, isbn):
+    """
+    Load tests the HTTP service with concurrent keep-alive clients searching by ISBN.
+
+    Args:
+        db_name (str): The name of the SQLite database file to serve.
+        clients (int): The number of concurrent client connections.
+        requests_per_client (int): The number of searches each client sends.
+        workers (int): The number of database worker threads in the service.
+        username (str): The user the clients log in as.
+        password (str): The password of that user.
+        isbn (str): The ISBN the clients search for.
+
+    Returns:
+        dict: The summary of every request, plus the number of failed requests.
+    """
+    service = BookService(db_name, workers=workers)
+    server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    durations = []
+    failures = 0
+
+    async def client():
+        nonlocal failures
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        _, session = await http_request(
+            reader, writer, "POST", "/login", {"username": username, "password": password}
+        )
+        for _ in range(requests_per_client):
+            began = time.perf_counter()
+            status, _ = await http_request(
+                reader, writer, "GET", f"/books?isbn={isbn}", token=session["token"]
+            )
+            durations.append(time.perf_counter() - began)
+            failures += status != 200
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    server.close()
+    await server.wait_closed()
+    service.close()
+    result = summarize(durations, elapsed)
+    result.update({"clients": clients, "failures": failures})
+    return result
+
+
+def run_suite(args, work_dir):
+    """
+    Runs every benchmark scenario selected on the command line.
+
+    Args:
+        args (argparse.Namespace): The parsed command-line arguments.
+        work_dir (str): A directory for the generated files and database.
+
+    Returns:
+        dict: The run metadata and the results of each scenario.
+    """
+    books_file = os.path.join(work_dir, "Books.txt")
+    users_file = os.path.join(work_dir, "Users.txt")
+    db_name = os.path.join(work_dir, "bench.db")
+
+    start = time.perf_counter()
+    generate_files(books_file, users_file, args.books, args.users, seed=args.seed)
+    results = {"generate_files": {"seconds": time.perf_counter() - start}}
+
+    results["setup_database"] = bench_setup(db_name, books_file, users_file, args.books, args.hash_iterations)
+    results["cold_start"] = bench_cold_start(db_name, isbn13(0))
+    results.update(bench_connections(db_name, args.iterations, isbn13(0), "user0"))
+    results.update(
+        bench_operations(db_name, args.iterations, args.books, args.users, args.seed, args.hash_iterations)
+    )
+    results["mixed_workload"] = bench_mixed(
+        db_name, args.threads, args.iterations, args.books, args.users, args.seed
+    )
+    results["mixed_workload_split"] = bench_mixed(
+        db_name, args.threads, args.iterations, args.books, args.users, args.seed + 1, concurrency=SPLIT
+    )
+    results["mixed_workload_logged"] = bench_mixed(
+        db_name, args.threads, args.iterations, args.books, args.users, args.seed + 2, concurrency=LOGGED
+    )
+    results.update(bench_analytics(db_name, args.iterations, args.loan_history, args.seed))
+    if args.batch_sizes:
+        results.update(bench_batches(db_name, args.batch_sizes))
+    results.update(bench_snapshot(db_name, args.iterations, args.seed))
+    results.update(bench_catalog_file(db_name, os.path.join(work_dir, "bench.catalog"), args.iterations, args.seed))
+    results.update(bench_existence(db_name, args.iterations, args.users, args.hash_iterations))
+    if args.shards > 1:
+        results.update(bench_shards(
+            work_dir, books_file, users_file, [1, args.shards], args.threads, args.iterations, args
+        ))
+    if args.load_workers:
+        load_file, load_count = books_file, args.books
+        if args.load_books:
+            load_file, load_count = os.path.join(work_dir, "LoadBooks.txt"), args.load_books
+            start = time.perf_counter()
+            write_csv(load_file, iter_books(load_count, seed=args.seed))
+            results["generate_load_feed"] = {"seconds": time.perf_counter() - start}
+        results.update(bench_parallel_load(work_dir, load_file, load_count, args.load_workers))
+    if args.clients:
+        results["service_search"] = asyncio.run(bench_service(
+            db_name,
+            args.clients,
+            max(1, args.iterations // args.clients),
+            args.workers,
+            "user0",
+            "pass0",
+            isbn13(0),
+        ))
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "books": args.books,
+            "users": args.users,
+            "iterations": args.iterations,
+            "threads": args.threads,
+            "shards": args.shards,
+            "load_workers": args.load_workers,
+            "load_books": args.load_books,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+# A plan step that reads every row of the Books table instead of an index range
+FULL_SCAN = re.compile(r"^SCAN Books\b(?! USING)")
+
+
+def search_shapes(book):
+    """
+    Lists one search_books call for each query shape the API supports.
+
+    Args:
+        book (tuple): An (id, title, author, year, isbn) tuple of a book in the catalog.
+
+    Returns:
+        dict: The search_books arguments of each shape, keyed by shape name.
+    """
+    _, title, author, year, isbn = book
+    return {
+        "isbn": {"isbn": isbn},
+        "isbn_list": {"isbn": [isbn, isbn13(1)]},
+        "title": {"title": title},
+        "author": {"author": author},
+        "author_list": {"author": [author, "Nobody"], "limit": 20},
+        "year": {"year": year, "limit": 20},
+        "year_range": {"year_min": 1990, "year_max": 1995, "limit": 20},
+        "year_range_by_year": {"year_min": 1990, "year_max": 1995, "order_by": "-year", "limit": 20},
+        "author_since": {"author": author, "year_min": 1950},
+        "by_title": {"order_by": "title", "limit": 20},
+        "by_author": {"order_by": "-author", "limit": 20},
+        "count_author": {"author": author, "count_only": True},
+        "count_year_range": {"year_min": 1990, "year_max": 1995, "count_only": True},
+        "keywords_since": {"match": title.split()[0], "year_min": 2000, "limit": 20},
+        "page": {"after_id": book[0], "limit": 20},
+    }
+
+
+def check_query_plans(db_name):
+    """
+    Checks with EXPLAIN QUERY PLAN that no search shape falls back to a full scan of Books.
+
+    Args:
+        db_name (str): The name of the SQLite database file to check against.
+
+    Returns:
+        dict: Each shape's plan and whether it passed, keyed by shape name.
+    """
+    book_manager = BookManagement(db_name, verbose=False)
+    book = book_manager.search_books(limit=1)[0]
+    plans = {}
+    for name, arguments in search_shapes(book).items():
+        plan = book_manager.explain_search(**arguments)
+        plans[name] = {"plan": plan, "ok": not any(FULL_SCAN.match(step) for step in plan)}
+    return plans
+
+
+def run_plan_checks(args, work_dir):
+    """
+    Builds a synthetic catalog and checks the plan of every search shape against it.
+
+    Args:
+        args (argparse.Namespace): The parsed command-line arguments.
+        work_dir (str): A directory for the generated files and database.
+
+    Returns:
+        dict: The result of check_query_plans.
+    """
+    books_file = os.path.join(work_dir, "Books.txt")
+    users_file = os.path.join(work_dir, "Users.txt")
+    db_name = os.path.join(work_dir, "bench.db")
+    generate_files(books_file, users_file, args.books, args.users, seed=args.seed)
+    bench_setup(db_name, books_file, users_file, args.books, args.hash_iterations)
+    return check_query_plans(db_name)
+
+
+def print_results(report):
+    """
+    Prints a human-readable table of the benchmark results.
+
+    Args:
+        report (dict): The report produced by run_suite.
+    """
+    meta = report["meta"]
+    print(f"\n{meta['books']:,} books, {meta['users']:,} users, SQLite {meta['sqlite']}")
+    print(f"{'scenario':<34} {'ops/sec':>12} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, result in report["results"].items():
+        if "p50_ms" in result:
+            print(f"{name:<34} {result['ops_per_sec']:>12,.0f} {result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f}")
+        elif "ready_ms" in result:
+            memory = f", {result['private_kb']:,} KB private" if result.get("private_kb") else ""
+            print(f"{name:<34} {'ready in':>12} {result['ready_ms']:>8.1f}ms{memory}")
+        elif "ops_per_sec" in result:
+            print(f"{name:<34} {result['ops_per_sec']:>12,.0f}")
+        else:
+            print(f"{name:<34} {result['seconds']:>11.2f}s")
+
+
+def main():
+    """
+    Parses command-line arguments, runs the benchmark suite and writes the JSON report.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Book Management System.")
+    parser.add_argument("--books", type=int, default=10000, help="Synthetic catalog size (1k to 10M).")
+    parser.add_argument("--users", type=int, default=1000, help="Synthetic user base size.")
+    parser.add_argument("--iterations", type=int, default=2000, help="Operations per scenario.")
+    parser.add_argument("--threads", type=int, default=8, help="Threads in the mixed workload.")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent HTTP clients (0 to skip).")
+    parser.add_argument("--workers", type=int, default=8, help="Service database worker threads.")
+    parser.add_argument(
+        "--batch-sizes",
+        type=int,
+        nargs="*",
+        default=[10000],
+        help="Books per run for the batch add/delete benchmark (for example 10000 100000 1000000).",
+    )
+    parser.add_argument(
+        "--shards", type=int, default=4, help="Compare one shard file with this many (0 or 1 to skip)."
+    )
+    parser.add_argument(
+        "--load-workers",
+        type=int,
+        nargs="*",
+        default=[DEFAULT_WORKERS],
+        help="Parsing processes to compare against BulkLoader when loading a feed (none to skip).",
+    )
+    parser.add_argument(
+        "--load-books",
+        type=int,
+        default=0,
+        help="Books in the feed for the load comparison, for example 20000000 (0 to reuse the --books feed).",
+    )
+    parser.add_argument(
+        "--loan-history", type=int, default=100000, help="Past loans generated for the analytics benchmark."
+    )
+    parser.add_argument("--seed", type=int, default=0, help="The random seed.")
+    parser.add_argument(
+        "--hash-iterations",
+        type=int,
+        default=10000,
+        help=f"PBKDF2 iterations for synthetic users (the production default is {DEFAULT_HASH_ITERATIONS}).",
+    )
+    parser.add_argument(
+        "--instrument",
+        action="store_true",
+        help="Enable instrumentation and include its metrics snapshot in the report.",
+    )
+    parser.add_argument("--slow-query-ms", type=float, default=50.0, help="Slow-query log threshold.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON report.")
+    parser.add_argument("--work-dir", help="Keep generated files and the database here instead of a temp dir.")
+    parser.add_argument(
+        "--check-plans",
+        action="store_true",
+        help="Only check that every search shape uses an index, exiting with status 1 if one does not.",
+    )
+    args = parser.parse_args()
+
+    if args.check_plans:
+        if args.work_dir:
+            os.makedirs(args.work_dir, exist_ok=True)
+            plans = run_plan_checks(args, args.work_dir)
+        else:
+            with tempfile.TemporaryDirectory() as work_dir:
+                plans = run_plan_checks(args, work_dir)
+        for name, result in plans.items():
+            print(f"{'ok' if result['ok'] else 'FULL SCAN':<10} {name:<20} {'; '.join(result['plan'])}")
+        sys.exit(0 if all(result["ok"] for result in plans.values()) else 1)
+
+    if args.instrument:
+        metrics.enable(slow_query_ms=args.slow_query_ms)
+
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        report = run_suite(args, args.work_dir)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            report = run_suite(args, work_dir)
+    if args.instrument:
+        report["metrics"] = metrics.snapshot()
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print_results(report)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
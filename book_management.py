@@ -2,190 +2,1282 @@
 Name: Pushwitha Krishnappa
 Course: CS-521
 Python3 Version: Python 3.9.6
-Description: Module for managing books in the Book Management System (BMS). Includes functionality for adding, deleting, searching, borrowing, and listing borrowed books.
+Description: Module for managing books in the Book Management System (BMS). Includes functionality for adding, deleting, searching, borrowing, returning, and listing borrowed books.
 """
 
+import re
 import sqlite3
 
+from bulk_loader import chunked
+from cache import LRUCache, MISSING
+from connection_pool import BATCH_LOOKUP_SIZE, get_pool, placeholders
+from existence_filter import get_existence_filter
+from instrumentation import instrumented, metrics
+from isbn import canonical_isbn, isbn_key
+from migrations import ensure_schema
+from oplog import get_operation_log
+from write_queue import get_write_queue
+
+
+def full_text_query(text):
+    """
+    Converts free-form search text into a BooksFTS query that matches every word as a prefix.
+
+    Args:
+        text (str): The keywords entered by the user.
+
+    Returns:
+        str: An FTS5 query string, safe to pass as a MATCH parameter.
+    """
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words) or '""'
+
+# Columns that can be searched on, with their position in a book tuple
+SEARCH_FIELDS = {"title": 1, "author": 2, "year": 3, "isbn": 4}
+# Columns that search results can be ordered by. Each one is indexed, so a limited page
+# walks the index instead of sorting the whole result.
+ORDER_FIELDS = {"id": 0, "title": 1, "author": 2, "year": 3}
+BOOK_COLUMNS = "Books.id, Books.title, Books.author, Books.year, Books.isbn"
+
+# Outcomes returned by the write operations
+INSERTED = "inserted"
+DUPLICATE = "duplicate"
+DELETED = "deleted"
+NOT_FOUND = "not_found"
+ON_LOAN = "on_loan"
+BORROWED = "borrowed"
+UNAVAILABLE = "unavailable"
+UNKNOWN_USER = "unknown_user"
+RETURNED = "returned"
+NOT_BORROWED = "not_borrowed"
+# LOGGED mode: the write is durable in the operation log and is applied in the background
+ACCEPTED = "accepted"
+
+# Concurrency modes: every thread reads and writes on its own read-write connection, or reads use
+# read-only connections while writes are funnelled through one writer thread with group commits,
+# or, in LOGGED mode, through a durable operation log that a background thread applies.
+SHARED = "shared"
+SPLIT = "split"
+LOGGED = "logged"
+
+
+def search_filters(criteria, year_min=None, year_max=None):
+    """
+    Validates search criteria and turns them into (field, operator, value) filters.
+
+    A list, tuple or set of values matches any of them; any other value must match exactly.
+    Criteria whose value is None or an empty string are ignored. ISBNs are normalized first.
+
+    Args:
+        criteria (dict): Values keyed by a field name from SEARCH_FIELDS.
+        year_min (int): The earliest publication year, inclusive.
+        year_max (int): The latest publication year, inclusive.
+
+    Returns:
+        tuple: The filters in a canonical order, so that equal searches give equal filters.
+
+    Raises:
+        ValueError: If a criterion names a field that cannot be searched on.
+    """
+    filters = []
+    for field, value in criteria.items():
+        if field not in SEARCH_FIELDS:
+            raise ValueError(f"Cannot search on {field!r}.")
+        if value is None or value == "":
+            continue
+        if isinstance(value, (list, tuple, set, frozenset)):
+            if field == "isbn":
+                value = [canonical_isbn(item) for item in value]
+            filters.append((field, "IN", tuple(sorted(set(value), key=str))))
+        else:
+            filters.append((field, "=", canonical_isbn(value) if field == "isbn" else value))
+    if year_min is not None:
+        filters.append(("year", ">=", int(year_min)))
+    if year_max is not None:
+        filters.append(("year", "<=", int(year_max)))
+    return tuple(sorted(filters, key=lambda item: item[:2]))
+
+
+def order_clause(match, order_by):
+    """
+    Builds the ORDER BY clause of a search.
+
+    Args:
+        match (str): The keyword search text, if any.
+        order_by (str): A field name from ORDER_FIELDS, prefixed with "-" for descending
+            order, or None for relevance order on keyword searches and id order otherwise.
+
+    Returns:
+        str: The ORDER BY clause.
+
+    Raises:
+        ValueError: If the field cannot be ordered by.
+    """
+    if order_by is None:
+        return "ORDER BY bm25(BooksFTS)" if match else "ORDER BY Books.id"
+    field = order_by.lstrip("-")
+    if field not in ORDER_FIELDS:
+        raise ValueError(f"Cannot order by {field!r}.")
+    direction = " DESC" if order_by.startswith("-") else ""
+    if field == "id":
+        return f"ORDER BY Books.id{direction}"
+    # Ties are broken by id, which every index already stores after its key.
+    return f"ORDER BY Books.{field}{direction}, Books.id{direction}"
+
+
+def search_cache_key(match, limit, after_id, filters, order_by=None, count_only=False):
+    """
+    Builds the hashable search cache key for a set of search_books arguments.
+
+    Args:
+        match (str): The keyword search text, if any.
+        limit (int): The page size, if any.
+        after_id (int): The keyset pagination cursor, if any.
+        filters (tuple): The filters built by search_filters.
+        order_by (str): The requested order, if any.
+        count_only (bool): Whether only the number of matches was requested.
+
+    Returns:
+        tuple: A key that is equal for equal searches.
+    """
+    return match or None, limit, after_id, filters, order_by, count_only
+
+
+def filter_matches(book, search_filter):
+    """
+    Checks whether a book satisfies one filter built by search_filters.
+
+    Args:
+        book (tuple): An (id, title, author, year, isbn) tuple.
+        search_filter (tuple): A (field, operator, value) filter.
+
+    Returns:
+        bool: True if the book satisfies the filter.
+    """
+    field, operator, value = search_filter
+    actual = book[SEARCH_FIELDS[field]]
+    if operator == "=":
+        return str(actual) == str(value)
+    if operator == "IN":
+        return str(actual) in {str(item) for item in value}
+    if actual is None:
+        return False
+    return int(actual) >= value if operator == ">=" else int(actual) <= value
+
+
+def search_key_affected_by(key, book):
+    """
+    Checks whether adding or deleting a book could change the cached results of a search.
+
+    Keyword searches and limited pages are treated as affected by any change, since a new or
+    removed row can shift their ranking or page boundaries.
+
+    Args:
+        key (tuple): A key built by search_cache_key.
+        book (tuple): The (id, title, author, year, isbn) tuple of the book that changed.
+
+    Returns:
+        bool: True if the cached results may be stale.
+    """
+    match, limit, after_id, filters = key[:4]
+    if match or limit is not None:
+        return True
+    if after_id is not None and book[0] <= after_id:
+        return False
+    return all(filter_matches(book, search_filter) for search_filter in filters)
+
 class BookManagement:
     """
-    Handles book management operations, including adding, deleting, searching, borrowing, and listing borrowed books.
+    Handles book management operations, including adding, deleting, searching, borrowing, returning, and listing borrowed books.
     """
 
-    def __init__(self, db_name="book_management.db"):
+    def __init__(
+        self,
+        db_name="book_management.db",
+        cache_size=1024,
+        cache_ttl=None,
+        verbose=True,
+        concurrency=SHARED,
+        existence_filter=None,
+    ):
         """
         Initializes the BookManagement object.
 
+        The ISBN and search caches are invalidated by this object's own writes. When other
+        processes write to the same database, set `cache_ttl` to bound how stale a cached
+        result can get.
+
+        In SPLIT mode searches and listings run on read-only WAL connections that never wait
+        for the write lock, and writes from every thread are queued to a single writer that
+        commits them in groups, so reads and writes scale independently. LOGGED mode reads the
+        same way, but each write is fsynced to an operation log together with the writes of other
+        threads and returns ACCEPTED as soon as it is durable; a background thread applies the
+        log in batches, and replays it after a crash. A LOGGED write becomes visible to reads,
+        caches and listeners only once it has been applied, which `wait_for_writes` waits for.
+        Only one process at a time may open a database in LOGGED mode.
+
+        With `existence_filter` set, an in-memory Bloom filter of the catalog's ISBNs answers
+        lookups, deletes and returns of ISBNs the library does not carry without a query. It is
+        shared by every BookManagement object on the same file in this process and kept up to
+        date by their writes; call `isbn_filter.refresh()` after other processes add books.
+
         Args:
             db_name (str): The name of the SQLite database file.
+            cache_size (int): The maximum number of entries in each of the ISBN and search caches.
+            cache_ttl (float): The number of seconds a cached entry stays valid, or None to never expire.
+            verbose (bool): Whether operations print their outcome for interactive use.
+            concurrency (str): SHARED, SPLIT or LOGGED.
+            existence_filter (float): The false-positive rate of the ISBN filter, or None to
+                look every ISBN up in SQLite.
         """
+        if concurrency not in (SHARED, SPLIT, LOGGED):
+            raise ValueError(f"Unknown concurrency mode {concurrency!r}.")
         self.db_name = db_name
+        self.concurrency = concurrency
+        ensure_schema(db_name)
+        if concurrency == SPLIT:
+            self.write_queue = get_write_queue(db_name)
+        elif concurrency == LOGGED:
+            self.write_queue = get_operation_log(db_name, WRITE_OPERATIONS)
+        else:
+            self.write_queue = None
+        self.pool = get_pool(db_name, read_only=concurrency != SHARED)
+        self.isbn_cache = LRUCache(max_size=cache_size, ttl=cache_ttl)
+        self.search_cache = LRUCache(max_size=cache_size, ttl=cache_ttl)
+        self.verbose = verbose
+        self.listeners = []
+        self.isbn_filter = None
+        if existence_filter is not None:
+            self.isbn_filter = get_existence_filter(db_name, "Books", "isbn", existence_filter)
+            self.add_listener(self.track_isbns)
+        metrics.watch_caches(self)
 
     def connect_db(self):
         """
-        Connects to the SQLite database.
+        Returns the calling thread's pooled connection to the SQLite database, which is read-only in SPLIT mode.
 
         Returns:
-            sqlite3.Connection: A connection object to the SQLite database.
+            sqlite3.Connection: A long-lived connection object to the SQLite database.
         """
-        return sqlite3.connect(self.db_name)
+        return self.pool.connection()
 
-    def add_book(self, book_title, book_author, publication_year, book_isbn):
+    def report(self, message):
         """
-        Adds a new book to the database.
+        Prints an operation's outcome when running interactively.
 
         Args:
-            book_title (str): The title of the book.
-            book_author (str): The author of the book.
-            publication_year (int): The publication year of the book.
-            book_isbn (str): The ISBN of the book.
+            message (str): The message to print.
         """
-        conn = self.connect_db()
-        cursor = conn.cursor()
+        if self.verbose:
+            print(message)
 
-        try:
+    def cache_stats(self):
+        """
+        Returns the hit, miss and eviction counters of the ISBN and search caches, and of the ISBN filter if there is one.
+
+        Returns:
+            dict: The counters of each cache keyed by cache name.
+        """
+        stats = {"isbn": self.isbn_cache.stats(), "search": self.search_cache.stats()}
+        if self.isbn_filter is not None:
+            stats["isbn_filter"] = self.isbn_filter.stats()
+        return stats
+
+    def track_isbns(self, status, book_isbns):
+        """
+        Listener that records this object's added and deleted books in the ISBN filter.
+
+        Args:
+            status (str): INSERTED or DELETED.
+            book_isbns (list): The ISBNs of the books that changed.
+        """
+        if status == INSERTED:
+            self.isbn_filter.add(book_isbns)
+        else:
+            self.isbn_filter.discard(book_isbns)
+
+    def surely_missing(self, book_isbn):
+        """
+        Checks the ISBN filter for a book that certainly does not exist.
+
+        Args:
+            book_isbn (str): A canonical ISBN.
+
+        Returns:
+            bool: True if the filter rules the book out, False if it has to be looked up.
+        """
+        return self.isbn_filter is not None and not self.isbn_filter.might_contain(book_isbn)
+
+    def run_write(self, operation, *args, applied=None, accepted=None):
+        """
+        Runs a write operation as one immediate transaction on the calling thread's connection.
+
+        BEGIN IMMEDIATE takes the write lock up front, so the reads an operation makes to
+        decide what to write cannot be invalidated by a concurrent writer. In SPLIT mode the
+        operation is queued to the writer thread instead and runs in a savepoint of its group
+        commit. In LOGGED mode it returns `accepted` once it is fsynced to the operation log,
+        and `applied` is called from the log's applier thread after it has been committed.
+
+        Args:
+            operation (callable): Called with a cursor followed by `args`.
+            *args: The arguments passed to the operation.
+            applied (callable): Called with the operation's return value once it has been committed.
+            accepted (object): What a LOGGED write returns in place of the operation's return value.
+
+        Returns:
+            object: The operation's return value, or `accepted` in LOGGED mode.
+        """
+        if self.concurrency == LOGGED:
+            item = self.write_queue.log(operation, *args)
+            if applied is not None:
+
+                def on_applied(future):
+                    if future.exception() is None:
+                        applied(future.result())
+
+                item.result.add_done_callback(on_applied)
+            return accepted
+        if self.write_queue is not None:
+            result = self.write_queue.run(operation, *args)
+        else:
+            conn = self.connect_db()
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = operation(conn.cursor(), *args)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        if applied is not None:
+            applied(result)
+        return result
+
+    def wait_for_writes(self, timeout=None):
+        """
+        Waits until the LOGGED writes acknowledged so far are visible to reads.
+
+        SHARED and SPLIT writes are committed before they return, so this returns at once.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait, or None to wait indefinitely.
+
+        Returns:
+            bool: True once the writes are applied, False if the timeout expired first.
+        """
+        if self.concurrency != LOGGED:
+            return True
+        return self.write_queue.wait_applied(timeout)
+
+    def add_listener(self, listener):
+        """
+        Registers a callback told about the books this object adds or deletes.
+
+        Args:
+            listener (callable): Called with INSERTED or DELETED and a list of ISBNs after each committed write.
+        """
+        self.listeners.append(listener)
+
+    def notify_listeners(self, status, book_isbns):
+        """
+        Tells every registered listener about committed book changes.
+
+        Args:
+            status (str): INSERTED or DELETED.
+            book_isbns (list): The ISBNs of the books that changed.
+        """
+        if book_isbns:
+            for listener in self.listeners:
+                listener(status, book_isbns)
+
+    def invalidate_book(self, book):
+        """
+        Drops the cached entries that a newly added or deleted book could make stale.
+
+        Args:
+            book (tuple): The (id, title, author, year, isbn) tuple of the book that changed.
+        """
+        self.isbn_cache.invalidate(book[4])
+        self.search_cache.invalidate_where(lambda key: search_key_affected_by(key, book))
+
+    @instrumented("book_management.get_book")
+    def get_book(self, book_isbn):
+        """
+        Looks up a single book by ISBN, using the ISBN cache when possible.
+
+        Args:
+            book_isbn (str): The ISBN of the book, in ISBN-10 or ISBN-13 form, with or without hyphens.
+
+        Returns:
+            tuple: The (id, title, author, year, isbn) tuple of the book, or None if it does not exist.
+        """
+        book_isbn = canonical_isbn(book_isbn)
+        book = self.isbn_cache.get(book_isbn)
+        if book is MISSING:
+            if self.surely_missing(book_isbn):
+                return None
+            column, value = isbn_lookup(book_isbn)
+            cursor = self.connect_db().cursor()
             cursor.execute(
-                """
-                INSERT INTO Books (title, author, year, isbn)
-                VALUES (?, ?, ?, ?)
+                f"""
+                SELECT {BOOK_COLUMNS} FROM Books WHERE {column} = ?
                 """,
-                (book_title, book_author, publication_year, book_isbn),
+                (value,),
             )
-            conn.commit()
-            print(f"Book '{book_title}' added successfully!")
-        except sqlite3.IntegrityError:
-            print("Book with this ISBN already exists.")
-        finally:
-            conn.close()
+            book = cursor.fetchone()
+            if book is None and self.isbn_filter is not None:
+                self.isbn_filter.record_false_positive()
+            self.isbn_cache.set(book_isbn, book)
+        return book
+
+    @instrumented("book_management.add_book")
+    def add_book(self, book_title, book_author, publication_year, book_isbn, copies=1):
+        """
+        Adds a new book to the database.
 
+        Args:
+            book_title (str): The title of the book.
+            book_author (str): The author of the book.
+            publication_year (int): The publication year of the book.
+            book_isbn (str): The ISBN of the book. Valid ISBN-10s and ISBN-13s are stored in
+                their canonical 13-digit form; anything else is stored as given.
+            copies (int): The number of copies the library holds.
+
+        Returns:
+            str: INSERTED if the book was added, DUPLICATE if its ISBN already exists, or
+                ACCEPTED in LOGGED mode.
+
+        Raises:
+            ValueError: If the book is invalid, such as one without a title.
+        """
+        book_isbn = canonical_isbn(book_isbn)
+        book = (book_title, book_author, publication_year, book_isbn)
+        status, _ = self.run_write(
+            insert_book, book, copies, applied=lambda result: self.book_added(book, *result), accepted=(ACCEPTED, None)
+        )
+        if status == INSERTED:
+            self.report(f"Book '{book_title}' added successfully!")
+        elif status == ACCEPTED:
+            self.report(f"Book '{book_title}' accepted and will be added shortly.")
+        else:
+            self.report("Book with this ISBN already exists.")
+        return status
+
+    @instrumented("book_management.delete_book")
     def delete_book(self, book_isbn):
         """
-        Deletes a book from the database using its ISBN.
+        Deletes a book and its loan history from the database using its ISBN.
+
+        Books with copies still on loan are not deleted.
 
         Args:
             book_isbn (str): The ISBN of the book to delete.
+
+        Returns:
+            str: DELETED, NOT_FOUND, ON_LOAN if copies of the book are still borrowed, or
+                ACCEPTED in LOGGED mode.
         """
-        conn = self.connect_db()
-        cursor = conn.cursor()
+        book_isbn = canonical_isbn(book_isbn)
+        if self.surely_missing(book_isbn):
+            status, book = NOT_FOUND, None
+        else:
+            status, _ = self.run_write(
+                remove_book, book_isbn, applied=lambda result: self.book_removed(*result), accepted=(ACCEPTED, None)
+            )
+        if status == DELETED:
+            self.report(f"Book with ISBN {book_isbn} deleted successfully.")
+        elif status == ACCEPTED:
+            self.report(f"Deletion of the book with ISBN {book_isbn} accepted.")
+        elif status == ON_LOAN:
+            self.report(f"Book with ISBN {book_isbn} still has copies on loan.")
+        else:
+            self.report(f"No book found with ISBN {book_isbn}.")
+        return status
 
-        try:
-            cursor.execute(
-                """
-                DELETE FROM Books WHERE isbn = ?
-                """,
-                (book_isbn,),
+    @instrumented("book_management.get_availability")
+    def get_availability(self, book_isbn):
+        """
+        Looks up how many copies of a book the library holds and how many are on the shelf.
+
+        Args:
+            book_isbn (str): The ISBN of the book.
+
+        Returns:
+            tuple: The (copies, available) counts, or None if the book does not exist.
+        """
+        book_isbn = canonical_isbn(book_isbn)
+        if self.surely_missing(book_isbn):
+            return None
+        column, value = isbn_lookup(book_isbn)
+        cursor = self.connect_db().cursor()
+        cursor.execute(
+            f"""
+            SELECT copies, available FROM Books WHERE {column} = ?
+            """,
+            (value,),
+        )
+        return cursor.fetchone()
+
+    def build_search_query(
+        self,
+        match=None,
+        after_id=None,
+        year_min=None,
+        year_max=None,
+        columns=BOOK_COLUMNS,
+        **kwargs,
+    ):
+        """
+        Builds the SELECT statement shared by search_books and iter_books.
+
+        Field names are checked against SEARCH_FIELDS and every value is passed as a parameter.
+
+        Args:
+            match (str): Optional keywords matched as word prefixes against titles and authors.
+            after_id (int): Only return books whose id is greater than this value.
+            year_min (int): The earliest publication year, inclusive.
+            year_max (int): The latest publication year, inclusive.
+            columns (str): The SELECT list.
+            **kwargs: Search criteria on title, author, year, or isbn, each a value or a list of values.
+
+        Returns:
+            tuple: The SQL query without ORDER BY or LIMIT, and its parameters.
+        """
+        if match:
+            query = (
+                f"SELECT {columns} FROM BooksFTS JOIN Books ON Books.id = BooksFTS.rowid "
+                "WHERE BooksFTS MATCH ?"
             )
-            if cursor.rowcount > 0:
-                conn.commit()
-                print(f"Book with ISBN {book_isbn} deleted successfully.")
+            params = [full_text_query(match)]
+        else:
+            query = f"SELECT {columns} FROM Books WHERE 1=1"
+            params = []
+
+        for field, operator, value in search_filters(kwargs, year_min, year_max):
+            if field == "isbn":
+                field, value = isbn_filter(operator, value)
+            if operator == "IN":
+                query += f" AND Books.{field} IN ({placeholders(len(value))})"
+                params.extend(value)
             else:
-                print(f"No book found with ISBN {book_isbn}.")
-        except sqlite3.Error as error:
-            print(f"An error occurred: {error}")
-        finally:
-            conn.close()
+                query += f" AND Books.{field} {operator} ?"
+                params.append(value)
+
+        if after_id is not None:
+            query += " AND Books.id > ?"
+            params.append(after_id)
 
-    def search_books(self, **kwargs):
+        return query, params
+
+    def prepare_search(self, match=None, limit=None, after_id=None, order_by=None, count_only=False, **kwargs):
         """
-        Searches for books in the database based on criteria.
+        Builds the complete statement run by search_books.
+
+        Args:
+            match (str): Optional keywords matched as word prefixes against titles and authors.
+            limit (int): The maximum number of books to return, or None for all of them.
+            after_id (int): Only return books whose id is greater than this value.
+            order_by (str): A field name from ORDER_FIELDS, prefixed with "-" for descending order.
+            count_only (bool): Whether to count the matching books instead of returning them.
+            **kwargs: year_min, year_max and the search criteria accepted by build_search_query.
+
+        Returns:
+            tuple: The SQL query and its parameters.
+        """
+        if match and after_id is not None:
+            raise ValueError("after_id paging is not supported for keyword searches.")
+        if after_id is not None and order_by not in (None, "id"):
+            raise ValueError("after_id paging is only supported in id order.")
+
+        if count_only:
+            return self.build_search_query(match=match, after_id=after_id, columns="COUNT(*)", **kwargs)
+        query, params = self.build_search_query(match=match, after_id=after_id, **kwargs)
+        query += " " + order_clause(match, order_by)
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return query, params
+
+    def explain_search(self, **arguments):
+        """
+        Shows how SQLite would run a search, without running it.
 
         Args:
-            **kwargs: Search criteria such as title, author, year, or isbn.
+            **arguments: The arguments accepted by search_books.
+
+        Returns:
+            list: The detail column of each EXPLAIN QUERY PLAN row.
         """
-        conn = self.connect_db()
-        cursor = conn.cursor()
+        query, params = self.prepare_search(**arguments)
+        rows = self.connect_db().execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        return [row[-1] for row in rows]
 
-        query = "SELECT * FROM Books WHERE 1=1"
-        params = []
+    @instrumented("book_management.search_books")
+    def search_books(
+        self,
+        match=None,
+        limit=None,
+        after_id=None,
+        order_by=None,
+        count_only=False,
+        year_min=None,
+        year_max=None,
+        **kwargs,
+    ):
+        """
+        Searches for books in the database based on criteria.
 
-        for key, value in kwargs.items():
-            if value:
-                query += f" AND {key} = ?"
-                params.append(value)
+        Results are ordered by id so that the id of the last row can be passed back as
+        `after_id` to fetch the next page. Keyword searches are ordered by relevance instead
+        and can be limited but not paged. Any other indexed column can be chosen with `order_by`.
+
+        Args:
+            match (str): Optional keywords matched as word prefixes against titles and authors.
+            limit (int): The maximum number of books to return, or None for all of them.
+            after_id (int): Only return books whose id is greater than this value.
+            order_by (str): "id", "title", "author" or "year", prefixed with "-" for descending order.
+            count_only (bool): Whether to return the number of matching books instead of the books.
+            year_min (int): The earliest publication year, inclusive.
+            year_max (int): The latest publication year, inclusive.
+            **kwargs: Search criteria on title, author, year, or isbn. A list of values matches any of them.
+
+        Returns:
+            list: A list of (id, title, author, year, isbn) tuples, or an int when `count_only` is set.
+
+        Raises:
+            ValueError: If a criterion or the order names an unknown field, or paging is combined
+                with keyword or non-id ordering.
+        """
+        filters = search_filters(kwargs, year_min, year_max)
+        cache_key = search_cache_key(match, None if count_only else limit, after_id, filters, order_by, count_only)
+        results = self.search_cache.get(cache_key)
+        if results is not MISSING:
+            return results if count_only else list(results)
 
+        query, params = self.prepare_search(
+            match, limit, after_id, order_by, count_only, year_min=year_min, year_max=year_max, **kwargs
+        )
+        cursor = self.connect_db().cursor()
         cursor.execute(query, params)
+        if count_only:
+            results = cursor.fetchone()[0]
+            self.search_cache.set(cache_key, results)
+            return results
         results = cursor.fetchall()
-        conn.close()
+        self.search_cache.set(cache_key, tuple(results))
+        return results
 
-        if results:
-            print("\nBooks Found:")
-            for book in results:
-                print(f"Title: {book[1]}, Author: {book[2]}, Year: {book[3]}, ISBN: {book[4]}")
-        else:
-            print("No books match your criteria.")
+    def iter_books(self, match=None, chunk_size=500, order_by=None, **kwargs):
+        """
+        Streams the books matching the criteria without loading the whole result set into memory.
 
+        Args:
+            match (str): Optional keywords matched as word prefixes against titles and authors.
+            chunk_size (int): The number of rows fetched from SQLite at a time.
+            order_by (str): "id", "title", "author" or "year", prefixed with "-" for descending order.
+            **kwargs: year_min, year_max and search criteria on title, author, year, or isbn.
+
+        Yields:
+            tuple: An (id, title, author, year, isbn) tuple for each matching book.
+        """
+        query, params = self.prepare_search(match=match, order_by=order_by, **kwargs)
+
+        cursor = self.connect_db().cursor()
+        cursor.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    @instrumented("book_management.borrow_book")
     def borrow_book(self, user_name, book_isbn):
         """
-        Allows a user to borrow a book by ISBN.
+        Allows a user to borrow a copy of a book by ISBN.
+
+        The availability check, the copy count update and the loan record are written in one
+        transaction, so concurrent borrowers cannot take more copies than the library holds.
 
         Args:
             user_name (str): The name of the user borrowing the book.
             book_isbn (str): The ISBN of the book to borrow.
-        """
-        conn = self.connect_db()
-        cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            SELECT * FROM Books WHERE isbn = ?
-            """,
-            (book_isbn,),
-        )
-        book = cursor.fetchone()
+        Returns:
+            str: BORROWED, NOT_FOUND, UNAVAILABLE if no copies are left, UNKNOWN_USER, or
+                ACCEPTED in LOGGED mode.
+        """
+        book_isbn = canonical_isbn(book_isbn)
+        if self.get_book(book_isbn) is None:
+            status, title = NOT_FOUND, None
+        else:
+            status, title = self.run_write(lend_book, user_name, book_isbn, accepted=(ACCEPTED, None))
 
-        if book:
-            try:
-                cursor.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS BorrowedBooks (
-                        username TEXT NOT NULL,
-                        book_title TEXT NOT NULL
-                    )
-                    """
-                )
-                cursor.execute(
-                    """
-                    INSERT INTO BorrowedBooks (username, book_title)
-                    VALUES (?, ?)
-                    """,
-                    (user_name, book[1]),
-                )
-                conn.commit()
-                print(f"{user_name} has borrowed '{book[1]}'.")
-            except sqlite3.Error as error:
-                print(f"An error occurred: {error}")
+        if status == BORROWED:
+            self.report(f"{user_name} has borrowed '{title}'.")
+        elif status == ACCEPTED:
+            self.report(f"{user_name}'s loan of the book with ISBN {book_isbn} accepted.")
+        elif status == UNAVAILABLE:
+            self.report(f"No copies of '{title}' are available.")
+        elif status == UNKNOWN_USER:
+            self.report(f"No user named {user_name}.")
         else:
-            print("Book not found.")
+            self.report("Book not found.")
+        return status
 
-        conn.close()
+    @instrumented("book_management.return_book")
+    def return_book(self, user_name, book_isbn):
+        """
+        Returns a copy of a book borrowed by a user.
+
+        Args:
+            user_name (str): The name of the user returning the book.
+            book_isbn (str): The ISBN of the book being returned.
+
+        Returns:
+            str: RETURNED, NOT_BORROWED if the user has no open loan for the book, or ACCEPTED
+                in LOGGED mode.
+        """
+        book_isbn = canonical_isbn(book_isbn)
+        if self.surely_missing(book_isbn):
+            status, title = NOT_BORROWED, None
+        else:
+            status, title = self.run_write(close_loan, user_name, book_isbn, accepted=(ACCEPTED, None))
+        if status == RETURNED:
+            self.report(f"{user_name} has returned '{title}'.")
+        elif status == ACCEPTED:
+            self.report(f"{user_name}'s return of the book with ISBN {book_isbn} accepted.")
+        else:
+            self.report(f"{user_name} has not borrowed a book with ISBN {book_isbn}.")
+        return status
 
-    def list_borrowed_books(self):
+    @instrumented("book_management.list_borrowed_books")
+    def list_borrowed_books(self, user_name=None):
         """
-        Lists all borrowed books from the database.
+        Lists the books that are currently borrowed.
+
+        Args:
+            user_name (str): Only list this user's loans, or None to list every loan.
 
         Returns:
             list: A list of tuples containing the username and book title.
         """
-        conn = self.connect_db()
-        cursor = conn.cursor()
+        query = """
+            SELECT Users.username, Books.title
+            FROM Loans
+            JOIN Users ON Users.id = Loans.user_id
+            JOIN Books ON Books.id = Loans.book_id
+            WHERE Loans.returned_at IS NULL
+        """
+        params = []
+        if user_name:
+            query += " AND Users.username = ?"
+            params.append(user_name)
+        query += " ORDER BY Loans.id"
 
+        cursor = self.connect_db().cursor()
         try:
-            cursor.execute(
-                """
-                SELECT username, book_title FROM BorrowedBooks
-                """
-            )
+            cursor.execute(query, params)
             borrowed_books = cursor.fetchall()
-            if borrowed_books:
-                print("\nBorrowed Books:")
-                for user_name, book_title in borrowed_books:
-                    print(f"User: {user_name}, Book: {book_title}")
-            else:
-                print("No books are currently borrowed.")
         except sqlite3.Error as error:
-            print(f"An error occurred: {error}")
-        finally:
-            conn.close()
+            self.report(f"An error occurred: {error}")
+            return []
+
+        if borrowed_books:
+            self.report("\nBorrowed Books:")
+            for borrower, book_title in borrowed_books:
+                self.report(f"User: {borrower}, Book: {book_title}")
+        else:
+            self.report("No books are currently borrowed.")
+        return borrowed_books
+
+    def invalidate_books(self, book_isbns):
+        """
+        Drops the cached entries that a batch of added or deleted books could make stale.
+
+        Args:
+            book_isbns (iterable): The ISBNs of the books that changed.
+        """
+        for book_isbn in book_isbns:
+            self.isbn_cache.invalidate(book_isbn)
+        self.search_cache.clear()
+
+    def book_added(self, book, status, book_id):
+        """
+        Updates the caches and listeners after an add_book write has been committed.
+
+        Args:
+            book (tuple): The (title, author, year, isbn) of the book.
+            status (str): INSERTED or DUPLICATE.
+            book_id (int): The new book's id, or None for a duplicate.
+        """
+        if status == INSERTED:
+            self.invalidate_book((book_id,) + book)
+            self.notify_listeners(INSERTED, [book[3]])
+
+    def book_removed(self, status, book):
+        """
+        Updates the caches and listeners after a delete_book write has been committed.
+
+        Args:
+            status (str): DELETED, NOT_FOUND or ON_LOAN.
+            book (tuple): The (id, title, author, year, isbn) of the deleted book, or None.
+        """
+        if status == DELETED:
+            self.invalidate_book(book)
+            self.notify_listeners(DELETED, [book[4]])
+
+    def books_added(self, results):
+        """
+        Updates the caches and listeners after an add_books write has been committed.
+
+        Args:
+            results (list): The (isbn, status) pair of each book.
+        """
+        inserted = [isbn for isbn, status in results if status == INSERTED]
+        self.invalidate_books(inserted)
+        self.notify_listeners(INSERTED, inserted)
+
+    def books_removed(self, results):
+        """
+        Updates the caches and listeners after a delete_books write has been committed.
+
+        Args:
+            results (list): The (isbn, status) pair of each ISBN that was looked up.
+        """
+        deleted = [isbn for isbn, status in results if status == DELETED]
+        self.invalidate_books(deleted)
+        self.notify_listeners(DELETED, deleted)
+
+    def report_batch(self, action, results):
+        """
+        Prints a one-line count of each outcome of a batch operation.
+
+        Args:
+            action (str): The name of the batch operation.
+            results (list): The (isbn, status) pairs returned by the operation.
+        """
+        if self.verbose:
+            counts = {}
+            for _, status in results:
+                counts[status] = counts.get(status, 0) + 1
+            summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+            print(f"{action}: {summary or 'nothing to do'}.")
+
+    @instrumented("book_management.add_books")
+    def add_books(self, books):
+        """
+        Adds many books in a single transaction.
+
+        Args:
+            books (iterable): (title, author, year, isbn) or (title, author, year, isbn, copies) tuples.
+
+        Returns:
+            list: An (isbn, status) pair per book, where status is INSERTED, DUPLICATE or
+                ACCEPTED in LOGGED mode.
+        """
+        books = [tuple(book[:3]) + (canonical_isbn(book[3]),) + tuple(book[4:]) for book in books]
+        results = self.run_write(
+            insert_books, books, applied=self.books_added, accepted=[(book[3], ACCEPTED) for book in books]
+        )
+        self.report_batch("Add books", results)
+        return results
+
+    @instrumented("book_management.delete_books")
+    def delete_books(self, book_isbns):
+        """
+        Deletes many books in a single transaction.
+
+        Args:
+            book_isbns (iterable): The ISBNs of the books to delete.
+
+        Returns:
+            list: An (isbn, status) pair per ISBN, where status is DELETED, NOT_FOUND, ON_LOAN
+                or ACCEPTED in LOGGED mode.
+        """
+        book_isbns = [canonical_isbn(book_isbn) for book_isbn in book_isbns]
+        missing = {book_isbn for book_isbn in book_isbns if self.surely_missing(book_isbn)}
+        known = [book_isbn for book_isbn in book_isbns if book_isbn not in missing]
+        found = iter(
+            self.run_write(
+                remove_books, known, applied=self.books_removed, accepted=[(isbn, ACCEPTED) for isbn in known]
+            )
+            if known
+            else ()
+        )
+        results = [(book_isbn, NOT_FOUND) if book_isbn in missing else next(found) for book_isbn in book_isbns]
+        self.report_batch("Delete books", results)
+        return results
+
+    @instrumented("book_management.borrow_books")
+    def borrow_books(self, user_name, book_isbns):
+        """
+        Borrows many books for one user in a single transaction.
+
+        Args:
+            user_name (str): The name of the user borrowing the books.
+            book_isbns (iterable): The ISBNs of the books to borrow.
+
+        Returns:
+            list: An (isbn, status) pair per ISBN, where status is BORROWED, NOT_FOUND,
+                UNAVAILABLE, UNKNOWN_USER or ACCEPTED in LOGGED mode.
+        """
+        book_isbns = [canonical_isbn(book_isbn) for book_isbn in book_isbns]
+        results = self.run_write(
+            lend_books, user_name, book_isbns, accepted=[(book_isbn, ACCEPTED) for book_isbn in book_isbns]
+        )
+        self.report_batch(f"Borrow books for {user_name}", results)
+        return results
+
+
+def insert_book(cursor, book, copies):
+    """
+    Inserts a book inside the caller's transaction.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on a connection with an open write transaction.
+        book (tuple): The (title, author, year, isbn) of the book.
+        copies (int): The number of copies the library holds.
+
+    Returns:
+        tuple: The status and the new book's id, or None for a duplicate.
+
+    Raises:
+        ValueError: If the book breaks a constraint other than ISBN uniqueness, such as a missing title.
+    """
+    try:
+        cursor.execute(
+            """
+            INSERT INTO Books (title, author, year, isbn, isbn13, copies, available)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            book + (isbn_key(book[3]), copies, copies),
+        )
+    except sqlite3.IntegrityError as error:
+        # Only the isbn and isbn13 columns are unique; NOT NULL and CHECK failures are bad input.
+        if not str(error).startswith("UNIQUE constraint failed"):
+            raise ValueError(f"Invalid book: {error}.") from error
+        return DUPLICATE, None
+    return INSERTED, cursor.lastrowid
+
+
+def remove_book(cursor, book_isbn):
+    """
+    Deletes a book with no open loans inside the caller's transaction.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on a connection with an open write transaction.
+        book_isbn (str): The ISBN of the book to delete.
+
+    Returns:
+        tuple: The status and the deleted (id, title, author, year, isbn) tuple, if any.
+    """
+    column, value = isbn_lookup(book_isbn)
+    cursor.execute(
+        f"""
+        SELECT {BOOK_COLUMNS}, Books.copies - Books.available FROM Books WHERE {column} = ?
+        """,
+        (value,),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return NOT_FOUND, None
+    if row[5] > 0:
+        return ON_LOAN, row[:5]
+    cursor.execute(
+        """
+        DELETE FROM Books WHERE id = ?
+        """,
+        (row[0],),
+    )
+    return DELETED, row[:5]
+
+
+def lend_book(cursor, user_name, book_isbn):
+    """
+    Records a loan and takes a copy off the shelf inside the caller's transaction.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on a connection with an open write transaction.
+        user_name (str): The name of the user borrowing the book.
+        book_isbn (str): The ISBN of the book to borrow.
+
+    Returns:
+        tuple: The status and the book's title, if it exists.
+    """
+    column, value = isbn_lookup(book_isbn)
+    cursor.execute(
+        f"""
+        SELECT id, title, available FROM Books WHERE {column} = ?
+        """,
+        (value,),
+    )
+    book = cursor.fetchone()
+    if book is None:
+        return NOT_FOUND, None
+    book_id, title, available = book
+    if available <= 0:
+        return UNAVAILABLE, title
+
+    cursor.execute(
+        """
+        SELECT id FROM Users WHERE username = ?
+        """,
+        (user_name,),
+    )
+    user = cursor.fetchone()
+    if user is None:
+        return UNKNOWN_USER, title
+
+    cursor.execute(
+        """
+        UPDATE Books SET available = available - 1 WHERE id = ?
+        """,
+        (book_id,),
+    )
+    cursor.execute(
+        """
+        INSERT INTO Loans (user_id, book_id) VALUES (?, ?)
+        """,
+        (user[0], book_id),
+    )
+    return BORROWED, title
+
+
+def close_loan(cursor, user_name, book_isbn):
+    """
+    Marks a user's oldest open loan of a book as returned inside the caller's transaction.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on a connection with an open write transaction.
+        user_name (str): The name of the user returning the book.
+        book_isbn (str): The ISBN of the book being returned.
+
+    Returns:
+        tuple: The status and the book's title, if a loan was found.
+    """
+    column, value = isbn_lookup(book_isbn)
+    cursor.execute(
+        f"""
+        SELECT Loans.id, Books.id, Books.title
+        FROM Books
+        JOIN Loans ON Loans.book_id = Books.id AND Loans.returned_at IS NULL
+        JOIN Users ON Users.id = Loans.user_id
+        WHERE Books.{column} = ? AND Users.username = ?
+        ORDER BY Loans.id
+        LIMIT 1
+        """,
+        (value, user_name),
+    )
+    loan = cursor.fetchone()
+    if loan is None:
+        return NOT_BORROWED, None
+    loan_id, book_id, title = loan
+    cursor.execute(
+        """
+        UPDATE Loans SET returned_at = CURRENT_TIMESTAMP WHERE id = ?
+        """,
+        (loan_id,),
+    )
+    cursor.execute(
+        """
+        UPDATE Books SET available = available + 1 WHERE id = ?
+        """,
+        (book_id,),
+    )
+    return RETURNED, title
+
+
+def isbn_lookup(book_isbn):
+    """
+    Chooses how to find a book by ISBN.
+
+    Valid ISBNs are looked up by their integer isbn13 key. Identifiers that are not ISBNs,
+    kept by catalogs that predate validation, are looked up by their exact string.
+
+    Args:
+        book_isbn (str): A canonical ISBN, as returned by canonical_isbn.
+
+    Returns:
+        tuple: The column to match and the value to match it against.
+    """
+    key = isbn_key(book_isbn)
+    return ("isbn", book_isbn) if key is None else ("isbn13", key)
+
+
+def isbn_filter(operator, value):
+    """
+    Turns an isbn search filter into a filter on the column that isbn_lookup would use.
+
+    Args:
+        operator (str): "=" or "IN".
+        value (object): A canonical ISBN, or a tuple of them for IN.
+
+    Returns:
+        tuple: The column and the value or values to match.
+    """
+    if operator != "IN":
+        return isbn_lookup(value)
+    keys = [isbn_key(item) for item in value]
+    if None in keys:
+        return "isbn", value
+    return "isbn13", tuple(keys)
+
+
+def books_by_isbn(cursor, columns, book_isbns):
+    """
+    Looks up a batch of books by ISBN.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+        columns (str): The SELECT list of Books columns to return for each book.
+        book_isbns (list): Canonical ISBNs, at most BATCH_LOOKUP_SIZE of them.
+
+    Returns:
+        dict: A tuple of the selected columns keyed by ISBN, for the books that exist.
+    """
+    keyed = {}
+    plain = []
+    for book_isbn in book_isbns:
+        key = isbn_key(book_isbn)
+        if key is None:
+            plain.append(book_isbn)
+        else:
+            keyed[key] = book_isbn
+
+    books = {}
+    if keyed:
+        cursor.execute(
+            f"SELECT isbn13, {columns} FROM Books WHERE isbn13 IN ({placeholders(len(keyed))})",
+            list(keyed),
+        )
+        for row in cursor.fetchall():
+            books[keyed[row[0]]] = row[1:]
+    if plain:
+        cursor.execute(
+            f"SELECT isbn, {columns} FROM Books WHERE isbn IN ({placeholders(len(plain))})",
+            plain,
+        )
+        for row in cursor.fetchall():
+            books[row[0]] = row[1:]
+    return books
+
+
+def insert_books(cursor, books):
+    """
+    Inserts the books whose ISBNs are not in the database yet inside the caller's transaction.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on a connection with an open write transaction.
+        books (iterable): (title, author, year, isbn) or (title, author, year, isbn, copies) tuples.
+
+    Returns:
+        list: An (isbn, status) pair per book.
+    """
+    results = []
+    for chunk in chunked(books, BATCH_LOOKUP_SIZE):
+        seen = set(books_by_isbn(cursor, "id", [book[3] for book in chunk]))
+
+        rows = []
+        for book in chunk:
+            title, author, year, isbn = book[:4]
+            if isbn in seen:
+                results.append((isbn, DUPLICATE))
+                continue
+            seen.add(isbn)
+            copies = book[4] if len(book) > 4 else 1
+            rows.append((title, author, year, isbn, isbn_key(isbn), copies, copies))
+            results.append((isbn, INSERTED))
+
+        cursor.executemany(
+            """
+            INSERT INTO Books (title, author, year, isbn, isbn13, copies, available)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+    return results
+
+
+def remove_books(cursor, book_isbns):
+    """
+    Deletes the books with no open loans inside the caller's transaction.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on a connection with an open write transaction.
+        book_isbns (iterable): The ISBNs of the books to delete.
+
+    Returns:
+        list: An (isbn, status) pair per ISBN.
+    """
+    results = []
+    for isbns in chunked(book_isbns, BATCH_LOOKUP_SIZE):
+        books = books_by_isbn(cursor, "id, copies - available", isbns)
+
+        doomed = []
+        for isbn in isbns:
+            book = books.pop(isbn, None)
+            if book is None:
+                results.append((isbn, NOT_FOUND))
+            elif book[1] > 0:
+                results.append((isbn, ON_LOAN))
+            else:
+                doomed.append((book[0],))
+                results.append((isbn, DELETED))
+
+        cursor.executemany("DELETE FROM Books WHERE id = ?", doomed)
+    return results
+
+
+def lend_books(cursor, user_name, book_isbns):
+    """
+    Records loans of many books for one user inside the caller's transaction.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on a connection with an open write transaction.
+        user_name (str): The name of the user borrowing the books.
+        book_isbns (iterable): The ISBNs of the books to borrow.
+
+    Returns:
+        list: An (isbn, status) pair per ISBN.
+    """
+    cursor.execute("SELECT id FROM Users WHERE username = ?", (user_name,))
+    user = cursor.fetchone()
+    if user is None:
+        return [(isbn, UNKNOWN_USER) for isbn in book_isbns]
+
+    results = []
+    for isbns in chunked(book_isbns, BATCH_LOOKUP_SIZE):
+        available = {isbn: list(book) for isbn, book in books_by_isbn(cursor, "id, available", isbns).items()}
+
+        loans = []
+        for isbn in isbns:
+            book = available.get(isbn)
+            if book is None:
+                results.append((isbn, NOT_FOUND))
+            elif book[1] <= 0:
+                results.append((isbn, UNAVAILABLE))
+            else:
+                book[1] -= 1
+                loans.append((user[0], book[0]))
+                results.append((isbn, BORROWED))
+
+        cursor.executemany(
+            "UPDATE Books SET available = available - 1 WHERE id = ?",
+            [(book_id,) for _, book_id in loans],
+        )
+        cursor.executemany("INSERT INTO Loans (user_id, book_id) VALUES (?, ?)", loans)
+    return results
+
+# The write operations that can be recorded in an operation log, by name
+WRITE_OPERATIONS = {
+    operation.__name__: operation
+    for operation in (insert_book, remove_book, lend_book, close_loan, insert_books, remove_books, lend_books)
+}
+
 
 if __name__ == "__main__":
     book_manager = BookManagement()
@@ -196,8 +1288,9 @@ if __name__ == "__main__":
         print("2. Delete Book")
         print("3. Search Books")
         print("4. Borrow Book")
-        print("5. List Borrowed Books")
-        print("6. Exit")
+        print("5. Return Book")
+        print("6. List Borrowed Books")
+        print("7. Exit")
         choice = input("Enter your choice: ")
 
         if choice == "1":
@@ -211,24 +1304,37 @@ if __name__ == "__main__":
             book_manager.delete_book(isbn)
         elif choice == "3":
             print("\nEnter search criteria (leave blank to display all books):")
+            keywords = input("Keywords (partial title or author): ")
             title = input("Title: ")
             author = input("Author: ")
             year = input("Year: ")
             isbn = input("ISBN: ")
-            book_manager.search_books(
+            found = False
+            for book in book_manager.iter_books(
+                match=keywords or None,
                 title=title or None,
                 author=author or None,
                 year=int(year) if year else None,
                 isbn=isbn or None,
-            )
+            ):
+                if not found:
+                    print("\nBooks Found:")
+                    found = True
+                print(f"Title: {book[1]}, Author: {book[2]}, Year: {book[3]}, ISBN: {book[4]}")
+            if not found:
+                print("No books match your criteria.")
         elif choice == "4":
             username = input("Enter your username: ")
             isbn = input("Enter the ISBN of the book to borrow: ")
             book_manager.borrow_book(username, isbn)
         elif choice == "5":
-            book_manager.list_borrowed_books()
+            username = input("Enter your username: ")
+            isbn = input("Enter the ISBN of the book to return: ")
+            book_manager.return_book(username, isbn)
         elif choice == "6":
+            book_manager.list_borrowed_books()
+        elif choice == "7":
             print("Exiting Book Management. Goodbye!")
             break
         else:
-            print("Invalid choice. Please try again.")
\ No newline at end of file
+            print("Invalid choice. Please try again.")
@@ -0,0 +1,344 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for bulk importing Users and Books into the Book Management System (BMS). Streams CSV input in batches and inserts each batch with executemany inside a single transaction.
+"""
+
+import argparse
+import csv
+import os
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+
+from connection_pool import BATCH_LOOKUP_SIZE, get_pool, placeholders
+from isbn import normalize_isbn
+from security import DEFAULT_HASH_ITERATIONS, hash_password
+
+DEFAULT_BATCH_SIZE = 5000
+# Secondary indexes are dropped and rebuilt around a load only when the feed has at least this
+# many lines per row already in the table; smaller loads update the indexes in place
+DEFER_INDEXES_RATIO = 0.2
+# The block size used when counting the lines of a feed
+COUNT_BLOCK_SIZE = 1024 * 1024
+
+
+class LoadSummary:
+    """
+    Collects the outcome of loading one input file into one table.
+    """
+
+    def __init__(self, table):
+        """
+        Initializes the LoadSummary object.
+
+        Args:
+            table (str): The name of the table being loaded.
+        """
+        self.table = table
+        self.inserted = 0
+        self.duplicates = 0
+        self.rejected = []
+
+    def __str__(self):
+        """
+        Returns a one-line, human-readable summary of the load.
+
+        Returns:
+            str: The summary text.
+        """
+        return (
+            f"{self.table}: {self.inserted} inserted, {self.duplicates} duplicates skipped, "
+            f"{len(self.rejected)} rejected"
+        )
+
+
+def iter_csv_lines(lines):
+    """
+    Parses CSV lines into their non-blank rows with surrounding whitespace removed.
+
+    Args:
+        lines (iterable): The lines of CSV text, such as an open file.
+
+    Yields:
+        tuple: The line number, counted from 1, and the list of stripped fields of each row.
+    """
+    reader = csv.reader(lines, skipinitialspace=True)
+    for fields in reader:
+        fields = [field.strip() for field in fields]
+        if any(fields):
+            yield reader.line_num, fields
+
+
+def iter_csv_rows(path):
+    """
+    Streams the non-blank rows of a CSV file with surrounding whitespace removed.
+
+    Args:
+        path (str): The path of the CSV file.
+
+    Yields:
+        tuple: The line number and the list of stripped fields of each row.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        yield from iter_csv_lines(file)
+
+
+def has_more_lines(path, limit):
+    """
+    Checks whether a file has more than `limit` lines, reading only as far as needed.
+
+    Args:
+        path (str): The path of the file.
+        limit (float): The number of lines to exceed.
+
+    Returns:
+        bool: True if the file has more than `limit` lines.
+    """
+    lines = 0
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(COUNT_BLOCK_SIZE), b""):
+            lines += block.count(b"\n")
+            if lines > limit:
+                return True
+    return False
+
+
+def chunked(iterable, size):
+    """
+    Splits an iterable into lists of at most `size` items.
+
+    Args:
+        iterable (iterable): The items to split.
+        size (int): The maximum number of items per chunk.
+
+    Yields:
+        list: The next chunk of items.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_user(fields):
+    """
+    Converts the fields of a Users.txt row into an insertable tuple.
+
+    Args:
+        fields (list): The username, password and user type fields.
+
+    Returns:
+        tuple: The (username, password, user_type) values.
+    """
+    if len(fields) != 3:
+        raise ValueError(f"expected 3 fields, got {len(fields)}")
+    username, password, user_type = fields
+    if user_type not in ("admin", "user"):
+        raise ValueError(f"invalid user type {user_type!r}")
+    return username, password, user_type
+
+
+def parse_book(fields):
+    """
+    Converts the fields of a Books.txt row into an insertable tuple.
+
+    Args:
+        fields (list): The title, author, year and ISBN fields.
+
+    Returns:
+        tuple: The (title, author, year, isbn) values, with the ISBN in canonical 13-digit form.
+
+    Raises:
+        ValueError: If a field is missing, the year is not a number or the ISBN is invalid.
+    """
+    if len(fields) != 4:
+        raise ValueError(f"expected 4 fields, got {len(fields)}")
+    title, author, year, isbn = fields
+    return title, author, int(year), normalize_isbn(isbn)
+
+
+def parse_book_row(fields):
+    """
+    Converts the fields of a Books.txt row into a Books row with its integer ISBN key.
+
+    Args:
+        fields (list): The title, author, year and ISBN fields.
+
+    Returns:
+        tuple: The (title, author, year, isbn, isbn13) values.
+    """
+    book = parse_book(fields)
+    return book + (int(book[3]),)
+
+
+class BulkLoader:
+    """
+    Loads large Users and Books files with batched inserts in a single transaction.
+    """
+
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE, hash_iterations=DEFAULT_HASH_ITERATIONS):
+        """
+        Initializes the BulkLoader object.
+
+        Args:
+            conn (sqlite3.Connection): The connection to load the data through.
+            batch_size (int): The number of rows inserted per executemany call.
+            hash_iterations (int): The PBKDF2 iteration count for imported passwords.
+        """
+        self.conn = conn
+        self.batch_size = batch_size
+        self.hash_iterations = hash_iterations
+
+    def hash_new_users(self, batch):
+        """
+        Hashes the passwords of the users in a batch whose usernames are not taken yet.
+
+        Existing usernames and repeats within the batch are dropped before any password is hashed,
+        as in catalog_sync, so reloading a Users file of known users costs one indexed lookup per
+        row rather than one hash.
+
+        Args:
+            batch (list): (username, password, user_type) tuples.
+
+        Returns:
+            list: The (username, password_hash, user_type) rows to insert.
+        """
+        existing = set()
+        for names in chunked([row[0] for row in batch], BATCH_LOOKUP_SIZE):
+            existing.update(
+                row[0]
+                for row in self.conn.execute(
+                    f"SELECT username FROM Users WHERE username IN ({placeholders(len(names))})", names
+                )
+            )
+        new_users = {}
+        for username, password, user_type in batch:
+            if username not in existing and username not in new_users:
+                new_users[username] = (username, hash_password(password, self.hash_iterations), user_type)
+        return list(new_users.values())
+
+    def should_defer_indexes(self, table, path):
+        """
+        Decides whether rebuilding a table's secondary indexes after a load is cheaper than updating them.
+
+        Rebuilding sorts every row of the table, so it only pays off when the table is empty or the
+        feed is large compared with it. The row count is estimated from the largest rowid, which
+        costs one index lookup instead of a full count.
+
+        Args:
+            table (str): The name of the table being loaded.
+            path (str): The path of the file being loaded.
+
+        Returns:
+            bool: True if the indexes should be dropped for the load.
+        """
+        rows = self.conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+        return rows == 0 or has_more_lines(path, rows * DEFER_INDEXES_RATIO)
+
+    @contextmanager
+    def deferred_indexes(self, table):
+        """
+        Drops the secondary indexes of a table for the duration of a load and rebuilds them afterwards.
+
+        Indexes backing UNIQUE constraints and unique indexes are kept, since duplicate detection relies on them.
+
+        Args:
+            table (str): The name of the table being loaded.
+        """
+        indexes = self.conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+            "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%'",
+            (table,),
+        ).fetchall()
+        for name, _ in indexes:
+            self.conn.execute(f'DROP INDEX "{name}"')
+        try:
+            yield
+        finally:
+            for _, sql in indexes:
+                self.conn.execute(sql)
+
+    def load_rows(self, summary, path, statement, parse_row):
+        """
+        Streams one file into one table in batches, hashing only the passwords of new users.
+
+        Args:
+            summary (LoadSummary): The summary to record the results in.
+            path (str): The path of the CSV file.
+            statement (str): The INSERT OR IGNORE statement for one row.
+            parse_row (callable): Converts a list of fields into an insertable tuple.
+        """
+        def parsed_rows():
+            for line_num, fields in iter_csv_rows(path):
+                try:
+                    yield parse_row(fields)
+                except ValueError as error:
+                    summary.rejected.append((line_num, str(error)))
+
+        for batch in chunked(parsed_rows(), self.batch_size):
+            rows = self.hash_new_users(batch) if summary.table == "Users" else batch
+            inserted = self.conn.executemany(statement, rows).rowcount if rows else 0
+            summary.inserted += inserted
+            summary.duplicates += len(batch) - inserted
+
+    def load(self, users_file=None, books_file=None):
+        """
+        Loads the given Users and Books files in one transaction.
+
+        Args:
+            users_file (str): The path of a Users.txt-style file, or None to skip users.
+            books_file (str): The path of a Books.txt-style file, or None to skip books.
+
+        Returns:
+            list: A LoadSummary for each file that was loaded.
+        """
+        jobs = []
+        if users_file and os.path.exists(users_file):
+            jobs.append((
+                LoadSummary("Users"),
+                users_file,
+                "INSERT OR IGNORE INTO Users (username, password, user_type) VALUES (?, ?, ?)",
+                parse_user,
+            ))
+        if books_file and os.path.exists(books_file):
+            jobs.append((
+                LoadSummary("Books"),
+                books_file,
+                "INSERT OR IGNORE INTO Books (title, author, year, isbn, isbn13) VALUES (?, ?, ?, ?, ?)",
+                parse_book_row,
+            ))
+
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self.conn.execute("BEGIN")
+        try:
+            for summary, path, statement, parse_row in jobs:
+                deferred = self.should_defer_indexes(summary.table, path)
+                with self.deferred_indexes(summary.table) if deferred else nullcontext():
+                    self.load_rows(summary, path, statement, parse_row)
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return [job[0] for job in jobs]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import Users and Books files.")
+    parser.add_argument("--db", default="book_management.db", help="The SQLite database file.")
+    parser.add_argument("--users", default="Users.txt", help="The Users file to import.")
+    parser.add_argument("--books", default="Books.txt", help="The Books file to import.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per batch.")
+    parser.add_argument(
+        "--hash-iterations", type=int, default=DEFAULT_HASH_ITERATIONS, help="PBKDF2 iterations per password."
+    )
+    args = parser.parse_args()
+
+    loader = BulkLoader(
+        get_pool(args.db).connection(), batch_size=args.batch_size, hash_iterations=args.hash_iterations
+    )
+    for result in loader.load(users_file=args.users, books_file=args.books):
+        print(result)
@@ -0,0 +1,135 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module providing a bounded, thread-safe LRU cache with optional expiry for the Book Management System (BMS).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class LRUCache:
+    """
+    A bounded mapping that evicts the least recently used entry and can expire entries after a fixed time.
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        """
+        Initializes the LRUCache object.
+
+        Args:
+            max_size (int): The maximum number of entries kept in the cache.
+            ttl (float): The number of seconds an entry stays valid, or None to never expire.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, default=MISSING):
+        """
+        Looks up a key and marks it as recently used.
+
+        Args:
+            key (hashable): The key to look up.
+            default (object): The value returned when the key is absent or expired.
+
+        Returns:
+            object: The cached value, or `default` when there is none.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """
+        Stores a value, evicting the least recently used entry when the cache is full.
+
+        Args:
+            key (hashable): The key to store the value under.
+            value (object): The value to cache.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """
+        Removes a single key from the cache if it is present.
+
+        Args:
+            key (hashable): The key to remove.
+        """
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_where(self, predicate):
+        """
+        Removes every entry whose key satisfies a predicate.
+
+        Args:
+            predicate (callable): Called with each key; entries for which it returns True are removed.
+        """
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        """
+        Removes every entry from the cache.
+        """
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: The size, capacity, hit, miss, eviction, expiration and invalidation counts.
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def __len__(self):
+        """
+        Returns the number of entries currently cached.
+
+        Returns:
+            int: The number of entries, including any that have expired but not yet been removed.
+        """
+        return len(self._entries)
@@ -0,0 +1,473 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for an immutable, memory-mapped catalog file for the Book Management System (BMS). Exports the Books table once into fixed-width records, a string heap and sorted ISBN, author and year indexes, so read-only search workers can map the file and answer queries without loading anything, sharing one page-cache copy between processes.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import nsmallest
+
+# Search workers only need the reader, so this module avoids importing book_management and
+# its dependencies, which would cost more than opening the file.
+from connection_pool import get_pool
+from isbn import canonical_isbn, isbn_key
+
+MAGIC = b"BMSCAT\x00\x01"
+FORMAT_VERSION = 1
+# Arrays are written in the byte order of the machine that exports the file, so that readers
+# can cast them in place; a reader on a machine with the other byte order refuses the file.
+BYTE_ORDER = {"little": 1, "big": 2}[sys.byteorder]
+
+# Sections of the file, in the order they are written
+SECTIONS = (
+    "records",
+    "heap",
+    "authors",
+    "author_positions",
+    "isbn_keys",
+    "isbn_positions",
+    "other_isbn_positions",
+    "year_keys",
+    "year_positions",
+)
+# magic, format version, byte order, book count, author count, export time, then an
+# (offset, length) pair per section
+HEADER = struct.Struct("=8sIIQQd" + "QQ" * len(SECTIONS))
+# id, isbn13 key (0 for identifiers that are not ISBNs), title offset and length, ISBN offset
+# and length, year, author number
+RECORD = struct.Struct("=qqIIIIiI")
+# name offset and length, then the first index into author_positions and the book count
+AUTHOR = struct.Struct("=IIII")
+MAX_HEAP_SIZE = 2 ** 32 - 1
+# Stored as the year of books without one; sorts before every real year
+YEAR_UNKNOWN = -(2 ** 31)
+
+
+def pad(length):
+    """
+    Returns the padding that aligns a section end to 8 bytes, so every array can be cast in place.
+
+    Args:
+        length (int): The length of the section.
+
+    Returns:
+        bytes: Between 0 and 7 zero bytes.
+    """
+    return b"\x00" * (-length % 8)
+
+
+def write_catalog_file(db_name, path):
+    """
+    Exports the Books table to a catalog file.
+
+    The file is written next to its final path and renamed over it, so processes that have the
+    previous version mapped keep reading it undisturbed and new processes see the new one.
+
+    Args:
+        db_name (str): The name of the SQLite database file.
+        path (str): The path of the catalog file to write.
+
+    Returns:
+        int: The number of books exported.
+    """
+    heap = bytearray()
+    strings = {}
+
+    def store(text):
+        location = strings.get(text)
+        if location is None:
+            data = text.encode("utf-8")
+            location = strings[text] = (len(heap), len(data))
+            heap.extend(data)
+            if len(heap) > MAX_HEAP_SIZE:
+                raise ValueError("The catalog's strings do not fit in a 4GB heap.")
+        return location
+
+    records = bytearray()
+    keyed = []
+    others = []
+    years = []
+    conn = get_pool(db_name).connection()
+    if conn.in_transaction:
+        conn.commit()
+    # One read transaction, so the author list and the rows come from the same version
+    conn.execute("BEGIN")
+    try:
+        # SQLite compares TEXT bytewise, so authors are numbered in UTF-8 byte order
+        author_numbers = {
+            author: number
+            for number, (author,) in enumerate(conn.execute("SELECT DISTINCT author FROM Books ORDER BY author"))
+        }
+        author_books = [array("I") for _ in author_numbers]
+        rows = conn.execute("SELECT id, title, author, year, isbn FROM Books ORDER BY id")
+        for position, (book_id, title, author, year, book_isbn) in enumerate(rows):
+            number = author_numbers[author]
+            author_books[number].append(position)
+            key = isbn_key(book_isbn) if book_isbn is not None else None
+            if key is None:
+                others.append((str(book_isbn or "").encode("utf-8"), position))
+            else:
+                keyed.append((key, position))
+            year = YEAR_UNKNOWN if year is None else int(year)
+            years.append((year, position))
+            records += RECORD.pack(book_id, key or 0, *store(title), *store(book_isbn or ""), year, number)
+    finally:
+        conn.commit()
+    count = len(years)
+
+    authors = bytearray()
+    author_positions = array("I")
+    for author, number in author_numbers.items():
+        authors += AUTHOR.pack(*store(author), len(author_positions), len(author_books[number]))
+        author_positions.extend(author_books[number])
+
+    keyed.sort()
+    others.sort()
+    years.sort()
+    sections = {
+        "records": records,
+        "heap": heap,
+        "authors": authors,
+        "author_positions": author_positions.tobytes(),
+        "isbn_keys": array("q", (key for key, _ in keyed)).tobytes(),
+        "isbn_positions": array("I", (position for _, position in keyed)).tobytes(),
+        "other_isbn_positions": array("I", (position for _, position in others)).tobytes(),
+        "year_keys": array("i", (year for year, _ in years)).tobytes(),
+        "year_positions": array("I", (position for _, position in years)).tobytes(),
+    }
+
+    layout = []
+    offset = HEADER.size + len(pad(HEADER.size))
+    for name in SECTIONS:
+        layout += [offset, len(sections[name])]
+        offset += len(sections[name]) + len(pad(len(sections[name])))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as handle:
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER, count, len(author_numbers), time.time(), *layout)
+        handle.write(header + pad(len(header)))
+        for name in SECTIONS:
+            handle.write(sections[name])
+            handle.write(pad(len(sections[name])))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+    return count
+
+
+class CatalogFile:
+    """
+    A read-only view of a catalog file written by write_catalog_file.
+
+    Opening the file maps it and reads only the header; records, strings and indexes are
+    reached through memoryviews on the mapping, so pages are loaded on first use and shared
+    with every other process mapping the same file. Books are addressed by position, which
+    follows the book id. ISBN and year lookups binary-search sorted arrays cast in place, and
+    author lookups binary-search the author table sorted by name.
+    """
+
+    def __init__(self, path):
+        """
+        Initializes the CatalogFile object by mapping the file.
+
+        Args:
+            path (str): The path of the catalog file.
+
+        Raises:
+            ValueError: If the file is not a catalog file this version can read.
+        """
+        self.path = path
+        with open(path, "rb") as handle:
+            self.mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            fields = HEADER.unpack_from(self.mapping)
+            magic, version, byte_order, self.book_count, self.author_count, self.exported_at = fields[:6]
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a version {FORMAT_VERSION} catalog file.")
+            if byte_order != BYTE_ORDER:
+                raise ValueError(f"{path} was exported on a machine with a different byte order.")
+            layout = dict(zip(SECTIONS, zip(fields[6::2], fields[7::2])))
+            self.records = self.section(layout, "records")
+            self.heap = self.section(layout, "heap")
+            self.authors = self.section(layout, "authors")
+            self.author_positions = self.section(layout, "author_positions", "I")
+            self.isbn_keys = self.section(layout, "isbn_keys", "q")
+            self.isbn_positions = self.section(layout, "isbn_positions", "I")
+            self.other_isbn_positions = self.section(layout, "other_isbn_positions", "I")
+            self.year_keys = self.section(layout, "year_keys", "i")
+            self.year_positions = self.section(layout, "year_positions", "I")
+        except BaseException:
+            self.close()
+            raise
+
+    def section(self, layout, name, typecode=None):
+        """
+        Returns a zero-copy view of one section of the mapping.
+
+        Args:
+            layout (dict): The (offset, length) of each section, read from the header.
+            name (str): The name of the section.
+            typecode (str): The array type code to cast the section to, or None for bytes.
+
+        Returns:
+            memoryview: The section.
+        """
+        offset, length = layout[name]
+        view = memoryview(self.mapping)[offset:offset + length]
+        self._views.append(view)
+        if typecode is not None:
+            view = view.cast(typecode)
+            self._views.append(view)
+        return view
+
+    def close(self):
+        """
+        Releases the views handed out by this object and unmaps the file.
+
+        Views obtained from search results must not be used afterwards.
+        """
+        while self._views:
+            self._views.pop().release()
+        self.mapping.close()
+
+    def __enter__(self):
+        """
+        Returns the catalog file for use in a with statement.
+
+        Returns:
+            CatalogFile: This object.
+        """
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Closes the catalog file at the end of a with statement.
+        """
+        self.close()
+
+    def text(self, offset, length):
+        """
+        Decodes a string from the heap.
+
+        Args:
+            offset (int): The offset of the string in the heap.
+            length (int): The length of the string in bytes.
+
+        Returns:
+            str: The string.
+        """
+        return str(self.heap[offset:offset + length], "utf-8")
+
+    def author_entry(self, number):
+        """
+        Reads one entry of the author table.
+
+        Args:
+            number (int): The author number, which is the author's rank in name order.
+
+        Returns:
+            tuple: The name offset and length, the first index into author_positions, and the book count.
+        """
+        return AUTHOR.unpack_from(self.authors, number * AUTHOR.size)
+
+    def row(self, position):
+        """
+        Reassembles the book at a position.
+
+        Args:
+            position (int): The row position.
+
+        Returns:
+            tuple: The (id, title, author, year, isbn) tuple.
+        """
+        book_id, _, title_offset, title_length, isbn_offset, isbn_length, year, number = RECORD.unpack_from(
+            self.records, position * RECORD.size
+        )
+        name_offset, name_length = self.author_entry(number)[:2]
+        return (
+            book_id,
+            self.text(title_offset, title_length),
+            self.text(name_offset, name_length),
+            None if year == YEAR_UNKNOWN else year,
+            self.text(isbn_offset, isbn_length),
+        )
+
+    def isbn_position(self, book_isbn):
+        """
+        Finds the position of a book by ISBN.
+
+        Args:
+            book_isbn (str): The ISBN, in any spelling that canonical_isbn accepts.
+
+        Returns:
+            int: The row position, or None if the catalog does not hold the book.
+        """
+        key = isbn_key(book_isbn)
+        if key is not None:
+            index = bisect_left(self.isbn_keys, key)
+            if index < len(self.isbn_keys) and self.isbn_keys[index] == key:
+                return self.isbn_positions[index]
+            return None
+        wanted = str(canonical_isbn(book_isbn)).encode("utf-8")
+        positions = self.other_isbn_positions
+        low, high = 0, len(positions)
+        while low < high:
+            middle = (low + high) // 2
+            _, _, _, _, offset, length, _, _ = RECORD.unpack_from(self.records, positions[middle] * RECORD.size)
+            found = self.heap[offset:offset + length].tobytes()
+            if found == wanted:
+                return positions[middle]
+            if found < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def author_positions_of(self, author):
+        """
+        Finds the positions of an author's books by binary search over the author table.
+
+        Args:
+            author (str): The exact author name.
+
+        Returns:
+            memoryview: The positions of the author's books in id order, possibly empty.
+        """
+        wanted = author.encode("utf-8")
+        low, high = 0, self.author_count
+        while low < high:
+            middle = (low + high) // 2
+            offset, length, first, count = self.author_entry(middle)
+            found = self.heap[offset:offset + length].tobytes()
+            if found == wanted:
+                return self.author_positions[first:first + count]
+            if found < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        return self.author_positions[0:0]
+
+    def get_book(self, book_isbn):
+        """
+        Looks up a single book by ISBN.
+
+        Args:
+            book_isbn (str): The ISBN of the book.
+
+        Returns:
+            tuple: The (id, title, author, year, isbn) tuple of the book, or None if it is not in the catalog.
+        """
+        position = self.isbn_position(book_isbn)
+        return None if position is None else self.row(position)
+
+    def candidates(self, year_min=None, year_max=None, author=None, isbn=None):
+        """
+        Collects the positions matching each given filter from its index.
+
+        Args:
+            year_min (int): The earliest publication year, inclusive.
+            year_max (int): The latest publication year, inclusive.
+            author (str): The exact author name.
+            isbn (str): The ISBN, in any spelling that canonical_isbn accepts.
+
+        Returns:
+            list: One sequence of positions per filter given.
+        """
+        found = []
+        if isbn is not None:
+            position = self.isbn_position(isbn)
+            found.append(() if position is None else (position,))
+        if author is not None:
+            found.append(self.author_positions_of(author))
+        if year_min is not None or year_max is not None:
+            low = bisect_left(self.year_keys, YEAR_UNKNOWN + 1 if year_min is None else year_min)
+            high = len(self.year_keys) if year_max is None else bisect_right(self.year_keys, year_max)
+            found.append(self.year_positions[low:high])
+        return found
+
+    def filter(self, limit=None, **filters):
+        """
+        Finds the positions matching every given filter.
+
+        Args:
+            limit (int): The maximum number of positions to return, or None for all of them.
+            **filters: Any of year_min, year_max, author and isbn.
+
+        Returns:
+            list: The matching positions, in id order.
+        """
+        found = self.candidates(**filters)
+        if not found:
+            positions = range(self.book_count)
+        else:
+            found.sort(key=len)
+            positions = found[0]
+            for other in found[1:]:
+                keep = set(other)
+                positions = [position for position in positions if position in keep]
+        if limit is not None:
+            return nsmallest(limit, positions)
+        return sorted(positions)
+
+    def search(self, limit=None, **filters):
+        """
+        Returns the books matching every given filter.
+
+        Args:
+            limit (int): The maximum number of books to return, or None for all of them.
+            **filters: Any of year_min, year_max, author and isbn.
+
+        Returns:
+            list: (id, title, author, year, isbn) tuples in id order, like search_books.
+        """
+        return [self.row(position) for position in self.filter(limit=limit, **filters)]
+
+    def count(self, **filters):
+        """
+        Counts the books matching every given filter without materializing them.
+
+        Args:
+            **filters: Any of year_min, year_max, author and isbn.
+
+        Returns:
+            int: The number of matching books.
+        """
+        found = self.candidates(**filters)
+        if not found:
+            return self.book_count
+        if len(found) == 1:
+            return len(found[0])
+        return len(self.filter(**filters))
+
+    def __len__(self):
+        """
+        Returns the number of books in the catalog file.
+
+        Returns:
+            int: The number of books.
+        """
+        return self.book_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the BMS catalog to a memory-mapped catalog file.")
+    parser.add_argument("--db", default="book_management.db", help="The SQLite database file.")
+    parser.add_argument("--output", default="book_management.catalog", help="The catalog file to write.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    exported = write_catalog_file(args.db, args.output)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Wrote {exported:,} books to {args.output} "
+        f"({os.path.getsize(args.output):,} bytes) in {elapsed:.2f}s"
+    )
@@ -0,0 +1,456 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for an in-memory, column-oriented snapshot of the Book Management System (BMS) catalog. Keeps the Books table in compact arrays with hash and sorted indexes for fast range, equality and prefix filters, and follows a BookManagement's writes incrementally.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from heapq import nsmallest
+
+from book_management import BOOK_COLUMNS, DELETED
+from bulk_loader import chunked
+from isbn import canonical_isbn
+from connection_pool import BATCH_LOOKUP_SIZE, get_pool, placeholders
+
+# Books without a year are stored with this value and never match a year filter.
+YEAR_UNKNOWN = -(2 ** 31)
+# Rebuild the indexes once this share of the rows has been deleted.
+COMPACT_RATIO = 0.25
+LOAD_CHUNK_SIZE = 5000
+
+
+class BookRecord:
+    """
+    One book materialized from a snapshot.
+    """
+
+    __slots__ = ("id", "title", "author", "year", "isbn")
+
+    def __init__(self, book_id, title, author, year, isbn):
+        """
+        Initializes the BookRecord object.
+
+        Args:
+            book_id (int): The id of the book.
+            title (str): The title of the book.
+            author (str): The author of the book.
+            year (int): The publication year, or None.
+            isbn (str): The ISBN of the book.
+        """
+        self.id = book_id
+        self.title = title
+        self.author = author
+        self.year = year
+        self.isbn = isbn
+
+    def as_tuple(self):
+        """
+        Returns the record in the (id, title, author, year, isbn) form returned by search_books.
+
+        Returns:
+            tuple: The book's fields.
+        """
+        return self.id, self.title, self.author, self.year, self.isbn
+
+    def __repr__(self):
+        """
+        Returns a readable representation of the record.
+
+        Returns:
+            str: The record's fields.
+        """
+        return f"BookRecord{self.as_tuple()!r}"
+
+
+class CatalogSnapshot:
+    """
+    A read-optimized copy of the Books table.
+
+    Every column is stored once per book in a typed array: titles are packed into one UTF-8
+    heap addressed by offsets, and authors are dictionary-encoded so each distinct name is
+    kept only once. Rows are addressed
+    by position: ISBN and author lookups go through hash indexes, and year ranges and title
+    prefixes through arrays of positions kept sorted by year and by case-folded title.
+    Deletions leave a tombstone until enough of them accumulate to rebuild the indexes.
+    """
+
+    def __init__(self, db_name="book_management.db"):
+        """
+        Initializes the CatalogSnapshot object. Call load() or attach() to fill it.
+
+        Args:
+            db_name (str): The name of the SQLite database file.
+        """
+        self.db_name = db_name
+        self.pool = get_pool(db_name)
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        """
+        Empties the columns and indexes.
+        """
+        with self._lock:
+            self.ids = array("q")
+            self.years = array("i")
+            self.author_codes = array("i")
+            self.title_heap = bytearray()
+            self.title_offsets = array("q", [0])
+            self.isbns = []
+            self.alive = bytearray()
+            self.deleted = 0
+            self.authors = []
+            self.author_lookup = {}
+            self.isbn_index = {}
+            self.author_index = {}
+            self.year_order = array("i")
+            self.year_keys = array("i")
+            self.title_order = array("i")
+
+    def load(self, chunk_size=LOAD_CHUNK_SIZE):
+        """
+        Rebuilds the snapshot from the Books table, streaming it in chunks.
+
+        Args:
+            chunk_size (int): The number of rows fetched at a time.
+
+        Returns:
+            int: The number of books loaded.
+        """
+        cursor = self.pool.connection().execute(f"SELECT {BOOK_COLUMNS} FROM Books ORDER BY Books.id")
+        with self._lock:
+            self.clear()
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    self.append_row(row)
+            self.build_indexes()
+            return len(self)
+
+    def author_code(self, author):
+        """
+        Returns the dictionary code of an author, adding the author if needed.
+
+        Args:
+            author (str): The author's name.
+
+        Returns:
+            int: The code stored in the author_codes column.
+        """
+        code = self.author_lookup.get(author)
+        if code is None:
+            code = len(self.authors)
+            self.authors.append(author)
+            self.author_lookup[author] = code
+        return code
+
+    def append_row(self, row):
+        """
+        Appends a Books row to the columns without touching the sorted indexes.
+
+        Args:
+            row (tuple): An (id, title, author, year, isbn) tuple.
+
+        Returns:
+            int: The position of the new row.
+        """
+        book_id, title, author, year, isbn = row
+        position = len(self.ids)
+        code = self.author_code(author)
+        self.ids.append(book_id)
+        self.years.append(YEAR_UNKNOWN if year is None else int(year))
+        self.author_codes.append(code)
+        self.title_heap += title.encode("utf-8")
+        self.title_offsets.append(len(self.title_heap))
+        self.isbns.append(isbn)
+        self.alive.append(1)
+        self.isbn_index[isbn] = position
+        self.author_index.setdefault(code, array("i")).append(position)
+        return position
+
+    def title(self, position):
+        """
+        Decodes the title at a position from the title heap.
+
+        Args:
+            position (int): The row position.
+
+        Returns:
+            str: The title of the book.
+        """
+        return self.title_heap[self.title_offsets[position]:self.title_offsets[position + 1]].decode("utf-8")
+
+    def build_indexes(self):
+        """
+        Sorts every live position by year and by case-folded title.
+        """
+        live = [position for position in range(len(self.ids)) if self.alive[position]]
+        by_year = sorted(live, key=lambda position: (self.years[position], self.ids[position]))
+        self.year_order = array("i", by_year)
+        self.year_keys = array("i", (self.years[position] for position in by_year))
+        self.title_order = array("i", sorted(live, key=lambda position: self.title(position).casefold()))
+
+    def title_insertion_point(self, key, right=False):
+        """
+        Binary-searches title_order for a case-folded title.
+
+        Args:
+            key (str): The case-folded title or prefix.
+            right (bool): Whether to return the position after equal titles instead of before them.
+
+        Returns:
+            int: The index into title_order.
+        """
+        low, high = 0, len(self.title_order)
+        while low < high:
+            middle = (low + high) // 2
+            title = self.title(self.title_order[middle]).casefold()
+            if title < key or (right and title == key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def add_row(self, row):
+        """
+        Adds a book and slots it into the sorted indexes.
+
+        Args:
+            row (tuple): An (id, title, author, year, isbn) tuple.
+        """
+        if row[4] in self.isbn_index:
+            self.remove_isbn(row[4])
+        position = self.append_row(row)
+        year = self.years[position]
+        index = bisect_right(self.year_keys, year)
+        self.year_keys.insert(index, year)
+        self.year_order.insert(index, position)
+        self.title_order.insert(self.title_insertion_point(row[1].casefold(), right=True), position)
+
+    def remove_isbn(self, isbn):
+        """
+        Marks a book as deleted, compacting the snapshot when tombstones pile up.
+
+        Args:
+            isbn (str): The ISBN of the deleted book.
+        """
+        position = self.isbn_index.pop(isbn, None)
+        if position is None:
+            return
+        self.alive[position] = 0
+        self.deleted += 1
+        if self.deleted > COMPACT_RATIO * len(self.ids):
+            self.compact()
+
+    def compact(self):
+        """
+        Drops deleted rows and rebuilds every index from the live columns.
+        """
+        rows = [self.row(position) for position in range(len(self.ids)) if self.alive[position]]
+        self.clear()
+        for row in rows:
+            self.append_row(row)
+        self.build_indexes()
+
+    def row(self, position):
+        """
+        Reassembles the Books row at a position.
+
+        Args:
+            position (int): The row position.
+
+        Returns:
+            tuple: The (id, title, author, year, isbn) tuple.
+        """
+        year = self.years[position]
+        return (
+            self.ids[position],
+            self.title(position),
+            self.authors[self.author_codes[position]],
+            None if year == YEAR_UNKNOWN else year,
+            self.isbns[position],
+        )
+
+    def on_change(self, status, book_isbns):
+        """
+        Applies the changes reported to a BookManagement listener.
+
+        Added books are read back from the database by ISBN, so the snapshot holds the same ids.
+
+        Args:
+            status (str): INSERTED or DELETED.
+            book_isbns (list): The ISBNs of the books that changed.
+        """
+        if status == DELETED:
+            with self._lock:
+                for isbn in book_isbns:
+                    self.remove_isbn(isbn)
+            return
+        conn = self.pool.connection()
+        for isbns in chunked(book_isbns, BATCH_LOOKUP_SIZE):
+            rows = conn.execute(
+                f"SELECT {BOOK_COLUMNS} FROM Books WHERE isbn IN ({placeholders(len(isbns))})", isbns
+            ).fetchall()
+            with self._lock:
+                for row in rows:
+                    self.add_row(row)
+
+    def attach(self, book_manager):
+        """
+        Loads the snapshot and keeps it in step with a BookManagement's writes.
+
+        Writes made by other BookManagement objects or processes are not seen until the next load().
+
+        Args:
+            book_manager (BookManagement): The object whose add and delete operations to follow.
+
+        Returns:
+            CatalogSnapshot: This snapshot.
+        """
+        book_manager.add_listener(self.on_change)
+        self.load()
+        return self
+
+    def candidates(self, year_min=None, year_max=None, author=None, title_prefix=None, isbn=None):
+        """
+        Collects the positions matching each given filter from its index.
+
+        Args:
+            year_min (int): The earliest publication year, inclusive.
+            year_max (int): The latest publication year, inclusive.
+            author (str): The exact author name.
+            title_prefix (str): A case-insensitive title prefix.
+            isbn (str): The ISBN, in any spelling that canonical_isbn accepts.
+
+        Returns:
+            list: One sequence of positions per filter given.
+        """
+        found = []
+        if isbn is not None:
+            position = self.isbn_index.get(canonical_isbn(isbn))
+            found.append(() if position is None else (position,))
+        if author is not None:
+            code = self.author_lookup.get(author)
+            found.append(self.author_index.get(code, ()) if code is not None else ())
+        if year_min is not None or year_max is not None:
+            low = bisect_left(self.year_keys, YEAR_UNKNOWN + 1 if year_min is None else year_min)
+            high = len(self.year_keys) if year_max is None else bisect_right(self.year_keys, year_max)
+            found.append(self.year_order[low:high])
+        if title_prefix:
+            key = title_prefix.casefold()
+            low = self.title_insertion_point(key)
+            high = self.title_insertion_point(key + "\U0010ffff")
+            found.append(self.title_order[low:high])
+        return found
+
+    def filter(self, limit=None, **filters):
+        """
+        Finds the live positions matching every given filter.
+
+        The smallest index result drives the scan and the others are intersected with it.
+        Positions grow with the book id, so the lowest positions are the lowest ids.
+
+        Args:
+            limit (int): The maximum number of positions to return, or None for all of them.
+            **filters: Any of year_min, year_max, author, title_prefix and isbn.
+
+        Returns:
+            list: The matching positions, in id order.
+        """
+        with self._lock:
+            found = self.candidates(**filters)
+            if not found:
+                positions = range(len(self.ids))
+            else:
+                found.sort(key=len)
+                positions = found[0]
+                for other in found[1:]:
+                    keep = set(other)
+                    positions = [position for position in positions if position in keep]
+            if self.deleted:
+                alive = self.alive
+                positions = [position for position in positions if alive[position]]
+            if limit is not None:
+                return nsmallest(limit, positions)
+            return sorted(positions)
+
+    def search(self, limit=None, **filters):
+        """
+        Returns the books matching every given filter.
+
+        Args:
+            limit (int): The maximum number of books to return, or None for all of them.
+            **filters: Any of year_min, year_max, author, title_prefix and isbn.
+
+        Returns:
+            list: BookRecord objects in id order.
+        """
+        positions = self.filter(limit=limit, **filters)
+        with self._lock:
+            return [BookRecord(*self.row(position)) for position in positions]
+
+    def count(self, **filters):
+        """
+        Counts the books matching every given filter without materializing them.
+
+        Args:
+            **filters: Any of year_min, year_max, author, title_prefix and isbn.
+
+        Returns:
+            int: The number of matching books.
+        """
+        if not filters:
+            return len(self)
+        with self._lock:
+            found = self.candidates(**filters)
+            if len(found) == 1 and not self.deleted:
+                return len(found[0])
+            return len(self.filter(**filters))
+
+    def count_by_author(self, **filters):
+        """
+        Counts the books per author, optionally within a filter.
+
+        Args:
+            **filters: Any of year_min, year_max, author, title_prefix and isbn.
+
+        Returns:
+            dict: Book counts keyed by author, most books first.
+        """
+        with self._lock:
+            if filters:
+                codes = Counter(self.author_codes[position] for position in self.filter(**filters))
+            else:
+                codes = Counter(code for code, alive in zip(self.author_codes, self.alive) if alive)
+            return {self.authors[code]: count for code, count in codes.most_common()}
+
+    def count_by_year(self, **filters):
+        """
+        Counts the books per publication year, optionally within a filter.
+
+        Args:
+            **filters: Any of year_min, year_max, author, title_prefix and isbn.
+
+        Returns:
+            dict: Book counts keyed by year, in year order.
+        """
+        with self._lock:
+            positions = self.filter(**filters) if filters else self.year_order
+            years = Counter(self.years[position] for position in positions if self.alive[position])
+            years.pop(YEAR_UNKNOWN, None)
+            return dict(sorted(years.items()))
+
+    def __len__(self):
+        """
+        Returns the number of live books in the snapshot.
+
+        Returns:
+            int: The number of books.
+        """
+        return len(self.ids) - self.deleted
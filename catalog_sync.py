@@ -0,0 +1,383 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for incrementally syncing the Book Management System (BMS) with refreshed Books and Users feeds. Skips files that have not changed since the last sync and applies only the inserted, updated and deleted rows in one transaction.
+"""
+
+import argparse
+import hashlib
+import os
+
+from bulk_loader import DEFAULT_BATCH_SIZE, chunked, iter_csv_rows, parse_book, parse_user
+from connection_pool import BATCH_LOOKUP_SIZE, get_pool, placeholders
+from existence_filter import refresh_existence_filters
+from migrations import ensure_schema
+from security import DEFAULT_HASH_ITERATIONS, hash_password
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class SyncSummary:
+    """
+    Collects the outcome of syncing one feed file into one table.
+    """
+
+    def __init__(self, table, path):
+        """
+        Initializes the SyncSummary object.
+
+        Args:
+            table (str): The name of the table being synced.
+            path (str): The path of the feed file.
+        """
+        self.table = table
+        self.path = path
+        self.skipped = False
+        self.inserted = 0
+        self.updated = 0
+        self.deleted = 0
+        self.unchanged = 0
+        self.kept_on_loan = 0
+        self.rejected = []
+
+    def __str__(self):
+        """
+        Returns a one-line, human-readable summary of the sync.
+
+        Returns:
+            str: The summary text.
+        """
+        if self.skipped:
+            return f"{self.table}: {self.path} is unchanged since the last sync"
+        return (
+            f"{self.table}: {self.inserted} inserted, {self.updated} updated, {self.deleted} deleted, "
+            f"{self.unchanged} unchanged, {self.kept_on_loan} kept while on loan, {len(self.rejected)} rejected"
+        )
+
+
+def file_digest(path):
+    """
+    Computes the SHA-256 digest of a file in fixed-size blocks.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CatalogSync:
+    """
+    Applies the difference between feed files and the database instead of reloading every row.
+    """
+
+    def __init__(
+        self,
+        db_name="book_management.db",
+        batch_size=DEFAULT_BATCH_SIZE,
+        hash_iterations=DEFAULT_HASH_ITERATIONS,
+    ):
+        """
+        Initializes the CatalogSync object.
+
+        Args:
+            db_name (str): The name of the SQLite database file.
+            batch_size (int): The number of feed rows staged per executemany call.
+            hash_iterations (int): The PBKDF2 iteration count for the passwords of new users.
+        """
+        self.db_name = db_name
+        self.batch_size = batch_size
+        self.hash_iterations = hash_iterations
+        self.pool = get_pool(db_name)
+        ensure_schema(db_name)
+
+    def connect_db(self):
+        """
+        Returns the calling thread's pooled connection to the SQLite database.
+
+        Returns:
+            sqlite3.Connection: A long-lived connection object to the SQLite database.
+        """
+        return self.pool.connection()
+
+    def file_changed(self, cursor, path):
+        """
+        Compares a feed file with the fingerprint recorded by the last sync.
+
+        The modification time and size are checked first; the file is only hashed when they differ,
+        so touching a file without changing it does not trigger a sync either.
+
+        Args:
+            cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+            path (str): The path of the feed file.
+
+        Returns:
+            tuple: Whether the contents changed, and the (mtime, size, sha256) fingerprint to record.
+        """
+        stat = os.stat(path)
+        cursor.execute("SELECT mtime, size, sha256 FROM SyncState WHERE path = ?", (os.path.abspath(path),))
+        state = cursor.fetchone()
+        if state and state[0] == stat.st_mtime and state[1] == stat.st_size:
+            return False, state
+        digest = file_digest(path)
+        return not state or state[2] != digest, (stat.st_mtime, stat.st_size, digest)
+
+    def record_state(self, cursor, path, fingerprint):
+        """
+        Stores the fingerprint of a synced feed file.
+
+        Args:
+            cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+            path (str): The path of the feed file.
+            fingerprint (tuple): The (mtime, size, sha256) of the file.
+        """
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO SyncState (path, mtime, size, sha256, synced_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            (os.path.abspath(path),) + tuple(fingerprint),
+        )
+
+    def stage_books(self, cursor, path, summary):
+        """
+        Loads a Books feed into the temporary FeedBooks table. The first row for each ISBN wins.
+
+        Args:
+            cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+            path (str): The path of the Books feed.
+            summary (SyncSummary): The summary to record rejected rows in.
+        """
+        cursor.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS FeedBooks (
+                isbn TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                author TEXT NOT NULL,
+                year INTEGER
+            ) WITHOUT ROWID
+            """
+        )
+        cursor.execute("DELETE FROM FeedBooks")
+
+        def parsed_rows():
+            for line_num, fields in iter_csv_rows(path):
+                try:
+                    title, author, year, isbn = parse_book(fields)
+                except ValueError as error:
+                    summary.rejected.append((line_num, str(error)))
+                    continue
+                yield isbn, title, author, year
+
+        for batch in chunked(parsed_rows(), self.batch_size):
+            cursor.executemany(
+                "INSERT OR IGNORE INTO FeedBooks (isbn, title, author, year) VALUES (?, ?, ?, ?)", batch
+            )
+
+    def apply_books(self, cursor, summary, delete_missing):
+        """
+        Applies the difference between FeedBooks and Books.
+
+        Copy counts and loans are left alone. With delete_missing, books missing from the feed are
+        deleted unless copies are on loan, in which case they are kept and counted so that no open
+        loan loses its book. Without it, books added outside the feed, such as through the app, are kept.
+
+        Args:
+            cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+            summary (SyncSummary): The summary to record the counts in.
+            delete_missing (bool): Whether books missing from the feed are deleted.
+        """
+        changed = """
+            SELECT FeedBooks.isbn FROM FeedBooks JOIN Books ON Books.isbn = FeedBooks.isbn
+            WHERE Books.title IS NOT FeedBooks.title
+               OR Books.author IS NOT FeedBooks.author
+               OR Books.year IS NOT FeedBooks.year
+        """
+        cursor.execute(
+            f"""
+            UPDATE Books SET (title, author, year) = (
+                SELECT title, author, year FROM FeedBooks WHERE FeedBooks.isbn = Books.isbn
+            )
+            WHERE isbn IN ({changed})
+            """
+        )
+        summary.updated = cursor.rowcount
+
+        cursor.execute(
+            """
+            INSERT INTO Books (title, author, year, isbn, isbn13)
+            SELECT title, author, year, isbn, CAST(isbn AS INTEGER) FROM FeedBooks
+            WHERE NOT EXISTS (SELECT 1 FROM Books WHERE Books.isbn = FeedBooks.isbn)
+            """
+        )
+        summary.inserted = cursor.rowcount
+
+        if delete_missing:
+            missing = "isbn IS NOT NULL AND NOT EXISTS (SELECT 1 FROM FeedBooks WHERE FeedBooks.isbn = Books.isbn)"
+            cursor.execute(f"SELECT COUNT(*) FROM Books WHERE {missing} AND copies > available")
+            summary.kept_on_loan = cursor.fetchone()[0]
+            cursor.execute(f"DELETE FROM Books WHERE {missing} AND copies <= available")
+            summary.deleted = cursor.rowcount
+
+        cursor.execute("SELECT COUNT(*) FROM FeedBooks")
+        summary.unchanged = cursor.fetchone()[0] - summary.updated - summary.inserted
+        cursor.execute("DELETE FROM FeedBooks")
+
+    def sync_books(self, books_file, delete_missing=False, force=False):
+        """
+        Syncs the Books table with a Books feed in one transaction.
+
+        Args:
+            books_file (str): The path of a Books.txt-style feed.
+            delete_missing (bool): Whether books missing from the feed are deleted.
+            force (bool): Whether to sync even when the file is unchanged since the last sync.
+
+        Returns:
+            SyncSummary: The outcome of the sync.
+        """
+        return self.run_sync("Books", books_file, force, self.apply_books_feed, delete_missing)
+
+    def apply_books_feed(self, cursor, path, summary, delete_missing):
+        """
+        Stages and applies a Books feed inside the caller's transaction.
+
+        Args:
+            cursor (sqlite3.Cursor): A cursor on a connection with an open write transaction.
+            path (str): The path of the Books feed.
+            summary (SyncSummary): The summary to record the outcome in.
+            delete_missing (bool): Whether books missing from the feed are deleted.
+        """
+        self.stage_books(cursor, path, summary)
+        self.apply_books(cursor, summary, delete_missing)
+
+    def sync_users(self, users_file, force=False):
+        """
+        Adds the users of a Users feed that are not in the database yet.
+
+        Existing users are never changed, so passwords set since the last import are kept.
+
+        Args:
+            users_file (str): The path of a Users.txt-style feed.
+            force (bool): Whether to sync even when the file is unchanged since the last sync.
+
+        Returns:
+            SyncSummary: The outcome of the sync.
+        """
+        return self.run_sync("Users", users_file, force, self.apply_users_feed)
+
+    def apply_users_feed(self, cursor, path, summary):
+        """
+        Inserts the new users of a Users feed inside the caller's transaction.
+
+        Existing usernames are filtered out batch by batch before any password is hashed,
+        so a feed of mostly known users costs one indexed lookup per row rather than one hash.
+
+        Args:
+            cursor (sqlite3.Cursor): A cursor on a connection with an open write transaction.
+            path (str): The path of the Users feed.
+            summary (SyncSummary): The summary to record the outcome in.
+        """
+        def parsed_rows():
+            for line_num, fields in iter_csv_rows(path):
+                try:
+                    yield parse_user(fields)
+                except ValueError as error:
+                    summary.rejected.append((line_num, str(error)))
+
+        for batch in chunked(parsed_rows(), BATCH_LOOKUP_SIZE):
+            names = [row[0] for row in batch]
+            cursor.execute(
+                f"SELECT username FROM Users WHERE username IN ({placeholders(len(names))})", names
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            new_users = {}
+            for username, password, user_type in batch:
+                if username not in existing and username not in new_users:
+                    new_users[username] = (username, hash_password(password, self.hash_iterations), user_type)
+            cursor.executemany(
+                "INSERT OR IGNORE INTO Users (username, password, user_type) VALUES (?, ?, ?)",
+                list(new_users.values()),
+            )
+            summary.inserted += cursor.rowcount if new_users else 0
+            summary.unchanged += len(batch) - len(new_users)
+
+    def run_sync(self, table, path, force, apply, *args):
+        """
+        Runs one feed sync as an immediate transaction, skipping files that have not changed.
+
+        Args:
+            table (str): The name of the table being synced.
+            path (str): The path of the feed file.
+            force (bool): Whether to sync even when the file is unchanged since the last sync.
+            apply (callable): Called with (cursor, path, summary, *args) to apply the feed.
+            *args: Extra arguments for apply.
+
+        Returns:
+            SyncSummary: The outcome of the sync.
+        """
+        summary = SyncSummary(table, path)
+        conn = self.connect_db()
+        if conn.in_transaction:
+            conn.commit()
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            changed, fingerprint = self.file_changed(cursor, path)
+            if changed or force:
+                apply(cursor, path, summary, *args)
+            else:
+                summary.skipped = True
+            self.record_state(cursor, path, fingerprint)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        if not summary.skipped:
+            refresh_existence_filters(self.db_name)
+        return summary
+
+    def sync(self, users_file=None, books_file=None, delete_missing=False, force=False):
+        """
+        Syncs the given Users and Books feeds.
+
+        Args:
+            users_file (str): The path of a Users.txt-style feed, or None to skip users.
+            books_file (str): The path of a Books.txt-style feed, or None to skip books.
+            delete_missing (bool): Whether books missing from the feed are deleted.
+            force (bool): Whether to sync files that are unchanged since the last sync.
+
+        Returns:
+            list: A SyncSummary for each file that exists.
+        """
+        summaries = []
+        if users_file and os.path.exists(users_file):
+            summaries.append(self.sync_users(users_file, force))
+        if books_file and os.path.exists(books_file):
+            summaries.append(self.sync_books(books_file, delete_missing, force))
+        return summaries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply only the changes in refreshed Users and Books feeds.")
+    parser.add_argument("--db", default="book_management.db", help="The SQLite database file.")
+    parser.add_argument("--users", default="Users.txt", help="The Users feed.")
+    parser.add_argument("--books", default="Books.txt", help="The Books feed.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows staged per batch.")
+    parser.add_argument(
+        "--delete-missing", action="store_true", help="Delete books that are missing from the feed."
+    )
+    parser.add_argument("--force", action="store_true", help="Sync even if the files are unchanged.")
+    args = parser.parse_args()
+
+    syncer = CatalogSync(args.db, batch_size=args.batch_size)
+    for result in syncer.sync(args.users, args.books, delete_missing=args.delete_missing, force=args.force):
+        print(result)
+        for line_num, reason in result.rejected:
+            print(f"  line {line_num}: {reason}")
@@ -0,0 +1,225 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for sharing long-lived SQLite connections in the Book Management System (BMS). Provides per-thread connections with WAL journaling, tuned PRAGMAs and cached prepared statements, and read-only pools for readers that must never take the write lock.
+"""
+
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+
+# Default PRAGMA values applied to every pooled connection.
+DEFAULT_SYNCHRONOUS = "NORMAL"
+DEFAULT_CACHE_SIZE = -64000  # Negative values are KiB, so roughly 64 MB of page cache.
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+DEFAULT_CACHED_STATEMENTS = 256
+# Number of values bound per IN (...) query by batch lookups, well under SQLite's parameter limit
+BATCH_LOOKUP_SIZE = 500
+
+# Connection class and setup callbacks used for every new pooled connection. Instrumentation
+# replaces these to time statements; they only affect connections opened afterwards.
+_connection_factory = sqlite3.Connection
+_connection_hooks = []
+
+
+def placeholders(count):
+    """
+    Builds the parameter list of an IN (...) clause.
+
+    Args:
+        count (int): The number of parameters.
+
+    Returns:
+        str: The comma-separated placeholders.
+    """
+    return ", ".join("?" * count)
+
+
+def set_connection_factory(factory):
+    """
+    Sets the sqlite3.Connection subclass used for connections opened from now on.
+
+    Args:
+        factory (type): A subclass of sqlite3.Connection.
+    """
+    global _connection_factory
+    _connection_factory = factory
+
+
+def add_connection_hook(hook):
+    """
+    Registers a callback that configures every connection opened from now on.
+
+    Args:
+        hook (callable): Called with each new sqlite3.Connection.
+    """
+    if hook not in _connection_hooks:
+        _connection_hooks.append(hook)
+
+
+def remove_connection_hook(hook):
+    """
+    Unregisters a callback added with add_connection_hook.
+
+    Args:
+        hook (callable): The callback to remove.
+    """
+    if hook in _connection_hooks:
+        _connection_hooks.remove(hook)
+
+
+class ConnectionPool:
+    """
+    Hands out one long-lived SQLite connection per thread for a single database file.
+    """
+
+    def __init__(
+        self,
+        db_name,
+        synchronous=DEFAULT_SYNCHRONOUS,
+        cache_size=DEFAULT_CACHE_SIZE,
+        mmap_size=DEFAULT_MMAP_SIZE,
+        cached_statements=DEFAULT_CACHED_STATEMENTS,
+        read_only=False,
+    ):
+        """
+        Initializes the ConnectionPool object.
+
+        Args:
+            db_name (str): The name of the SQLite database file.
+            synchronous (str): The value for PRAGMA synchronous (OFF, NORMAL, FULL).
+            cache_size (int): The value for PRAGMA cache_size.
+            mmap_size (int): The value for PRAGMA mmap_size in bytes.
+            cached_statements (int): The number of prepared statements kept per connection.
+            read_only (bool): Whether to open connections with a mode=ro URI. Read-only connections
+                rely on a read-write connection having switched the database to WAL.
+        """
+        self.db_name = db_name
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.read_only = read_only
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self.opened = 0
+
+    def open_connection(self):
+        """
+        Opens and configures a new SQLite connection.
+
+        Returns:
+            sqlite3.Connection: A configured connection object to the SQLite database.
+        """
+        if self.read_only:
+            target, uri = f"file:{quote(os.path.abspath(self.db_name))}?mode=ro", True
+        else:
+            target, uri = self.db_name, False
+        conn = sqlite3.connect(
+            target,
+            uri=uri,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            factory=_connection_factory,
+        )
+        if self.read_only:
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA foreign_keys = ON")
+        for hook in _connection_hooks:
+            hook(conn)
+        return conn
+
+    def connection(self):
+        """
+        Returns the connection owned by the calling thread, opening it on first use.
+
+        Returns:
+            sqlite3.Connection: The calling thread's connection to the SQLite database.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.open_connection()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+                self.opened += 1
+        return conn
+
+    def connection_count(self):
+        """
+        Returns the number of connections currently open in the pool.
+
+        Returns:
+            int: The number of open connections.
+        """
+        with self._lock:
+            return len(self._connections)
+
+    def close_all(self):
+        """
+        Closes every connection opened by the pool, from any thread.
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name="book_management.db", read_only=False):
+    """
+    Returns the shared ConnectionPool for a database file, creating it on first use.
+
+    Args:
+        db_name (str): The name of the SQLite database file.
+        read_only (bool): Whether to return the file's read-only pool instead of its read-write pool.
+
+    Returns:
+        ConnectionPool: The pool shared by every caller using the same database file and mode.
+    """
+    key = os.path.abspath(db_name) + (" (read-only)" if read_only else "")
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_name, read_only=read_only)
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    """
+    Closes every pooled connection for every database file.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+def pool_stats():
+    """
+    Returns the connection counts of every shared pool.
+
+    Returns:
+        dict: The open and total opened connection counts keyed by database path.
+    """
+    with _pools_lock:
+        pools = dict(_pools)
+    return {
+        path: {"open": pool.connection_count(), "opened": pool.opened}
+        for path, pool in pools.items()
+    }
@@ -5,8 +5,12 @@ Python3 Version: Python 3.9.6
 Description: Module for managing a SQLite database for a Book Management System (BMS). Includes database setup, user management, and book inventory features.
 """
 
-import sqlite3
-import os
+from bulk_loader import BulkLoader, DEFAULT_BATCH_SIZE
+from catalog_sync import CatalogSync
+from connection_pool import get_pool
+from migrations import migrate
+from parallel_loader import ParallelLoader
+from security import DEFAULT_HASH_ITERATIONS, HASH_ALGORITHM, hash_password
 
 
 class DatabaseSetup:
@@ -14,99 +18,119 @@ class DatabaseSetup:
     Handles SQLite database setup and initial data loading(Users and Books table) for the Book Management System.
     """
 
-    def __init__(self, db_name="book_management.db"):
+    def __init__(
+        self,
+        db_name="book_management.db",
+        users_file="Users.txt",
+        books_file="Books.txt",
+        batch_size=DEFAULT_BATCH_SIZE,
+        hash_iterations=DEFAULT_HASH_ITERATIONS,
+        workers=1,
+    ):
         """
         Initializes the DatabaseSetup object.
 
         Args:
             db_name (str): The name of the SQLite database file.
+            users_file (str): The path of the file with the initial users.
+            books_file (str): The path of the file with the initial books.
+            batch_size (int): The number of rows inserted per batch during the initial load.
+            hash_iterations (int): The PBKDF2 iteration count for stored passwords.
+            workers (int): The number of processes parsing the books file during the initial load;
+                more than 1 loads it with ParallelLoader.
         """
         self.db_name = db_name
+        self.users_file = users_file
+        self.books_file = books_file
+        self.batch_size = batch_size
+        self.hash_iterations = hash_iterations
+        self.workers = workers
+        self.pool = get_pool(db_name)
 
     def connect_db(self):
         """
-        Connects to the SQLite database.
+        Returns the calling thread's pooled connection to the SQLite database.
 
         Returns:
-            sqlite3.Connection: A connection object to the SQLite database.
+            sqlite3.Connection: A long-lived connection object to the SQLite database.
         """
-        return sqlite3.connect(self.db_name)
+        return self.pool.connection()
 
-    def setup_database(self):
+    def setup_database(self, incremental=False, delete_missing=False):
         """
-        Sets up the database by creating necessary tables and loading initial data from text files.
+        Sets up the database by applying pending schema migrations and loading initial data from text files.
+
+        Args:
+            incremental (bool): Whether to sync the files with CatalogSync, applying only the rows that changed
+                since the last sync, instead of inserting every row that is not in the database yet.
+            delete_missing (bool): Whether an incremental sync deletes the books missing from the books
+                file, including books added through the app. Off unless explicitly requested.
         """
         conn = self.connect_db()
         cursor = conn.cursor()
 
-        # Create Users table
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                password TEXT NOT NULL,
-                user_type TEXT NOT NULL CHECK(user_type IN ('admin', 'user'))
-            )
-            """
-        )
-
-        # Create Books table
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Books (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                author TEXT NOT NULL,
-                year INTEGER,
-                isbn TEXT UNIQUE
-            )
-            """
-        )
+        migrate(conn, verbose=True)
+        self.hash_plaintext_passwords(cursor)
 
         conn.commit()
-        self.load_initial_data(cursor)
+        if incremental:
+            self.sync_initial_data(delete_missing)
+        else:
+            self.load_initial_data(cursor)
         conn.commit()
-        conn.close()
+
+    def hash_plaintext_passwords(self, cursor):
+        """
+        Replaces the plaintext passwords of databases created before password hashing with salted hashes.
+
+        Args:
+            cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+        """
+        cursor.execute("SELECT id, password FROM Users WHERE password NOT LIKE ?", (HASH_ALGORITHM + "$%",))
+        rows = cursor.fetchall()
+        cursor.executemany(
+            "UPDATE Users SET password = ? WHERE id = ?",
+            [(hash_password(password, self.hash_iterations), user_id) for user_id, password in rows],
+        )
 
     def load_initial_data(self, cursor):
         """
         Loads initial data for Users and Books tables from text files.
 
+        Rows whose username or ISBN already exists are skipped and reported as a count.
+
         Args:
             cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
         """
-        # Populate Users table from Users.txt
-        if os.path.exists("Users.txt"):
-            with open("Users.txt", "r", encoding="utf-8") as file:
-                for line in file:
-                    username, password, user_type = line.strip().split(",")
-                    try:
-                        cursor.execute(
-                            """
-                            INSERT INTO Users (username, password, user_type)
-                            VALUES (?, ?, ?)
-                            """,
-                            (username.strip(), password.strip(), user_type.strip()),
-                        )
-                    except sqlite3.IntegrityError:
-                        print(f"User {username} already exists.")
-
-        # Populate Books table from Books.txt
-        if os.path.exists("Books.txt"):
-            with open("Books.txt", "r", encoding="utf-8") as file:
-                for line in file:
-                    title, author, year, isbn = line.strip().split(",")
-                    try:
-                        cursor.execute(
-                            """
-                            INSERT INTO Books (title, author, year, isbn)
-                            VALUES (?, ?, ?, ?)
-                            """,
-                            (title.strip(), author.strip(), int(year.strip()), isbn.strip()),
-                        )
-                    except sqlite3.IntegrityError:
-                        print(f"Book {title} already exists.")
+        if self.workers > 1:
+            loader = ParallelLoader(
+                cursor.connection,
+                batch_size=self.batch_size,
+                hash_iterations=self.hash_iterations,
+                workers=self.workers,
+            )
+        else:
+            loader = BulkLoader(cursor.connection, batch_size=self.batch_size, hash_iterations=self.hash_iterations)
+        for summary in loader.load(users_file=self.users_file, books_file=self.books_file):
+            print(summary)
+            for line_num, reason in summary.rejected:
+                print(f"  line {line_num}: {reason}")
+
+    def sync_initial_data(self, delete_missing=False):
+        """
+        Applies only the changes in the Users and Books files since the last sync.
+
+        Args:
+            delete_missing (bool): Whether books missing from the books file are deleted.
+        """
+        syncer = CatalogSync(self.db_name, batch_size=self.batch_size, hash_iterations=self.hash_iterations)
+        summaries = syncer.sync(
+            users_file=self.users_file, books_file=self.books_file, delete_missing=delete_missing
+        )
+        for summary in summaries:
+            print(summary)
+            for line_num, reason in summary.rejected:
+                print(f"  line {line_num}: {reason}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,316 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for in-memory existence filters in the Book Management System (BMS). A Bloom filter over the ISBNs in Books or the usernames in Users answers "definitely not there" without a database query, so lookups of books the library does not carry and logins of unknown users never reach SQLite.
+"""
+
+import argparse
+import math
+import os
+import threading
+import time
+
+from connection_pool import get_pool
+
+DEFAULT_ERROR_RATE = 0.01
+# Filters are sized for this many times the keys present when they are built, so that keys
+# added later do not push the false-positive rate over the configured one
+GROWTH_FACTOR = 2
+MIN_CAPACITY = 1024
+
+
+class BloomFilter:
+    """
+    A fixed-size set of bits that records keys without storing them.
+
+    A key that was added is always reported as present; a key that was not added is reported
+    as absent except with probability `error_rate`, as long as no more than `capacity` keys
+    have been added. Keys cannot be removed.
+    """
+
+    def __init__(self, capacity, error_rate=DEFAULT_ERROR_RATE):
+        """
+        Initializes the BloomFilter object with the optimal size and hash count for its capacity.
+
+        Args:
+            capacity (int): The number of keys the filter is sized for.
+            error_rate (float): The false-positive rate at full capacity, between 0 and 1.
+        """
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1.")
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, key):
+        """
+        Yields the bit positions of a key by double hashing its built-in hash.
+
+        str hashes are salted per process, so a filter is only meaningful in the process that
+        built it and is never saved; in exchange the hash is computed in C and cached on the string.
+
+        Args:
+            key (str): The key.
+
+        Yields:
+            int: The `hash_count` bit positions of the key, one at a time.
+        """
+        value = hash(key) & 0xFFFFFFFFFFFFFFFF
+        position = value & 0xFFFFFFFF
+        step = (value >> 32) | 1
+        size = self.size
+        for _ in range(self.hash_count):
+            yield position % size
+            position += step
+
+    def add(self, key):
+        """
+        Records a key.
+
+        Args:
+            key (str): The key.
+        """
+        bits = self.bits
+        for position in self.positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        """
+        Checks whether a key may have been added, stopping at the first bit that is not set.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            bool: False if the key was certainly never added, True if it probably was.
+        """
+        bits = self.bits
+        for position in self.positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def expected_error_rate(self):
+        """
+        Estimates the current false-positive rate from the number of keys added so far.
+
+        Returns:
+            float: The probability that an absent key is reported as present.
+        """
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+
+class ExistenceFilter:
+    """
+    Tracks which values of one column exist, so that definite misses are answered from memory.
+
+    The filter is built from the table when it is created and updated by the writes of the
+    objects that use it. Deleted values stay in the filter and only cost an occasional false
+    positive until the next rebuild, which happens when the filter fills up or on refresh().
+
+    Writes made by other processes, or by code in this process that does not report them,
+    are not seen until refresh() is called; until then a value they add is reported as missing.
+    """
+
+    def __init__(self, db_name, table, column, error_rate=DEFAULT_ERROR_RATE):
+        """
+        Initializes the ExistenceFilter object and builds the filter from the database.
+
+        Args:
+            db_name (str): The name of the SQLite database file.
+            table (str): The table holding the values, a trusted identifier.
+            column (str): The column holding the values, a trusted identifier.
+            error_rate (float): The false-positive rate the filter is sized for.
+        """
+        self.db_name = db_name
+        self.table = table
+        self.column = column
+        self.error_rate = error_rate
+        self.pool = get_pool(db_name)
+        self._lock = threading.Lock()
+        # One list per rebuild in progress, collecting the values added while it reads the table
+        self._added_during_builds = []
+        self.checks = 0
+        self.definite_misses = 0
+        self.false_positives = 0
+        self.removed = 0
+        self.rebuilds = 0
+        self.build_seconds = 0.0
+        self.bloom = None
+        self.refresh()
+
+    def connect_db(self):
+        """
+        Returns the calling thread's pooled connection to the SQLite database.
+
+        Returns:
+            sqlite3.Connection: A long-lived connection object to the SQLite database.
+        """
+        return self.pool.connection()
+
+    def refresh(self):
+        """
+        Rebuilds the filter from the values currently in the table.
+
+        Values passed to add() while the table is being read may be missing from what was read,
+        so they are recorded and added to the new filter before it replaces the old one.
+        """
+        began = time.perf_counter()
+        added = []
+        with self._lock:
+            self._added_during_builds.append(added)
+        try:
+            conn = self.connect_db()
+            count = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            bloom = BloomFilter(max(MIN_CAPACITY, count * GROWTH_FACTOR), self.error_rate)
+            cursor = conn.execute(f"SELECT {self.column} FROM {self.table} WHERE {self.column} IS NOT NULL")
+            add = bloom.add
+            for (value,) in cursor:
+                add(str(value))
+        except BaseException:
+            with self._lock:
+                self._added_during_builds.remove(added)
+            raise
+        with self._lock:
+            self._added_during_builds.remove(added)
+            for value in added:
+                bloom.add(value)
+            self.bloom = bloom
+            self.removed = 0
+            self.rebuilds += 1
+            self.build_seconds = time.perf_counter() - began
+
+    def might_contain(self, value):
+        """
+        Checks whether a value may exist in the table.
+
+        Args:
+            value (str): The value to look for.
+
+        Returns:
+            bool: False if the value certainly does not exist, True if it has to be looked up.
+        """
+        present = str(value) in self.bloom
+        with self._lock:
+            self.checks += 1
+            if not present:
+                self.definite_misses += 1
+        return present
+
+    def record_false_positive(self):
+        """
+        Counts a lookup the filter let through that found nothing.
+        """
+        with self._lock:
+            self.false_positives += 1
+
+    def add(self, values):
+        """
+        Records values that were just written to the table, rebuilding the filter once it is full.
+
+        Args:
+            values (iterable): The new values.
+        """
+        with self._lock:
+            bloom = self.bloom
+            for value in map(str, values):
+                bloom.add(value)
+                for added in self._added_during_builds:
+                    added.append(value)
+            full = bloom.count > bloom.capacity
+        if full:
+            self.refresh()
+
+    def discard(self, values):
+        """
+        Notes values that were just deleted from the table. They stay in the filter until the next rebuild.
+
+        Args:
+            values (iterable): The deleted values.
+        """
+        with self._lock:
+            self.removed += sum(1 for _ in values)
+
+    def stats(self):
+        """
+        Returns the size and effectiveness counters of the filter.
+
+        Returns:
+            dict: The key count, capacity, memory use, false-positive rates and lookup counters.
+        """
+        with self._lock:
+            bloom = self.bloom
+            return {
+                "keys": bloom.count - self.removed,
+                "stale_keys": self.removed,
+                "capacity": bloom.capacity,
+                "bits": bloom.size,
+                "hashes": bloom.hash_count,
+                "memory_bytes": len(bloom.bits),
+                "error_rate": self.error_rate,
+                "expected_error_rate": bloom.expected_error_rate(),
+                "checks": self.checks,
+                "definite_misses": self.definite_misses,
+                "false_positives": self.false_positives,
+                "rebuilds": self.rebuilds,
+                "build_seconds": self.build_seconds,
+            }
+
+
+_filters = {}
+_filters_lock = threading.Lock()
+
+
+def get_existence_filter(db_name, table, column, error_rate=DEFAULT_ERROR_RATE):
+    """
+    Returns the shared ExistenceFilter for a column of a database file, building it on first use.
+
+    Args:
+        db_name (str): The name of the SQLite database file.
+        table (str): The table holding the values.
+        column (str): The column holding the values.
+        error_rate (float): The false-positive rate used if the filter has to be built.
+
+    Returns:
+        ExistenceFilter: The filter shared by every caller in this process.
+    """
+    key = (os.path.abspath(db_name), table, column)
+    with _filters_lock:
+        existence_filter = _filters.get(key)
+        if existence_filter is None:
+            existence_filter = _filters[key] = ExistenceFilter(db_name, table, column, error_rate)
+        return existence_filter
+
+
+def refresh_existence_filters(db_name):
+    """
+    Rebuilds the shared filters of a database file after a write that bypassed them, such as a feed sync.
+
+    Args:
+        db_name (str): The name of the SQLite database file.
+    """
+    path = os.path.abspath(db_name)
+    with _filters_lock:
+        filters = [existence_filter for key, existence_filter in _filters.items() if key[0] == path]
+    for existence_filter in filters:
+        existence_filter.refresh()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the BMS existence filters and report their size.")
+    parser.add_argument("--db", default="book_management.db", help="The SQLite database file.")
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_ERROR_RATE, help="The target false-positive rate.")
+    args = parser.parse_args()
+
+    for table, column in (("Books", "isbn"), ("Users", "username")):
+        stats = ExistenceFilter(args.db, table, column, args.error_rate).stats()
+        print(
+            f"{table}.{column}: {stats['keys']:,} keys in {stats['memory_bytes']:,} bytes, "
+            f"{stats['hashes']} hashes, expected false positives {stats['expected_error_rate']:.3%}, "
+            f"built in {stats['build_seconds'] * 1000:.0f}ms"
+        )
@@ -0,0 +1,414 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for exporting the Book Management System (BMS) database. Streams each table in fixed-size chunks to CSV, JSONL or a compact binary format, optionally gzip-compressed, in constant memory.
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import re
+import sqlite3
+import struct
+import sys
+
+DEFAULT_CHUNK_SIZE = 5000
+FORMATS = ("csv", "jsonl", "binary")
+EXTENSIONS = {"csv": "csv", "jsonl": "jsonl", "binary": "bms"}
+
+# Binary layout: the magic bytes, the column names, then one record per row. Every value is a
+# one-byte type tag followed by its payload; text and blobs carry a 4-byte length prefix.
+BINARY_MAGIC = b"BMSX1\n"
+TAG_NULL, TAG_INT, TAG_FLOAT, TAG_TEXT, TAG_BLOB = b"N", b"I", b"F", b"T", b"B"
+INT_FORMAT = struct.Struct("<q")
+FLOAT_FORMAT = struct.Struct("<d")
+LENGTH_FORMAT = struct.Struct("<I")
+# The end of the CREATE TABLE statement of a table stored without a rowid
+WITHOUT_ROWID = re.compile(r"\bWITHOUT\s+ROWID\s*$", re.IGNORECASE)
+
+
+def list_tables(conn):
+    """
+    Returns the exportable tables of a database.
+
+    SQLite's internal tables, full-text index tables and their shadow tables are left out,
+    since they are rebuilt from the tables they index.
+
+    Args:
+        conn (sqlite3.Connection): The connection to the database.
+
+    Returns:
+        list: The table names in creation order.
+    """
+    rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table' ORDER BY rowid").fetchall()
+    virtual = [name for name, sql in rows if sql and sql.upper().startswith("CREATE VIRTUAL")]
+    return [
+        name for name, _ in rows
+        if not name.startswith("sqlite_")
+        and name not in virtual
+        and not any(name.startswith(f"{table}_") for table in virtual)
+    ]
+
+
+def table_columns(conn, table):
+    """
+    Returns the column names of a table.
+
+    Args:
+        conn (sqlite3.Connection): The connection to the database.
+        table (str): The name of an existing table.
+
+    Returns:
+        list: The column names in declaration order.
+    """
+    return [column[1] for column in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def row_order(conn, table):
+    """
+    Returns the ORDER BY clause that reads a table in storage order.
+
+    Ordinary tables are read by rowid. WITHOUT ROWID tables have no rowid and are stored
+    by their primary key, so they are read in primary key order instead.
+
+    Args:
+        conn (sqlite3.Connection): The connection to the database.
+        table (str): The name of an existing table.
+
+    Returns:
+        str: The ORDER BY clause.
+    """
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    if sql is None or sql[0] is None or not WITHOUT_ROWID.search(sql[0].strip()):
+        return "ORDER BY rowid"
+    key = sorted((column[5], column[1]) for column in conn.execute(f'PRAGMA table_info("{table}")') if column[5])
+    return "ORDER BY " + ", ".join(f'"{name}"' for _, name in key)
+
+
+def resolve_selection(conn, tables=None, columns=None):
+    """
+    Checks the requested tables and columns against the schema.
+
+    Only names that exist in the schema are ever interpolated into SQL.
+
+    Args:
+        conn (sqlite3.Connection): The connection to the database.
+        tables (list): The tables to export, or None for every exportable table.
+        columns (dict): Column lists keyed by table name; tables not listed export every column.
+
+    Returns:
+        list: (table, columns) pairs to export.
+    """
+    available = list_tables(conn)
+    tables = tables or available
+    unknown = [table for table in tables if table not in available]
+    if unknown:
+        raise ValueError(f"Unknown table(s): {', '.join(unknown)}. Choose from {', '.join(available)}.")
+
+    columns = columns or {}
+    unknown = [table for table in columns if table not in tables]
+    if unknown:
+        raise ValueError(f"Columns given for table(s) not being exported: {', '.join(unknown)}.")
+
+    selection = []
+    for table in tables:
+        existing = table_columns(conn, table)
+        chosen = columns.get(table) or existing
+        missing = [column for column in chosen if column not in existing]
+        if missing:
+            raise ValueError(f"Unknown column(s) in {table}: {', '.join(missing)}.")
+        selection.append((table, chosen))
+    return selection
+
+
+def iter_chunks(conn, table, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams the rows of a table in chunks.
+
+    Args:
+        conn (sqlite3.Connection): The connection to the database.
+        table (str): A table name checked by resolve_selection.
+        columns (list): Column names checked by resolve_selection.
+        chunk_size (int): The number of rows fetched at a time.
+
+    Yields:
+        list: Up to chunk_size row tuples.
+    """
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    cursor = conn.execute(f'SELECT {column_list} FROM "{table}" {row_order(conn, table)}')
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def encode_value(value):
+    """
+    Encodes one column value in the binary format.
+
+    Args:
+        value (object): None, int, float, str or bytes.
+
+    Returns:
+        bytes: The tagged value.
+    """
+    if value is None:
+        return TAG_NULL
+    if isinstance(value, int):
+        return TAG_INT + INT_FORMAT.pack(value)
+    if isinstance(value, float):
+        return TAG_FLOAT + FLOAT_FORMAT.pack(value)
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return TAG_TEXT + LENGTH_FORMAT.pack(len(data)) + data
+    return TAG_BLOB + LENGTH_FORMAT.pack(len(value)) + bytes(value)
+
+
+def read_exact(file, size):
+    """
+    Reads exactly size bytes from a binary file.
+
+    Args:
+        file (file): The file to read from.
+        size (int): The number of bytes to read.
+
+    Returns:
+        bytes: The data read.
+    """
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated binary export.")
+    return data
+
+
+def decode_value(file, tag=None):
+    """
+    Reads one column value written by encode_value.
+
+    Args:
+        file (file): The binary file positioned at a value, or just after its tag.
+        tag (bytes): The tag if it has already been read.
+
+    Returns:
+        object: The decoded value.
+    """
+    tag = tag or read_exact(file, 1)
+    if tag == TAG_NULL:
+        return None
+    if tag == TAG_INT:
+        return INT_FORMAT.unpack(read_exact(file, INT_FORMAT.size))[0]
+    if tag == TAG_FLOAT:
+        return FLOAT_FORMAT.unpack(read_exact(file, FLOAT_FORMAT.size))[0]
+    length = LENGTH_FORMAT.unpack(read_exact(file, LENGTH_FORMAT.size))[0]
+    data = read_exact(file, length)
+    if tag == TAG_TEXT:
+        return data.decode("utf-8")
+    if tag == TAG_BLOB:
+        return data
+    raise ValueError(f"Unknown value tag {tag!r}.")
+
+
+def read_binary(path):
+    """
+    Streams the rows of a binary export.
+
+    Args:
+        path (str): The path of a .bms or .bms.gz file written by export_table.
+
+    Returns:
+        tuple: The column names and an iterator over the row tuples.
+    """
+    file = gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+    if file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        file.close()
+        raise ValueError(f"{path} is not a binary BMS export.")
+    count = LENGTH_FORMAT.unpack(read_exact(file, LENGTH_FORMAT.size))[0]
+    columns = [decode_value(file) for _ in range(count)]
+
+    def rows():
+        with file:
+            while True:
+                tag = file.read(1)
+                if not tag:
+                    return
+                yield (decode_value(file, tag),) + tuple(decode_value(file) for _ in columns[1:])
+
+    return columns, rows()
+
+
+def open_output(path, binary, compress):
+    """
+    Opens an export file for writing.
+
+    Args:
+        path (str): The path of the file.
+        binary (bool): Whether the format is binary.
+        compress (bool): Whether to gzip the output.
+
+    Returns:
+        file: The open file object.
+    """
+    opener = gzip.open if compress else open
+    if binary:
+        return opener(path, "wb")
+    return opener(path, "wt", encoding="utf-8", newline="")
+
+
+def export_table(
+    conn, table, columns, path, fmt="csv", compress=False, chunk_size=DEFAULT_CHUNK_SIZE, progress=None
+):
+    """
+    Streams one table to one file.
+
+    Args:
+        conn (sqlite3.Connection): The connection to the database.
+        table (str): A table name checked by resolve_selection.
+        columns (list): Column names checked by resolve_selection.
+        path (str): The path of the file to write.
+        fmt (str): One of "csv", "jsonl" or "binary".
+        compress (bool): Whether to gzip the output.
+        chunk_size (int): The number of rows fetched and written at a time.
+        progress (callable): Called with (table, rows_written, total_rows) after every chunk.
+
+    Returns:
+        int: The number of rows written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}. Choose from {', '.join(FORMATS)}.")
+    total = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] if progress else None
+    written = 0
+
+    with open_output(path, fmt == "binary", compress) as file:
+        if fmt == "csv":
+            writer = csv.writer(file, lineterminator="\n")
+            writer.writerow(columns)
+            write_chunk = writer.writerows
+        elif fmt == "jsonl":
+            def write_chunk(rows):
+                file.write("".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows))
+        else:
+            file.write(BINARY_MAGIC + LENGTH_FORMAT.pack(len(columns)))
+            file.write(b"".join(encode_value(column) for column in columns))
+
+            def write_chunk(rows):
+                file.write(b"".join(encode_value(value) for row in rows for value in row))
+
+        for rows in iter_chunks(conn, table, columns, chunk_size):
+            write_chunk(rows)
+            written += len(rows)
+            if progress:
+                progress(table, written, total)
+    return written
+
+
+def export_database(
+    db_name,
+    out_dir,
+    fmt="csv",
+    tables=None,
+    columns=None,
+    compress=False,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    progress=None,
+):
+    """
+    Exports the selected tables of a database, one file per table, from a single consistent snapshot.
+
+    Args:
+        db_name (str): The name of the SQLite database file.
+        out_dir (str): The directory to write the files to.
+        fmt (str): One of "csv", "jsonl" or "binary".
+        tables (list): The tables to export, or None for every exportable table.
+        columns (dict): Column lists keyed by table name; tables not listed export every column.
+        compress (bool): Whether to gzip the output.
+        chunk_size (int): The number of rows fetched and written at a time.
+        progress (callable): Called with (table, rows_written, total_rows) after every chunk.
+
+    Returns:
+        dict: The number of rows written keyed by file path.
+    """
+    if not os.path.exists(db_name):
+        raise FileNotFoundError(f"No database at {db_name}.")
+    os.makedirs(out_dir, exist_ok=True)
+    conn = sqlite3.connect(db_name)
+    try:
+        # One read transaction keeps every table at the same point in time while writers carry on.
+        conn.execute("BEGIN")
+        results = {}
+        for table, chosen in resolve_selection(conn, tables, columns):
+            path = os.path.join(out_dir, f"{table}.{EXTENSIONS[fmt]}" + (".gz" if compress else ""))
+            results[path] = export_table(conn, table, chosen, path, fmt, compress, chunk_size, progress)
+        conn.rollback()
+        return results
+    finally:
+        conn.close()
+
+
+def parse_columns(values):
+    """
+    Parses --columns arguments of the form Table:col1,col2.
+
+    Args:
+        values (list): The raw argument values.
+
+    Returns:
+        dict: Column lists keyed by table name.
+    """
+    columns = {}
+    for value in values or []:
+        table, _, names = value.partition(":")
+        if not names:
+            raise ValueError(f"Expected Table:column,... but got {value!r}.")
+        columns[table] = [name.strip() for name in names.split(",") if name.strip()]
+    return columns
+
+
+def print_progress(table, written, total):
+    """
+    Writes a one-line progress report to stderr.
+
+    Args:
+        table (str): The table being exported.
+        written (int): The number of rows written so far.
+        total (int): The number of rows in the table.
+    """
+    percent = 100 * written / total if total else 100
+    sys.stderr.write(f"\r{table}: {written:,}/{total:,} rows ({percent:.0f}%)")
+    if written >= total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the BMS database table by table.")
+    parser.add_argument("--db", default="book_management.db", help="The SQLite database file.")
+    parser.add_argument("--out", default="export", help="The directory to write the files to.")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="The output format.")
+    parser.add_argument("--tables", nargs="*", help="The tables to export (default: all).")
+    parser.add_argument(
+        "--columns", nargs="*", metavar="TABLE:COL,...", help="Export only these columns of a table."
+    )
+    parser.add_argument("--gzip", action="store_true", help="Compress every file with gzip.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows fetched at a time.")
+    parser.add_argument("--quiet", action="store_true", help="Do not report progress.")
+    args = parser.parse_args()
+
+    try:
+        exported = export_database(
+            args.db,
+            args.out,
+            fmt=args.format,
+            tables=args.tables,
+            columns=parse_columns(args.columns),
+            compress=args.gzip,
+            chunk_size=args.chunk_size,
+            progress=None if args.quiet else print_progress,
+        )
+    except (OSError, ValueError, sqlite3.Error) as error:
+        sys.exit(f"Export failed: {error}")
+    for path, rows in exported.items():
+        print(f"{path}: {rows} rows")
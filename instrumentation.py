@@ -0,0 +1,448 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for opt-in performance instrumentation of the Book Management System (BMS). Records operation and SQL statement latency histograms, SQLite trace and progress counters, connection counts and cache statistics, and keeps a slow-query log with query plans.
+"""
+
+import functools
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import deque
+
+import connection_pool
+
+# Histogram bucket upper bounds in seconds.
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+DEFAULT_SLOW_QUERY_MS = 50.0
+DEFAULT_PROGRESS_STEPS = 1000
+SLOW_QUERY_LOG_SIZE = 100
+
+slow_query_logger = logging.getLogger("bms.slow_query")
+
+
+class Histogram:
+    """
+    A cumulative latency histogram with fixed buckets.
+    """
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        """
+        Initializes the Histogram object.
+        """
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        """
+        Records one duration.
+
+        Args:
+            seconds (float): The duration to record.
+        """
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, fraction):
+        """
+        Estimates a quantile as the upper bound of the bucket that contains it.
+
+        Args:
+            fraction (float): The quantile as a fraction, for example 0.99.
+
+        Returns:
+            float: The estimated quantile in seconds, or None if nothing was recorded.
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self):
+        """
+        Converts the histogram into a JSON-serializable dictionary.
+
+        Returns:
+            dict: The count, total, estimated p50/p99 and cumulative bucket counts.
+        """
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        p50, p99 = self.quantile(0.5), self.quantile(0.99)
+        return {
+            "count": self.count,
+            "sum_ms": self.total * 1000,
+            "p50_ms": p50 * 1000 if p50 is not None else None,
+            "p99_ms": p99 * 1000 if p99 is not None else None,
+            "buckets": buckets,
+        }
+
+
+def normalize_statement(sql):
+    """
+    Collapses whitespace in a SQL statement so equal statements share one histogram.
+
+    Args:
+        sql (str): The SQL statement.
+
+    Returns:
+        str: The statement on a single line.
+    """
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+class Instrumentation:
+    """
+    Collects the metrics of one process. Recording is a no-op until enable() is called.
+    """
+
+    def __init__(self):
+        """
+        Initializes the Instrumentation object.
+        """
+        self.enabled = False
+        self.slow_query_seconds = DEFAULT_SLOW_QUERY_MS / 1000
+        self.progress_steps = DEFAULT_PROGRESS_STEPS
+        self._lock = threading.Lock()
+        self._cache_owners = weakref.WeakSet()
+        self.reset()
+
+    def reset(self):
+        """
+        Clears every recorded metric.
+        """
+        with self._lock:
+            self.operations = {}
+            self.statements = {}
+            self.statements_traced = 0
+            self.progress_callbacks = 0
+            self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+    def enable(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS, progress_steps=DEFAULT_PROGRESS_STEPS):
+        """
+        Starts recording metrics.
+
+        Statement timing, tracing and progress counting apply to pooled connections opened after
+        this call, so it should run at process start.
+
+        Args:
+            slow_query_ms (float): Statements slower than this many milliseconds go to the slow-query log.
+            progress_steps (int): The number of SQLite VM instructions between progress callbacks.
+        """
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.progress_steps = progress_steps
+        self.enabled = True
+        connection_pool.set_connection_factory(InstrumentedConnection)
+        connection_pool.add_connection_hook(self.configure_connection)
+
+    def disable(self):
+        """
+        Stops recording metrics for connections opened from now on and for operations.
+        """
+        self.enabled = False
+        connection_pool.set_connection_factory(sqlite3.Connection)
+        connection_pool.remove_connection_hook(self.configure_connection)
+
+    def configure_connection(self, conn):
+        """
+        Installs the trace and progress callbacks on a new connection.
+
+        Args:
+            conn (sqlite3.Connection): The connection to configure.
+        """
+        conn.set_trace_callback(self.trace)
+        conn.set_progress_handler(self.progress, self.progress_steps)
+
+    def trace(self, _sql):
+        """
+        Counts every statement SQLite runs, including those run by triggers.
+
+        Args:
+            _sql (str): The expanded SQL statement.
+        """
+        self.statements_traced += 1
+
+    def progress(self):
+        """
+        Counts SQLite VM progress callbacks as a measure of work done.
+
+        Returns:
+            int: 0, so the running statement is never interrupted.
+        """
+        self.progress_callbacks += 1
+        return 0
+
+    def watch_caches(self, owner):
+        """
+        Includes an object's cache_stats() in every snapshot while the object is alive.
+
+        Args:
+            owner (object): An object with a cache_stats() method, such as BookManagement.
+        """
+        self._cache_owners.add(owner)
+
+    def record_operation(self, name, seconds):
+        """
+        Records the latency of one high-level operation.
+
+        Args:
+            name (str): The operation name.
+            seconds (float): The duration of the operation.
+        """
+        with self._lock:
+            histogram = self.operations.get(name)
+            if histogram is None:
+                histogram = self.operations[name] = Histogram()
+            histogram.observe(seconds)
+
+    def record_statement(self, cursor, sql, parameters, seconds):
+        """
+        Records the latency of one SQL statement and logs it if it was slow.
+
+        Args:
+            cursor (sqlite3.Cursor): The cursor that ran the statement.
+            sql (str): The SQL statement.
+            parameters (object): The statement's parameters.
+            seconds (float): The duration of the execute call.
+        """
+        statement = normalize_statement(sql)
+        with self._lock:
+            histogram = self.statements.get(statement)
+            if histogram is None:
+                histogram = self.statements[statement] = Histogram()
+            histogram.observe(seconds)
+        if seconds >= self.slow_query_seconds:
+            self.log_slow_query(cursor.connection, statement, parameters, seconds)
+
+    def log_slow_query(self, conn, statement, parameters, seconds):
+        """
+        Adds a statement, its parameters and its query plan to the slow-query log.
+
+        Args:
+            conn (sqlite3.Connection): The connection that ran the statement.
+            statement (str): The normalized SQL statement.
+            parameters (object): The statement's parameters.
+            seconds (float): The duration of the statement.
+        """
+        try:
+            plan_cursor = sqlite3.Connection.cursor(conn, sqlite3.Cursor)
+            plan = [row[-1] for row in plan_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+        except (sqlite3.Error, ValueError):
+            plan = []
+        entry = {
+            "sql": statement,
+            "params": [repr(value) for value in parameters] if parameters else [],
+            "duration_ms": seconds * 1000,
+            "plan": plan,
+            "at": time.time(),
+        }
+        with self._lock:
+            self.slow_queries.append(entry)
+        slow_query_logger.warning("slow query %.1f ms: %s", seconds * 1000, json.dumps(entry))
+
+    def snapshot(self):
+        """
+        Collects every metric into one JSON-serializable dictionary.
+
+        Returns:
+            dict: Operation and statement histograms, SQLite counters, connection counts, cache
+                statistics and the slow-query log.
+        """
+        caches = {}
+        for owner in list(self._cache_owners):
+            name = f"{type(owner).__name__}@{id(owner):x}"
+            caches[name] = owner.cache_stats()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "operations": {name: h.to_dict() for name, h in sorted(self.operations.items())},
+                "statements": {name: h.to_dict() for name, h in sorted(self.statements.items())},
+                "sqlite": {
+                    "statements_traced": self.statements_traced,
+                    "progress_callbacks": self.progress_callbacks,
+                    "progress_steps": self.progress_steps,
+                },
+                "connections": connection_pool.pool_stats(),
+                "caches": caches,
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def to_json(self):
+        """
+        Exports a snapshot as JSON text.
+
+        Returns:
+            str: The snapshot encoded as JSON.
+        """
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """
+        Exports a snapshot in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def histogram(metric, label, values):
+            lines.append(f"# TYPE {metric} histogram")
+            for name, data in values.items():
+                escaped = name.replace("\\", "\\\\").replace('"', '\\"')
+                for bound, count in data["buckets"].items():
+                    lines.append(f'{metric}_bucket{{{label}="{escaped}",le="{bound}"}} {count}')
+                lines.append(f'{metric}_sum{{{label}="{escaped}"}} {data["sum_ms"] / 1000}')
+                lines.append(f'{metric}_count{{{label}="{escaped}"}} {data["count"]}')
+
+        histogram("bms_operation_duration_seconds", "operation", snapshot["operations"])
+        histogram("bms_statement_duration_seconds", "statement", snapshot["statements"])
+        lines.append("# TYPE bms_sqlite_statements_total counter")
+        lines.append(f"bms_sqlite_statements_total {snapshot['sqlite']['statements_traced']}")
+        lines.append("# TYPE bms_sqlite_progress_callbacks_total counter")
+        lines.append(f"bms_sqlite_progress_callbacks_total {snapshot['sqlite']['progress_callbacks']}")
+        lines.append("# TYPE bms_pool_connections gauge")
+        for path, counts in snapshot["connections"].items():
+            lines.append(f'bms_pool_connections{{db="{path}"}} {counts["open"]}')
+        lines.append("# TYPE bms_cache_events_total counter")
+        for owner, owner_caches in snapshot["caches"].items():
+            for cache, stats in owner_caches.items():
+                for event in ("hits", "misses", "evictions", "expirations", "invalidations"):
+                    if event in stats:
+                        lines.append(
+                            f'bms_cache_events_total{{owner="{owner}",cache="{cache}",event="{event}"}} '
+                            f"{stats[event]}"
+                        )
+        lines.append("# TYPE bms_slow_queries gauge")
+        lines.append(f"bms_slow_queries {len(snapshot['slow_queries'])}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Instrumentation()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    A cursor that reports the duration of each execute call to the metrics collector.
+    """
+
+    def execute(self, sql, parameters=()):
+        """
+        Executes a statement and records its duration.
+
+        Args:
+            sql (str): The SQL statement.
+            parameters (object): The statement's parameters.
+
+        Returns:
+            sqlite3.Cursor: This cursor.
+        """
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.record_statement(self, sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        """
+        Executes a statement for each parameter set and records the total duration.
+
+        Args:
+            sql (str): The SQL statement.
+            seq_of_parameters (iterable): The parameter sets.
+
+        Returns:
+            sqlite3.Cursor: This cursor.
+        """
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record_statement(self, sql, (), time.perf_counter() - start)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    A connection whose cursors, including those behind Connection.execute, are instrumented.
+    """
+
+    def cursor(self, factory=InstrumentedCursor):
+        """
+        Opens a cursor, instrumented by default.
+
+        Args:
+            factory (type): The cursor class.
+
+        Returns:
+            sqlite3.Cursor: The new cursor.
+        """
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        """
+        Executes a statement on a new instrumented cursor.
+
+        Args:
+            sql (str): The SQL statement.
+            parameters (object): The statement's parameters.
+
+        Returns:
+            sqlite3.Cursor: The cursor that ran the statement.
+        """
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        """
+        Executes a statement for each parameter set on a new instrumented cursor.
+
+        Args:
+            sql (str): The SQL statement.
+            seq_of_parameters (iterable): The parameter sets.
+
+        Returns:
+            sqlite3.Cursor: The cursor that ran the statement.
+        """
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def instrumented(name):
+    """
+    Decorates a function so that its latency is recorded while instrumentation is enabled.
+
+    Args:
+        name (str): The operation name to record the latency under.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.record_operation(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
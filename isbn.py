@@ -0,0 +1,183 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for validating and normalizing ISBNs in the Book Management System (BMS). Strips hyphens and spaces, checks ISBN-10 and ISBN-13 check digits, and converts ISBN-10 to ISBN-13, so that every spelling of a book's ISBN maps to one canonical 13-digit form and one integer lookup key.
+"""
+
+import argparse
+import functools
+import sys
+
+# Characters that may separate the groups of a printed ISBN
+SEPARATORS = str.maketrans("", "", "- \t")
+# The number of recently seen ISBNs whose lookup key is remembered
+KEY_CACHE_SIZE = 65536
+
+
+def strip_isbn(text):
+    """
+    Removes the hyphens and spaces from a printed ISBN.
+
+    Args:
+        text (str): The ISBN as entered, for example "978-0-13-110362-7".
+
+    Returns:
+        str: The remaining characters, with a trailing "x" upper-cased.
+    """
+    return str(text).strip().translate(SEPARATORS).upper()
+
+
+def isbn10_check_digit(body):
+    """
+    Computes the check digit of an ISBN-10.
+
+    Args:
+        body (str): The first nine digits.
+
+    Returns:
+        str: The check digit, "0" to "9" or "X".
+    """
+    total = sum(int(digit) * weight for digit, weight in zip(body, range(10, 1, -1)))
+    check = (11 - total % 11) % 11
+    return "X" if check == 10 else str(check)
+
+
+def isbn13_check_digit(body):
+    """
+    Computes the check digit of an ISBN-13.
+
+    Args:
+        body (str): The first twelve digits.
+
+    Returns:
+        str: The check digit, "0" to "9".
+    """
+    total = sum(map(int, body[0::2])) + 3 * sum(map(int, body[1::2]))
+    return str(-total % 10)
+
+
+def is_valid_isbn10(digits):
+    """
+    Checks a stripped ISBN-10.
+
+    Args:
+        digits (str): Ten characters without separators.
+
+    Returns:
+        bool: True if the length, characters and check digit are valid.
+    """
+    return (
+        len(digits) == 10
+        and digits.isascii()
+        and digits[:9].isdigit()
+        and (digits[9].isdigit() or digits[9] == "X")
+        and isbn10_check_digit(digits[:9]) == digits[9]
+    )
+
+
+def is_valid_isbn13(digits):
+    """
+    Checks a stripped ISBN-13.
+
+    Args:
+        digits (str): Thirteen characters without separators.
+
+    Returns:
+        bool: True if the length, the 978 or 979 prefix and the check digit are valid.
+    """
+    return (
+        len(digits) == 13
+        and digits.isascii()
+        and digits.isdigit()
+        and digits[:3] in ("978", "979")
+        and isbn13_check_digit(digits[:12]) == digits[12]
+    )
+
+
+def isbn10_to_isbn13(digits):
+    """
+    Converts a valid stripped ISBN-10 to its ISBN-13 form.
+
+    Args:
+        digits (str): A valid ISBN-10 without separators.
+
+    Returns:
+        str: The 978-prefixed ISBN-13.
+    """
+    body = "978" + digits[:9]
+    return body + isbn13_check_digit(body)
+
+
+def normalize_isbn(text):
+    """
+    Validates an ISBN and returns its canonical form.
+
+    Args:
+        text (str): An ISBN-10 or ISBN-13, with or without hyphens and spaces.
+
+    Returns:
+        str: The 13-digit ISBN without separators.
+
+    Raises:
+        ValueError: If the text is not a valid ISBN-10 or ISBN-13.
+    """
+    digits = strip_isbn(text)
+    if is_valid_isbn13(digits):
+        return digits
+    if is_valid_isbn10(digits):
+        return isbn10_to_isbn13(digits)
+    raise ValueError(f"invalid ISBN {text!r}")
+
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def isbn_key(text):
+    """
+    Returns the integer lookup key of an ISBN.
+
+    Every ISBN-13 starts with 978 or 979, so the key has exactly 13 digits and converts back
+    to the canonical string with str(). Results are memoized, since the same ISBNs are looked
+    up over and over.
+
+    Args:
+        text (str): An ISBN-10 or ISBN-13, with or without hyphens and spaces.
+
+    Returns:
+        int: The canonical ISBN-13 as an integer, or None if the text is not a valid ISBN.
+    """
+    try:
+        return int(normalize_isbn(text))
+    except ValueError:
+        return None
+
+
+def canonical_isbn(text):
+    """
+    Normalizes a valid ISBN and passes any other identifier through unchanged.
+
+    Catalogs created before ISBNs were validated may hold identifiers that are not ISBNs;
+    those keep working as exact strings.
+
+    Args:
+        text (str): The ISBN or identifier as entered.
+
+    Returns:
+        str: The 13-digit ISBN if the text is a valid ISBN, otherwise the text itself.
+    """
+    key = isbn_key(text)
+    return text if key is None else str(key)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate and normalize ISBNs.")
+    parser.add_argument("isbns", nargs="*", help="ISBNs to check; read one per line from stdin if none are given.")
+    args = parser.parse_args()
+
+    invalid = 0
+    for value in args.isbns or (line.strip() for line in sys.stdin if line.strip()):
+        try:
+            print(f"{value}\t{normalize_isbn(value)}")
+        except ValueError as error:
+            invalid += 1
+            print(f"{value}\t{error}", file=sys.stderr)
+    sys.exit(1 if invalid else 0)
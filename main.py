@@ -2,36 +2,133 @@
 Name: Pushwitha Krishnappa
 Course: CS-521
 Python3 Version: Python 3.9.6
-Description: Main module for running the Book Management System (BMS). Handles user interaction, menu display, and system operations.
+Description: Main module for running the Book Management System (BMS). Handles user interaction, menu display, and system operations, or replays a JSONL command stream non-interactively in batch mode.
 """
 
+import argparse
+import json
+import sqlite3
 import sys
+import time
 from authentication import Authentication
 from book_management import BookManagement
+from service import book_to_dict
+
+# Batch mode operations that need a logged-in user, with the role each one requires (None for any role)
+REQUIRED_ROLES = {"search": None, "add": "admin", "delete": "admin", "borrow": "user", "return": "user"}
+# Batch mode operations whose consecutive commands are applied together in one transaction
+BATCHED_OPERATIONS = ("add", "delete", "borrow")
+DEFAULT_BATCH_SIZE = 500
+# The JSON types of the search criteria a batch command may give; title, author, isbn and year may also be lists
+SEARCH_FIELD_TYPES = {
+    "match": str,
+    "order_by": str,
+    "title": str,
+    "author": str,
+    "isbn": str,
+    "year": int,
+    "year_min": int,
+    "year_max": int,
+    "limit": int,
+    "after_id": int,
+    "count_only": bool,
+}
+LIST_SEARCH_FIELDS = ("title", "author", "isbn", "year")
+TYPE_NAMES = {str: "a string", int: "an integer", bool: "a boolean"}
+# Errors that fail a single batch command instead of the whole run
+COMMAND_ERRORS = (KeyError, TypeError, ValueError, sqlite3.Error)
+
+
+def check_field(name, value, kind):
+    """
+    Checks the JSON type of a command field.
+
+    Args:
+        name (str): The field name, for the error message.
+        value (object): The decoded value.
+        kind (type): str, int or bool. Booleans are not accepted as ints.
+
+    Returns:
+        object: The value.
+
+    Raises:
+        ValueError: If the value has another type.
+    """
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise ValueError(f"The {name} field must be {TYPE_NAMES[kind]}.")
+    return value
+
+
+def search_criteria(command):
+    """
+    Extracts the search criteria of a search command, checking their types.
+
+    Args:
+        command (dict): The decoded command.
+
+    Returns:
+        dict: The keyword arguments for BookManagement.search_books. Unknown fields are passed on
+            for search_books to reject.
+
+    Raises:
+        ValueError: If a criterion has the wrong type.
+    """
+    criteria = {key: value for key, value in command.items() if key != "op"}
+    for key, value in criteria.items():
+        kind = SEARCH_FIELD_TYPES.get(key)
+        if kind is None:
+            continue
+        if key in LIST_SEARCH_FIELDS and isinstance(value, list):
+            for item in value:
+                check_field(key, item, kind)
+        else:
+            check_field(key, value, kind)
+    return criteria
+
 
 class BookManagementSystem:
     """
     The main system for managing user authentication and book operations in the Book Management System.
     """
 
-    def __init__(self):
+    def __init__(self, db_name="book_management.db"):
         """
         Initializes the BookManagementSystem object.
+
+        Args:
+            db_name (str): The name of the SQLite database file.
         """
-        self.auth = Authentication()
-        self.book_manager = BookManagement()
+        self.auth = Authentication(db_name)
+        self.book_manager = BookManagement(db_name)
         self.is_logged_in = False
 
+    def session_user(self):
+        """
+        Returns the logged-in user, sending them back to the login menu once their session has expired.
+
+        Returns:
+            tuple: The (username, user_type) of the logged-in user, or None if nobody is logged in.
+        """
+        if not self.is_logged_in:
+            return None
+        user = self.auth.current_user
+        if user is None:
+            print("Your session has expired. Please log in again.")
+            self.auth.token = None
+            self.is_logged_in = False
+        return user
+
     def display_menu(self):
         """
         Displays the appropriate menu based on the user's login state and role.
         """
-        if not self.is_logged_in:
+        user = self.session_user()
+        if user is None:
             print("\nMain Menu:")
             print("1. Login")
             print("2. Exit")
         else:
-            user_type = self.auth.current_user[1]
+            user_type = user[1]
             if user_type == "admin":
                 print("\nAdmin Menu:")
                 print("1. Add Book")
@@ -42,7 +139,8 @@ class BookManagementSystem:
                 print("\nUser Menu:")
                 print("1. Search Books")
                 print("2. Borrow Book")
-                print("3. Logout")
+                print("3. Return Book")
+                print("4. Logout")
 
     def handle_choice(self, choice):
         """
@@ -62,7 +160,10 @@ class BookManagementSystem:
             else:
                 print("Invalid choice. Please try again.")
         else:
-            user_type = self.auth.current_user[1]
+            user = self.session_user()
+            if user is None:
+                return
+            user_name, user_type = user
             if user_type == "admin":
                 if choice == "1":
                     title = input("Enter book title: ")
@@ -74,17 +175,7 @@ class BookManagementSystem:
                     isbn = input("Enter the ISBN of the book to delete: ")
                     self.book_manager.delete_book(isbn)
                 elif choice == "3":
-                    print("\nEnter search criteria (leave blank if not applicable):")
-                    title = input("Title: ")
-                    author = input("Author: ")
-                    year = input("Year: ")
-                    isbn = input("ISBN: ")
-                    self.book_manager.search_books(
-                        title=title or None,
-                        author=author or None,
-                        year=int(year) if year else None,
-                        isbn=isbn or None,
-                    )
+                    self.search_menu()
                 elif choice == "4":
                     self.auth.logout()
                     self.is_logged_in = False
@@ -92,27 +183,54 @@ class BookManagementSystem:
                     print("Invalid choice. Please try again.")
             elif user_type == "user":
                 if choice == "1":
-                    print("\nEnter search criteria (leave blank if not applicable):")
-                    title = input("Title: ")
-                    author = input("Author: ")
-                    year = input("Year: ")
-                    isbn = input("ISBN: ")
-                    self.book_manager.search_books(
-                        title=title or None,
-                        author=author or None,
-                        year=int(year) if year else None,
-                        isbn=isbn or None,
-                    )
+                    self.search_menu()
                 elif choice == "2":
                     isbn = input("Enter the ISBN of the book to borrow: ")
-                    username = self.auth.current_user[0]
-                    self.book_manager.borrow_book(username, isbn)
+                    self.book_manager.borrow_book(user_name, isbn)
                 elif choice == "3":
+                    isbn = input("Enter the ISBN of the book to return: ")
+                    self.book_manager.return_book(user_name, isbn)
+                elif choice == "4":
                     self.auth.logout()
                     self.is_logged_in = False
                 else:
                     print("Invalid choice. Please try again.")
 
+    def search_menu(self):
+        """
+        Prompts for search criteria and displays the matching books.
+        """
+        print("\nEnter search criteria (leave blank if not applicable):")
+        keywords = input("Keywords (partial title or author): ")
+        title = input("Title: ")
+        author = input("Author: ")
+        year = input("Year: ")
+        isbn = input("ISBN: ")
+        books = self.book_manager.iter_books(
+            match=keywords or None,
+            title=title or None,
+            author=author or None,
+            year=int(year) if year else None,
+            isbn=isbn or None,
+        )
+        self.display_books(books)
+
+    def display_books(self, books):
+        """
+        Prints books one at a time as they are produced.
+
+        Args:
+            books (iterable): The (id, title, author, year, isbn) tuples to display.
+        """
+        found = False
+        for book in books:
+            if not found:
+                print("\nBooks Found:")
+                found = True
+            print(f"Title: {book[1]}, Author: {book[2]}, Year: {book[3]}, ISBN: {book[4]}")
+        if not found:
+            print("No books match your criteria.")
+
     def run(self):
         """
         Runs the main loop of the Book Management System.
@@ -122,6 +240,259 @@ class BookManagementSystem:
             choice = input("Enter your choice: ")
             self.handle_choice(choice)
 
+
+class BatchRunner:
+    """
+    Replays login, logout, search, add, delete, borrow and return commands read as JSON lines.
+
+    Commands run as the user of the last successful login, with the same role checks as the
+    menus. Runs of consecutive add, delete or borrow commands are applied through the batch
+    APIs, so each run commits once instead of once per command. One JSON result is written
+    per command, in input order.
+    """
+
+    def __init__(self, db_name="book_management.db", batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Initializes the BatchRunner object.
+
+        Args:
+            db_name (str): The name of the SQLite database file.
+            batch_size (int): The maximum number of commands applied in one transaction.
+        """
+        self.auth = Authentication(db_name, verbose=False)
+        self.book_manager = BookManagement(db_name, verbose=False)
+        self.batch_size = batch_size
+        self.pending = []
+        self.commands = 0
+        self.errors = 0
+
+    def run(self, lines, output):
+        """
+        Runs every command in a stream and writes the results.
+
+        Args:
+            lines (iterable): JSON-encoded commands, one per line. Blank lines are skipped.
+            output (file): Where the JSON results are written, one per line.
+
+        Returns:
+            dict: The number of commands and errors, the elapsed seconds and the commands per second.
+        """
+        self.output = output
+        start = time.perf_counter()
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            self.commands += 1
+            try:
+                command = json.loads(line)
+                if not isinstance(command, dict):
+                    raise ValueError("A command must be a JSON object.")
+                op = command.get("op")
+                if op in BATCHED_OPERATIONS:
+                    self.check_role(op)
+                    item = self.batch_item(op, command)
+                    if self.pending and self.pending[0][1] != op:
+                        self.flush()
+                    self.pending.append((line_number, op, item))
+                    if len(self.pending) >= self.batch_size:
+                        self.flush()
+                    continue
+                self.flush()
+                self.emit(line_number, op, **self.execute(op, command))
+            except COMMAND_ERRORS as error:
+                self.flush()
+                self.fail(line_number, error)
+        self.flush()
+        elapsed = time.perf_counter() - start
+        return {
+            "commands": self.commands,
+            "errors": self.errors,
+            "seconds": elapsed,
+            "ops_per_sec": self.commands / elapsed if elapsed else 0.0,
+        }
+
+    def check_role(self, op):
+        """
+        Checks that the logged-in user may run an operation.
+
+        Args:
+            op (str): The operation name.
+
+        Returns:
+            tuple: The (username, user_type) of the logged-in user.
+
+        Raises:
+            ValueError: If nobody is logged in, the session has expired or the user lacks the operation's role.
+        """
+        role = REQUIRED_ROLES[op]
+        user = self.auth.current_user
+        if user is None:
+            raise ValueError("Login required.")
+        if role is not None and user[1] != role:
+            raise ValueError(f"The {op} operation requires the {role} role.")
+        return user
+
+    def execute(self, op, command):
+        """
+        Runs one command that is not batched.
+
+        Args:
+            op (str): The operation name.
+            command (dict): The decoded command.
+
+        Returns:
+            dict: The result fields to write.
+
+        Raises:
+            ValueError: If the operation is unknown or not allowed.
+        """
+        if op == "login":
+            ok = self.auth.login(command["username"], command["password"])
+            return {"status": "ok" if ok else "invalid_credentials"}
+        if op == "logout":
+            self.auth.logout()
+            return {"status": "ok"}
+        if op not in REQUIRED_ROLES:
+            raise ValueError(f"Unknown operation {op!r}.")
+        user = self.check_role(op)
+        if op == "search":
+            criteria = search_criteria(command)
+            books = self.book_manager.search_books(**criteria)
+            if criteria.get("count_only"):
+                return {"count": books}
+            return {"books": [book_to_dict(book) for book in books]}
+        status = self.book_manager.return_book(user[0], check_field("isbn", command["isbn"], str))
+        return {"isbn": command["isbn"], "status": status}
+
+    def batch_item(self, op, command):
+        """
+        Extracts the argument a batched command contributes to its batch API call.
+
+        Args:
+            op (str): "add", "delete" or "borrow".
+            command (dict): The decoded command.
+
+        Returns:
+            object: A (title, author, year, isbn, copies) tuple for add, or the ISBN otherwise.
+
+        Raises:
+            ValueError: If a field has the wrong type.
+        """
+        if op == "add":
+            return (
+                check_field("title", command["title"], str),
+                check_field("author", command["author"], str),
+                int(command["year"]),
+                check_field("isbn", command["isbn"], str),
+                int(command.get("copies", 1)),
+            )
+        return check_field("isbn", command["isbn"], str)
+
+    def apply(self, op, items):
+        """
+        Applies the items of batched commands through the matching batch API.
+
+        Args:
+            op (str): "add", "delete" or "borrow".
+            items (list): The items built by batch_item.
+
+        Returns:
+            list: An (isbn, status) pair per item.
+
+        Raises:
+            ValueError: If a borrow runs after the session has expired.
+        """
+        if op == "add":
+            return self.book_manager.add_books(items)
+        if op == "delete":
+            return self.book_manager.delete_books(items)
+        user = self.auth.current_user
+        if user is None:
+            raise ValueError("Login required.")
+        return self.book_manager.borrow_books(user[0], items)
+
+    def flush(self):
+        """
+        Applies the pending run of add, delete or borrow commands in one transaction.
+
+        If the transaction fails, its commands are retried one at a time, so only the commands
+        that fail on their own get an error line.
+        """
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        op = pending[0][1]
+        try:
+            results = self.apply(op, [item for _, _, item in pending])
+        except COMMAND_ERRORS:
+            for line_number, _, item in pending:
+                try:
+                    [(isbn, status)] = self.apply(op, [item])
+                except COMMAND_ERRORS as error:
+                    self.fail(line_number, error)
+                else:
+                    self.emit(line_number, op, isbn=isbn, status=status)
+            return
+        for (line_number, _, _), (isbn, status) in zip(pending, results):
+            self.emit(line_number, op, isbn=isbn, status=status)
+
+    def emit(self, line_number, op, **fields):
+        """
+        Writes the result of one command.
+
+        Args:
+            line_number (int): The command's line in the input.
+            op (str): The operation name.
+            **fields: The result fields.
+        """
+        self.output.write(json.dumps({"line": line_number, "op": op, **fields}) + "\n")
+
+    def fail(self, line_number, error):
+        """
+        Writes the error of a command that could not run.
+
+        Args:
+            line_number (int): The command's line in the input.
+            error (Exception): The reason the command failed.
+        """
+        self.errors += 1
+        message = f"Missing field {error}." if isinstance(error, KeyError) else str(error)
+        self.output.write(json.dumps({"line": line_number, "error": message}) + "\n")
+
+
 if __name__ == "__main__":
-    system = BookManagementSystem()
-    system.run()
+    parser = argparse.ArgumentParser(description="Run the Book Management System.")
+    parser.add_argument("--db", default="book_management.db", help="The SQLite database file.")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Run the JSONL commands in FILE (or - for stdin) and write JSONL results instead of showing the menus.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="The maximum number of consecutive add, delete or borrow commands committed together.",
+    )
+    parser.add_argument("--output", default="-", help="Where batch mode writes its results (- for stdout).")
+    args = parser.parse_args()
+
+    if args.batch:
+        runner = BatchRunner(args.db, args.batch_size)
+        source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+        target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            summary = runner.run(source, target)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if target is not sys.stdout:
+                target.close()
+        print(
+            f"{summary['commands']} commands, {summary['errors']} errors in {summary['seconds']:.2f}s "
+            f"({summary['ops_per_sec']:,.0f} commands/s)",
+            file=sys.stderr,
+        )
+    else:
+        system = BookManagementSystem(args.db)
+        system.run()
@@ -0,0 +1,494 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for versioning the Book Management System (BMS) database schema. Records the schema version in PRAGMA user_version and applies the pending migrations once per process, so the rest of the system can assume every table exists.
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from connection_pool import get_pool
+from isbn import isbn_key
+
+
+def create_core_tables(cursor):
+    """
+    Creates the Users and Books tables.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            password TEXT NOT NULL,
+            user_type TEXT NOT NULL CHECK(user_type IN ('admin', 'user'))
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            year INTEGER,
+            isbn TEXT UNIQUE,
+            copies INTEGER NOT NULL DEFAULT 1,
+            available INTEGER NOT NULL DEFAULT 1
+        )
+        """
+    )
+
+    # Databases created before copy counts existed only have the original columns
+    cursor.execute("PRAGMA table_info(Books)")
+    book_columns = {column[1] for column in cursor.fetchall()}
+    if "copies" not in book_columns:
+        cursor.execute("ALTER TABLE Books ADD COLUMN copies INTEGER NOT NULL DEFAULT 1")
+        cursor.execute("ALTER TABLE Books ADD COLUMN available INTEGER NOT NULL DEFAULT 1")
+
+
+def create_book_indexes(cursor):
+    """
+    Creates the secondary indexes for title, author and year searches and orderings.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_title ON Books (title)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_author ON Books (author)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_year ON Books (year)")
+
+
+def create_full_text_search(cursor):
+    """
+    Creates the BooksFTS full-text index over book titles and authors and the triggers that keep it in sync.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'BooksFTS'")
+    exists = cursor.fetchone() is not None
+
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS BooksFTS USING fts5(
+            title,
+            author,
+            content='Books',
+            content_rowid='id',
+            prefix='2 3',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS Books_fts_insert AFTER INSERT ON Books BEGIN
+            INSERT INTO BooksFTS (rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS Books_fts_delete AFTER DELETE ON Books BEGIN
+            INSERT INTO BooksFTS (BooksFTS, rowid, title, author)
+            VALUES ('delete', old.id, old.title, old.author);
+        END
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS Books_fts_update AFTER UPDATE OF title, author ON Books BEGIN
+            INSERT INTO BooksFTS (BooksFTS, rowid, title, author)
+            VALUES ('delete', old.id, old.title, old.author);
+            INSERT INTO BooksFTS (rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+        """
+    )
+
+    # Index books that were added before the full-text table existed
+    if not exists:
+        cursor.execute("INSERT INTO BooksFTS (BooksFTS) VALUES ('rebuild')")
+
+
+def create_loans(cursor):
+    """
+    Creates the Loans table and its indexes, migrating rows from the old BorrowedBooks table if present.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Loans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES Users (id) ON DELETE CASCADE,
+            book_id INTEGER NOT NULL REFERENCES Books (id) ON DELETE CASCADE,
+            borrowed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            returned_at TEXT
+        )
+        """
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_loans_user ON Loans (user_id, returned_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_loans_book ON Loans (book_id, returned_at)")
+
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'BorrowedBooks'")
+    if cursor.fetchone() is None:
+        return
+
+    # BorrowedBooks only recorded titles, so each loan is matched to the first book with that title
+    cursor.execute(
+        """
+        INSERT INTO Loans (user_id, book_id)
+        SELECT Users.id, (SELECT MIN(Books.id) FROM Books WHERE Books.title = BorrowedBooks.book_title)
+        FROM BorrowedBooks JOIN Users ON Users.username = BorrowedBooks.username
+        WHERE EXISTS (SELECT 1 FROM Books WHERE Books.title = BorrowedBooks.book_title)
+        """
+    )
+    cursor.execute(
+        """
+        UPDATE Books SET available = MAX(
+            copies - (SELECT COUNT(*) FROM Loans WHERE Loans.book_id = Books.id AND Loans.returned_at IS NULL),
+            0
+        )
+        """
+    )
+    cursor.execute("DROP TABLE BorrowedBooks")
+
+
+def create_sync_state(cursor):
+    """
+    Creates the SyncState table that remembers the fingerprint of every synced feed file.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS SyncState (
+            path TEXT PRIMARY KEY,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            synced_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def create_loan_stats(cursor):
+    """
+    Creates the loan summary tables, the Loans triggers that keep them current, and fills them from the loan history.
+
+    BookLoanStats and UserLoanStats count every loan and the loans still open per book and
+    per user, and DailyLoanStats counts borrows and returns per UTC day, so reports read a
+    few summary rows instead of aggregating the whole history.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS BookLoanStats (
+            book_id INTEGER PRIMARY KEY REFERENCES Books (id) ON DELETE CASCADE,
+            borrows INTEGER NOT NULL DEFAULT 0,
+            active INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS UserLoanStats (
+            user_id INTEGER PRIMARY KEY REFERENCES Users (id) ON DELETE CASCADE,
+            borrows INTEGER NOT NULL DEFAULT 0,
+            active INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS DailyLoanStats (
+            day TEXT PRIMARY KEY,
+            borrows INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """
+    )
+    # Top-N reports walk these indexes from the top and stop after N rows
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_book_loan_stats_borrows ON BookLoanStats (borrows)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_loan_stats_active ON UserLoanStats (active)")
+
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS Loans_stats_insert AFTER INSERT ON Loans BEGIN
+            INSERT INTO BookLoanStats (book_id, borrows, active) VALUES (new.book_id, 1, new.returned_at IS NULL)
+            ON CONFLICT (book_id) DO UPDATE SET borrows = borrows + 1, active = active + excluded.active;
+            INSERT INTO UserLoanStats (user_id, borrows, active) VALUES (new.user_id, 1, new.returned_at IS NULL)
+            ON CONFLICT (user_id) DO UPDATE SET borrows = borrows + 1, active = active + excluded.active;
+            INSERT INTO DailyLoanStats (day, borrows) VALUES (date(new.borrowed_at), 1)
+            ON CONFLICT (day) DO UPDATE SET borrows = borrows + 1;
+        END
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS Loans_stats_return AFTER UPDATE OF returned_at ON Loans
+        WHEN old.returned_at IS NULL AND new.returned_at IS NOT NULL BEGIN
+            UPDATE BookLoanStats SET active = active - 1 WHERE book_id = new.book_id;
+            UPDATE UserLoanStats SET active = active - 1 WHERE user_id = new.user_id;
+            INSERT INTO DailyLoanStats (day, returns) VALUES (date(new.returned_at), 1)
+            ON CONFLICT (day) DO UPDATE SET returns = returns + 1;
+        END
+        """
+    )
+    # Deleting a book or user cascades to its loans, which leave every summary as if they never happened
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS Loans_stats_delete AFTER DELETE ON Loans BEGIN
+            UPDATE BookLoanStats SET borrows = borrows - 1, active = active - (old.returned_at IS NULL)
+            WHERE book_id = old.book_id;
+            DELETE FROM BookLoanStats WHERE book_id = old.book_id AND borrows = 0;
+            UPDATE UserLoanStats SET borrows = borrows - 1, active = active - (old.returned_at IS NULL)
+            WHERE user_id = old.user_id;
+            DELETE FROM UserLoanStats WHERE user_id = old.user_id AND borrows = 0;
+            UPDATE DailyLoanStats SET borrows = borrows - 1 WHERE day = date(old.borrowed_at);
+            UPDATE DailyLoanStats SET returns = returns - 1 WHERE day = date(old.returned_at);
+        END
+        """
+    )
+    rebuild_loan_stats(cursor)
+
+
+def rebuild_loan_stats(cursor):
+    """
+    Recomputes the loan summary tables from the Loans table.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+    """
+    cursor.execute("DELETE FROM BookLoanStats")
+    cursor.execute("DELETE FROM UserLoanStats")
+    cursor.execute("DELETE FROM DailyLoanStats")
+    cursor.execute(
+        """
+        INSERT INTO BookLoanStats (book_id, borrows, active)
+        SELECT book_id, COUNT(*), SUM(returned_at IS NULL) FROM Loans GROUP BY book_id
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO UserLoanStats (user_id, borrows, active)
+        SELECT user_id, COUNT(*), SUM(returned_at IS NULL) FROM Loans GROUP BY user_id
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO DailyLoanStats (day, borrows)
+        SELECT date(borrowed_at), COUNT(*) FROM Loans GROUP BY date(borrowed_at)
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO DailyLoanStats (day, returns)
+        SELECT date(returned_at), COUNT(*) FROM Loans WHERE returned_at IS NOT NULL GROUP BY date(returned_at)
+        ON CONFLICT (day) DO UPDATE SET returns = excluded.returns
+        """
+    )
+
+
+def create_oplog_checkpoint(cursor):
+    """
+    Creates the OplogCheckpoint table that records how far each operation log has been applied.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS OplogCheckpoint (
+            log TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+        """
+    )
+
+
+def create_isbn_keys(cursor):
+    """
+    Adds the isbn13 integer key to Books, fills it in from the stored ISBNs and indexes it.
+
+    Stored ISBNs are rewritten in their canonical 13-digit form. When several rows spell the
+    same ISBN differently, only the row already in canonical form, or else the oldest row, gets
+    the key; the others keep a NULL key and stay reachable by their exact string. Identifiers
+    that are not valid ISBNs also keep a NULL key.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+    """
+    cursor.execute("PRAGMA table_info(Books)")
+    if "isbn13" not in {column[1] for column in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE Books ADD COLUMN isbn13 INTEGER")
+
+    keepers = {}
+    cursor.execute("SELECT id, isbn FROM Books WHERE isbn IS NOT NULL AND isbn13 IS NULL ORDER BY id")
+    for book_id, book_isbn in cursor.fetchall():
+        key = isbn_key(book_isbn)
+        if key is None:
+            continue
+        kept = keepers.get(key)
+        if kept is None or (kept[1] != str(key) and book_isbn == str(key)):
+            keepers[key] = (book_id, book_isbn)
+    cursor.executemany(
+        "UPDATE Books SET isbn13 = ?, isbn = ? WHERE id = ?",
+        ((key, str(key), book_id) for key, (book_id, _) in keepers.items()),
+    )
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_books_isbn13 ON Books (isbn13)")
+
+
+def count_returned_loans_on_insert(cursor):
+    """
+    Replaces the Loans insert trigger with one that also counts the return of a loan inserted already returned.
+
+    The first version only counted the borrow, while deleting such a loan and rebuilding the
+    summaries both count its return, so DailyLoanStats is rebuilt from Loans afterwards.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor object for executing SQL commands.
+    """
+    cursor.execute("DROP TRIGGER IF EXISTS Loans_stats_insert")
+    cursor.execute(
+        """
+        CREATE TRIGGER Loans_stats_insert AFTER INSERT ON Loans BEGIN
+            INSERT INTO BookLoanStats (book_id, borrows, active) VALUES (new.book_id, 1, new.returned_at IS NULL)
+            ON CONFLICT (book_id) DO UPDATE SET borrows = borrows + 1, active = active + excluded.active;
+            INSERT INTO UserLoanStats (user_id, borrows, active) VALUES (new.user_id, 1, new.returned_at IS NULL)
+            ON CONFLICT (user_id) DO UPDATE SET borrows = borrows + 1, active = active + excluded.active;
+            INSERT INTO DailyLoanStats (day, borrows) VALUES (date(new.borrowed_at), 1)
+            ON CONFLICT (day) DO UPDATE SET borrows = borrows + 1;
+            INSERT INTO DailyLoanStats (day, returns) SELECT date(new.returned_at), 1 WHERE new.returned_at IS NOT NULL
+            ON CONFLICT (day) DO UPDATE SET returns = returns + 1;
+        END
+        """
+    )
+    rebuild_loan_stats(cursor)
+
+
+# Every schema change, in order. A database's PRAGMA user_version is the number of the last
+# migration applied to it. Databases created before versioning report 0 and may already have
+# some of the tables, so migrations only create what is missing. Append new migrations; never
+# renumber or edit one that has shipped.
+MIGRATIONS = (
+    (1, "Users and Books tables", create_core_tables),
+    (2, "Books title, author and year indexes", create_book_indexes),
+    (3, "BooksFTS full-text index", create_full_text_search),
+    (4, "Loans table", create_loans),
+    (5, "SyncState table", create_sync_state),
+    (6, "Loan summary tables", create_loan_stats),
+    (7, "OplogCheckpoint table", create_oplog_checkpoint),
+    (8, "Books isbn13 key", create_isbn_keys),
+    (9, "Loan summaries count returned loans on insert", count_returned_loans_on_insert),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    """
+    Reads the schema version recorded in a database.
+
+    Args:
+        conn (sqlite3.Connection): A connection to the database.
+
+    Returns:
+        int: The number of the last migration applied, or 0 for an unversioned database.
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, verbose=False):
+    """
+    Applies the pending migrations to a database in one transaction.
+
+    The version is read again after taking the write lock, so processes starting at the same
+    time apply each migration only once.
+
+    Args:
+        conn (sqlite3.Connection): A read-write connection to the database.
+        verbose (bool): Whether to print each migration as it is applied.
+
+    Returns:
+        list: The numbers of the migrations applied, empty when the schema was already current.
+
+    Raises:
+        RuntimeError: If the database was migrated by a newer version of the BMS.
+    """
+    if schema_version(conn) == SCHEMA_VERSION:
+        return []
+    if conn.in_transaction:
+        conn.commit()
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        current = schema_version(conn)
+        if current > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"The database schema is version {current}, but this BMS only knows up to version {SCHEMA_VERSION}."
+            )
+        applied = []
+        for version, description, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            if verbose:
+                print(f"Applying migration {version}: {description}")
+            apply(cursor)
+            applied.append(version)
+        # PRAGMA does not take parameters; the version is always one of the integers above.
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return applied
+
+
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def ensure_schema(db_name="book_management.db"):
+    """
+    Brings a database file's schema up to date the first time this process uses it.
+
+    Later calls for the same file return without touching the database.
+
+    Args:
+        db_name (str): The name of the SQLite database file.
+    """
+    key = os.path.abspath(db_name)
+    if key in _migrated:
+        return
+    with _migrated_lock:
+        if key not in _migrated:
+            migrate(get_pool(db_name).connection())
+            _migrated.add(key)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations to a BMS database.")
+    parser.add_argument("--db", default="book_management.db", help="The SQLite database file.")
+    args = parser.parse_args()
+
+    conn = get_pool(args.db).connection()
+    before = schema_version(conn)
+    start = time.perf_counter()
+    applied = migrate(conn, verbose=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if applied:
+        print(f"Migrated {args.db} from version {before} to {SCHEMA_VERSION} in {elapsed:.1f} ms.")
+    else:
+        print(f"{args.db} is already at schema version {SCHEMA_VERSION} (checked in {elapsed:.2f} ms).")
@@ -0,0 +1,566 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for a durable operation log in front of the Book Management System (BMS) database. Write operations are appended to a local log and acknowledged once a group of them has been fsynced, then applied to SQLite in batches by a background thread; operations still in the log after a crash are replayed at startup.
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; the log is then not protected against a second process.
+    fcntl = None
+
+from connection_pool import get_pool
+from migrations import ensure_schema
+
+# Seconds the log writer waits for more operations before fsyncing a group.
+DEFAULT_WINDOW = 0.002
+DEFAULT_MAX_BATCH = 256
+# The log is truncated once every operation in it has been applied and it has grown past this size.
+DEFAULT_MAX_LOG_BYTES = 16 * 1024 * 1024
+
+_STOP = object()
+
+
+def freeze(value):
+    """
+    Converts an operation argument into the immutable form that is logged and applied.
+
+    Lists and other iterables such as generators become tuples, so the operation sees the
+    same values live and when replayed from the log.
+
+    Args:
+        value (object): A string, number, None, or an iterable of those.
+
+    Returns:
+        object: The value with every iterable turned into a tuple.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return tuple(freeze(item) for item in value)
+
+
+def encode_record(seq, name, args):
+    """
+    Encodes one log record as a line with a checksum, so a torn final write can be detected.
+
+    Args:
+        seq (int): The record's sequence number.
+        name (str): The operation name.
+        args (tuple): The frozen operation arguments.
+
+    Returns:
+        bytes: The record line.
+    """
+    payload = json.dumps([name, args], separators=(",", ":"))
+    return f"{seq} {zlib.crc32(payload.encode('utf-8')):08x} {payload}\n".encode("utf-8")
+
+
+def lock_log_file(file, path):
+    """
+    Takes an exclusive lock on an open log file, so only one process appends to and replays it.
+
+    The lock is released when the file is closed or the process exits.
+
+    Args:
+        file (io.BufferedWriter): The open log file.
+        path (str): The path of the log file, for the error message.
+
+    Raises:
+        RuntimeError: If another process already has the log open.
+    """
+    if fcntl is None:
+        return
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        file.close()
+        raise RuntimeError(
+            f"The operation log {path} is in use by another process; only one process may open "
+            "a database in LOGGED mode at a time."
+        ) from None
+
+
+def read_records(path):
+    """
+    Reads the intact records of a log file.
+
+    Args:
+        path (str): The path of the log file.
+
+    Returns:
+        tuple: A list of (seq, name, args) records and the byte length of the intact prefix.
+    """
+    records = []
+    valid_bytes = 0
+    if not os.path.exists(path):
+        return records, valid_bytes
+    with open(path, "rb") as file:
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                seq, checksum, payload = line.decode("utf-8").rstrip("\n").split(" ", 2)
+                if int(checksum, 16) != zlib.crc32(payload.encode("utf-8")):
+                    break
+                name, args = json.loads(payload)
+            except ValueError:
+                break
+            records.append((int(seq), name, freeze(args)))
+            valid_bytes += len(line)
+    return records, valid_bytes
+
+
+class LoggedOperation:
+    """
+    An operation submitted to an OperationLog.
+    """
+
+    __slots__ = ("seq", "name", "operation", "args", "durable", "result")
+
+    def __init__(self, name, operation, args):
+        """
+        Initializes the LoggedOperation object.
+
+        Args:
+            name (str): The operation name written to the log.
+            operation (callable): Called with a cursor followed by `args` when applied.
+            args (tuple): The frozen operation arguments.
+        """
+        self.seq = None
+        self.name = name
+        self.operation = operation
+        self.args = args
+        self.durable = Future()
+        self.result = Future()
+
+
+class OperationLog:
+    """
+    Appends write operations to a log file and applies them to SQLite in the background.
+
+    A log writer thread gathers the operations submitted within a short window, appends them
+    and fsyncs the file once for the whole group; each operation's `durable` future is then
+    resolved. An applier thread runs the logged operations in batches, one SAVEPOINT each as
+    in WriteQueue, and records the last applied sequence number in OplogCheckpoint in the same
+    transaction, so replay after a crash applies every logged operation exactly once.
+    """
+
+    def __init__(
+        self,
+        db_name="book_management.db",
+        operations=None,
+        log_path=None,
+        window=DEFAULT_WINDOW,
+        max_batch=DEFAULT_MAX_BATCH,
+        max_log_bytes=DEFAULT_MAX_LOG_BYTES,
+    ):
+        """
+        Initializes the OperationLog object, replays unapplied operations and starts its threads.
+
+        Args:
+            db_name (str): The name of the SQLite database file.
+            operations (dict): The functions that may be logged, keyed by name.
+            log_path (str): The path of the log file, or None for the database path plus "-oplog".
+            window (float): The number of seconds to wait for more operations before an fsync.
+            max_batch (int): The maximum number of operations fsynced or applied together.
+            max_log_bytes (int): The size past which a fully applied log is truncated.
+
+        Raises:
+            RuntimeError: If another process has the same log open.
+        """
+        self.db_name = db_name
+        self.operations = dict(operations or {})
+        self.log_path = log_path or db_name + "-oplog"
+        self.log_name = os.path.basename(self.log_path)
+        self.window = window
+        self.max_batch = max_batch
+        self.max_log_bytes = max_log_bytes
+        self.pool = get_pool(db_name)
+        ensure_schema(db_name)
+
+        self.appended = 0
+        self.groups = 0
+        self.largest_group = 0
+        self.applied = 0
+        self.batches = 0
+        self.failure = None
+        self._pending = queue.Queue()
+        self._to_apply = queue.Queue()
+        self._file_lock = threading.Lock()
+        self._applied = threading.Condition()
+        self._unapplied = 0
+
+        self._file = open(self.log_path, "ab")
+        lock_log_file(self._file, self.log_path)
+        conn = self.pool.connection()
+        self.checkpoint = self.read_checkpoint(conn)
+        records, valid_bytes = read_records(self.log_path)
+        # Drop a torn final record; its caller was never acknowledged.
+        self._file.truncate(valid_bytes)
+        self.replayed = self.replay(conn, [record for record in records if record[0] > self.checkpoint])
+        self.next_seq = max([self.checkpoint] + [record[0] for record in records]) + 1
+
+        self._writer = threading.Thread(target=self._write_loop, name="bms-oplog-writer", daemon=True)
+        self._applier = threading.Thread(target=self._apply_loop, name="bms-oplog-applier", daemon=True)
+        self._writer.start()
+        self._applier.start()
+
+    def read_checkpoint(self, conn):
+        """
+        Reads the sequence number of the last operation applied from this log.
+
+        Args:
+            conn (sqlite3.Connection): A connection to the database.
+
+        Returns:
+            int: The sequence number, or 0 if nothing was applied yet.
+        """
+        row = conn.execute("SELECT seq FROM OplogCheckpoint WHERE log = ?", (self.log_name,)).fetchone()
+        return row[0] if row else 0
+
+    def replay(self, conn, records):
+        """
+        Applies the logged operations that the database has not seen yet.
+
+        Args:
+            conn (sqlite3.Connection): The connection to apply them on.
+            records (list): The (seq, name, args) records after the checkpoint, in order.
+
+        Returns:
+            int: The number of operations replayed.
+        """
+        for start in range(0, len(records), self.max_batch):
+            batch = []
+            for seq, name, args in records[start:start + self.max_batch]:
+                if name not in self.operations:
+                    raise ValueError(f"The log {self.log_path} contains the unknown operation {name!r}.")
+                item = LoggedOperation(name, self.operations[name], args)
+                item.seq = seq
+                batch.append(item)
+            self.apply_batch(conn, batch)
+        return len(records)
+
+    def submit(self, operation, *args):
+        """
+        Queues a write operation for logging.
+
+        Args:
+            operation (callable): One of the registered operations, called with a cursor followed by `args`.
+            *args: The operation arguments; iterables are materialized into tuples.
+
+        Returns:
+            LoggedOperation: Its `durable` future resolves to the sequence number once the
+                operation is on disk, and its `result` future to the operation's return value
+                once it has been applied.
+        """
+        name = operation.__name__
+        if self.operations.get(name) is not operation:
+            raise ValueError(f"{name} is not a registered operation.")
+        if self.failure is not None:
+            raise RuntimeError(f"The operation log stopped applying operations: {self.failure}")
+        if not self._writer.is_alive():
+            raise RuntimeError("The operation log is closed.")
+        item = LoggedOperation(name, operation, freeze(args))
+        self._pending.put(item)
+        return item
+
+    def log(self, operation, *args):
+        """
+        Logs a write operation and waits only until it is durable, leaving it to be applied in the background.
+
+        Args:
+            operation (callable): One of the registered operations, called with a cursor followed by `args`.
+            *args: The operation arguments.
+
+        Returns:
+            LoggedOperation: The logged operation, whose `result` future resolves once it has been applied.
+        """
+        item = self.submit(operation, *args)
+        item.durable.result()
+        return item
+
+    def wait_applied(self, timeout=None):
+        """
+        Waits until every operation acknowledged so far has been applied to the database.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait, or None to wait indefinitely.
+
+        Returns:
+            bool: True once they are applied, False if the timeout expired first.
+        """
+        with self._file_lock:
+            seq = self.next_seq - 1
+        with self._applied:
+            done = self._applied.wait_for(lambda: self.checkpoint >= seq or self.failure is not None, timeout)
+        if self.failure is not None:
+            raise RuntimeError(f"The operation log stopped applying operations: {self.failure}")
+        return done
+
+    def run(self, operation, *args):
+        """
+        Logs a write operation and waits until it has been applied.
+
+        Args:
+            operation (callable): One of the registered operations, called with a cursor followed by `args`.
+            *args: The operation arguments.
+
+        Returns:
+            object: The operation's return value.
+        """
+        return self.submit(operation, *args).result.result()
+
+    def next_group(self, source, first):
+        """
+        Gathers the items queued behind a first one, waiting up to the group-commit window.
+
+        Args:
+            source (queue.Queue): The queue to drain.
+            first (object): The item already taken from the queue.
+
+        Returns:
+            list: Up to max_batch items.
+        """
+        group = [first]
+        deadline = time.monotonic() + self.window
+        while len(group) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = source.get(timeout=remaining) if remaining > 0 else source.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                source.put(_STOP)
+                break
+            group.append(item)
+        return group
+
+    def append_group(self, group):
+        """
+        Writes a group of operations to the log and fsyncs it once.
+
+        Args:
+            group (list): The LoggedOperation items to append.
+        """
+        with self._file_lock:
+            lines = []
+            for item in group:
+                item.seq = self.next_seq
+                self.next_seq += 1
+                lines.append(encode_record(item.seq, item.name, item.args))
+            self._file.write(b"".join(lines))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unapplied += len(group)
+        self.appended += len(group)
+        self.groups += 1
+        self.largest_group = max(self.largest_group, len(group))
+
+    def _write_loop(self):
+        """
+        The log writer thread's loop.
+        """
+        while True:
+            first = self._pending.get()
+            if first is _STOP:
+                self._to_apply.put(_STOP)
+                return
+            group = self.next_group(self._pending, first)
+            try:
+                self.append_group(group)
+            except Exception as error:
+                for item in group:
+                    item.durable.set_exception(error)
+                    item.result.set_exception(error)
+                continue
+            for item in group:
+                item.durable.set_result(item.seq)
+            self._to_apply.put(group)
+
+    def apply_batch(self, conn, batch):
+        """
+        Runs logged operations in one transaction that also advances the checkpoint.
+
+        Args:
+            conn (sqlite3.Connection): The applier's connection.
+            batch (list): The LoggedOperation items to apply, in sequence order.
+        """
+        outcomes = []
+        cursor = conn.cursor()
+        if conn.in_transaction:
+            conn.commit()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            for item in batch:
+                cursor.execute("SAVEPOINT operation")
+                try:
+                    outcomes.append((item, item.operation(cursor, *item.args), None))
+                except Exception as error:
+                    cursor.execute("ROLLBACK TO operation")
+                    outcomes.append((item, None, error))
+                cursor.execute("RELEASE operation")
+            cursor.execute(
+                "INSERT INTO OplogCheckpoint (log, seq) VALUES (?, ?) "
+                "ON CONFLICT (log) DO UPDATE SET seq = excluded.seq",
+                (self.log_name, batch[-1].seq),
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        with self._applied:
+            self.checkpoint = batch[-1].seq
+            self._applied.notify_all()
+        self.applied += len(batch)
+        self.batches += 1
+        for item, result, error in outcomes:
+            if error is None:
+                item.result.set_result(result)
+            else:
+                item.result.set_exception(error)
+
+    def truncate_if_applied(self):
+        """
+        Empties the log file once it is large and every operation in it has been applied.
+        """
+        with self._file_lock:
+            if self._unapplied == 0 and self._file.tell() > self.max_log_bytes:
+                self._file.truncate(0)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    def _apply_loop(self):
+        """
+        The applier thread's loop.
+        """
+        conn = self.pool.connection()
+        while True:
+            first = self._to_apply.get()
+            if first is _STOP:
+                return
+            batch = list(first)
+            while len(batch) < self.max_batch:
+                try:
+                    group = self._to_apply.get_nowait()
+                except queue.Empty:
+                    break
+                if group is _STOP:
+                    self._to_apply.put(_STOP)
+                    break
+                batch.extend(group)
+            try:
+                self.apply_batch(conn, batch)
+            except Exception as error:
+                # Applying later operations would move the checkpoint past this batch, so stop
+                # here; everything after the checkpoint stays in the log for the next startup.
+                with self._applied:
+                    self.failure = error
+                    self._applied.notify_all()
+                self.fail_remaining(batch, error)
+                return
+            with self._file_lock:
+                self._unapplied -= len(batch)
+            self.truncate_if_applied()
+
+    def fail_remaining(self, batch, error):
+        """
+        Fails a batch that could not be applied and every operation logged after it.
+
+        Args:
+            batch (list): The LoggedOperation items of the failed batch.
+            error (Exception): The reason the batch failed.
+        """
+        for item in batch:
+            item.result.set_exception(error)
+        while True:
+            group = self._to_apply.get()
+            if group is _STOP:
+                return
+            for item in group:
+                item.result.set_exception(error)
+
+    def stats(self):
+        """
+        Returns the log and apply counters.
+
+        Returns:
+            dict: Operations appended and applied, fsync groups, apply batches, the largest
+                group, operations replayed at startup and the last applied sequence number.
+        """
+        return {
+            "appended": self.appended,
+            "fsync_groups": self.groups,
+            "largest_group": self.largest_group,
+            "applied": self.applied,
+            "apply_batches": self.batches,
+            "replayed": self.replayed,
+            "checkpoint": self.checkpoint,
+        }
+
+    def close(self):
+        """
+        Logs and applies the operations already queued, then stops both threads.
+        """
+        if self._writer.is_alive():
+            self._pending.put(_STOP)
+            self._writer.join()
+            self._applier.join()
+            self._file.close()
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def get_operation_log(db_name="book_management.db", operations=None):
+    """
+    Returns the shared OperationLog for a database file, replaying and starting it on first use.
+
+    Args:
+        db_name (str): The name of the SQLite database file.
+        operations (dict): The functions that may be logged, keyed by name.
+
+    Returns:
+        OperationLog: The log shared by every caller writing to the same database file.
+    """
+    key = os.path.abspath(db_name)
+    with _logs_lock:
+        log = _logs.get(key)
+        if log is None or not log._writer.is_alive():
+            log = OperationLog(db_name, operations)
+            _logs[key] = log
+        return log
+
+
+def close_all_operation_logs():
+    """
+    Stops every shared operation log after applying the operations already queued.
+    """
+    with _logs_lock:
+        logs = list(_logs.values())
+        _logs.clear()
+    for log in logs:
+        log.close()
+
+
+if __name__ == "__main__":
+    from book_management import WRITE_OPERATIONS
+
+    parser = argparse.ArgumentParser(description="Replay the operations a crash left in a BMS operation log.")
+    parser.add_argument("--db", default="book_management.db", help="The SQLite database file.")
+    parser.add_argument("--log", help="The log file, by default the database path plus -oplog.")
+    args = parser.parse_args()
+
+    log = OperationLog(args.db, WRITE_OPERATIONS, log_path=args.log)
+    log.close()
+    print(f"Replayed {log.replayed} operations; {log.log_path} is applied up to #{log.checkpoint}.")
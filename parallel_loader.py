@@ -0,0 +1,291 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for loading very large Books feeds into the Book Management System (BMS) on several cores. The feed is split into byte ranges that worker processes parse, validate and sort into run files; the runs are merged in ISBN order and inserted by a single writer, and rejected rows are collected into a reject file.
+"""
+
+import argparse
+import csv
+import heapq
+import io
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from operator import itemgetter
+
+from bulk_loader import DEFAULT_BATCH_SIZE, BulkLoader, chunked, iter_csv_lines
+from connection_pool import get_pool
+from security import DEFAULT_HASH_ITERATIONS
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+# Each worker holds one chunk and its parsed rows in memory while it sorts them
+DEFAULT_CHUNK_SIZE = 32 * 1024 * 1024
+# The isbn13 column of a parsed Books row, which the runs are sorted and merged on
+BOOK_KEY = itemgetter(4)
+# The trigger that adds each new book to the BooksFTS full-text index
+FTS_INSERT_TRIGGER = "Books_fts_insert"
+
+
+def split_chunks(path, chunk_size):
+    """
+    Splits a file into byte ranges of roughly `chunk_size` bytes that start and end on line boundaries.
+
+    Rows are assumed to fit on one line, which holds for Books.txt-style feeds; a quoted field
+    containing a newline could be cut in two.
+
+    Args:
+        path (str): The path of the file.
+        chunk_size (int): The target number of bytes per range.
+
+    Returns:
+        list: The (start, end) byte offsets of each range, in file order.
+    """
+    size = os.path.getsize(path)
+    chunks = []
+    with open(path, "rb") as file:
+        start = 0
+        while start < size:
+            file.seek(min(start + max(1, chunk_size), size))
+            file.readline()
+            end = min(file.tell(), size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def parse_chunk(path, start, end, run_path, parse_row):
+    """
+    Parses one byte range of a feed in a worker process and writes its valid rows, sorted, to a run file.
+
+    Args:
+        path (str): The path of the feed.
+        start (int): The offset of the first byte of the range.
+        end (int): The offset just past the last byte of the range.
+        run_path (str): Where to write the sorted rows.
+        parse_row (callable): A module-level function converting a list of fields into a row.
+
+    Returns:
+        tuple: The run path, the number of rows written, the number of lines in the range and
+            the (line, reason, fields) of each rejected row, with lines counted from the range start.
+    """
+    with open(path, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+
+    rows = []
+    rejected = []
+    for line_num, fields in iter_csv_lines(io.StringIO(data.decode("utf-8"), newline="")):
+        try:
+            rows.append(parse_row(fields))
+        except ValueError as error:
+            rejected.append((line_num, str(error), fields))
+    # A stable sort keeps rows with the same ISBN in file order, so the first one still wins
+    rows.sort(key=BOOK_KEY)
+
+    with open(run_path, "wb") as run:
+        for batch in chunked(rows, DEFAULT_BATCH_SIZE):
+            pickle.dump(batch, run, pickle.HIGHEST_PROTOCOL)
+    return run_path, len(rows), data.count(b"\n"), rejected
+
+
+def iter_run(run_path):
+    """
+    Streams the rows of a run file written by parse_chunk.
+
+    Args:
+        run_path (str): The path of the run file.
+
+    Yields:
+        tuple: The next row, in sorted order.
+    """
+    with open(run_path, "rb") as run:
+        while True:
+            try:
+                batch = pickle.load(run)
+            except EOFError:
+                return
+            yield from batch
+
+
+def write_rejects(path, rejects):
+    """
+    Writes rejected rows to a CSV file of line number, reason and the original fields.
+
+    Args:
+        path (str): The path of the reject file.
+        rejects (list): The (line, reason, fields) of each rejected row.
+
+    Returns:
+        int: The number of rows written.
+    """
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        for line_num, reason, fields in rejects:
+            writer.writerow([line_num, reason, *fields])
+    return len(rejects)
+
+
+class ParallelLoader(BulkLoader):
+    """
+    Loads Users and Books files like BulkLoader, parsing the Books file in a process pool and
+    inserting its rows in ISBN order.
+
+    Inserting in key order appends to the ISBN indexes instead of touching random pages of them,
+    and rows are numbered in ISBN order rather than file order. The full-text index is filled
+    with one statement after the inserts instead of by a trigger per row. Users files are small
+    and are loaded as before.
+    """
+
+    def __init__(
+        self,
+        conn,
+        batch_size=DEFAULT_BATCH_SIZE,
+        hash_iterations=DEFAULT_HASH_ITERATIONS,
+        workers=DEFAULT_WORKERS,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        reject_file=None,
+        work_dir=None,
+    ):
+        """
+        Initializes the ParallelLoader object.
+
+        Args:
+            conn (sqlite3.Connection): The connection to load the data through.
+            batch_size (int): The number of rows inserted per executemany call.
+            hash_iterations (int): The PBKDF2 iteration count for imported passwords.
+            workers (int): The number of parsing processes; 1 parses in this process.
+            chunk_size (int): The target number of bytes parsed per task.
+            reject_file (str): Where to write the rejected Books rows, or None to only report them.
+            work_dir (str): The directory for the temporary run files, or None for the system default.
+        """
+        super().__init__(conn, batch_size=batch_size, hash_iterations=hash_iterations)
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.reject_file = reject_file
+        self.work_dir = work_dir
+        self.timings = {}
+
+    @contextmanager
+    def deferred_search_index(self):
+        """
+        Disables the BooksFTS insert trigger for the duration of a Books load and indexes the new books afterwards.
+
+        Book ids only grow, so the new books are the ones above the largest id before the load.
+        """
+        trigger = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (FTS_INSERT_TRIGGER,)
+        ).fetchone()
+        if trigger is None:
+            yield
+            return
+        last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM Books").fetchone()[0]
+        self.conn.execute(f'DROP TRIGGER "{FTS_INSERT_TRIGGER}"')
+        try:
+            yield
+            self.conn.execute(
+                "INSERT INTO BooksFTS (rowid, title, author) SELECT id, title, author FROM Books WHERE id > ?",
+                (last_id,),
+            )
+        finally:
+            self.conn.execute(trigger[0])
+
+    def sort_rows(self, path, parse_row, run_dir):
+        """
+        Parses a feed into sorted run files, in parallel when more than one worker is configured.
+
+        Args:
+            path (str): The path of the feed.
+            parse_row (callable): A module-level function converting a list of fields into a row.
+            run_dir (str): The directory to write the run files in.
+
+        Returns:
+            tuple: The run file paths and the (line, reason, fields) of each rejected row, with
+                line numbers counted from the start of the file.
+        """
+        chunks = split_chunks(path, self.chunk_size)
+        tasks = [
+            (path, start, end, os.path.join(run_dir, f"run{number}.pickle"), parse_row)
+            for number, (start, end) in enumerate(chunks)
+        ]
+        if self.workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+                results = list(executor.map(parse_chunk, *zip(*tasks)))
+        else:
+            results = [parse_chunk(*task) for task in tasks]
+
+        runs = []
+        rejects = []
+        lines_before = 0
+        for run_path, row_count, line_count, rejected in results:
+            if row_count:
+                runs.append(run_path)
+            rejects.extend((lines_before + line_num, reason, fields) for line_num, reason, fields in rejected)
+            lines_before += line_count
+        return runs, rejects
+
+    def load_rows(self, summary, path, statement, parse_row):
+        """
+        Loads one file into one table, merging the sorted runs of a Books file into a single writer.
+
+        Args:
+            summary (LoadSummary): The summary to record the results in.
+            path (str): The path of the CSV file.
+            statement (str): The INSERT OR IGNORE statement for one row.
+            parse_row (callable): Converts a list of fields into an insertable tuple.
+        """
+        if summary.table != "Books":
+            super().load_rows(summary, path, statement, parse_row)
+            return
+
+        with tempfile.TemporaryDirectory(prefix="bms-load-", dir=self.work_dir) as run_dir:
+            began = time.perf_counter()
+            runs, rejects = self.sort_rows(path, parse_row, run_dir)
+            sorted_at = time.perf_counter()
+            merged = heapq.merge(*(iter_run(run_path) for run_path in runs), key=BOOK_KEY)
+            with self.deferred_search_index():
+                for batch in chunked(merged, self.batch_size):
+                    cursor = self.conn.executemany(statement, batch)
+                    summary.inserted += cursor.rowcount
+                    summary.duplicates += len(batch) - cursor.rowcount
+            self.timings = {"parse_seconds": sorted_at - began, "write_seconds": time.perf_counter() - sorted_at}
+
+        summary.rejected.extend((line_num, reason) for line_num, reason, _ in rejects)
+        if self.reject_file:
+            write_rejects(self.reject_file, rejects)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import Users and Books files, parsing Books on several cores.")
+    parser.add_argument("--db", default="book_management.db", help="The SQLite database file.")
+    parser.add_argument("--users", default="Users.txt", help="The Users file to import.")
+    parser.add_argument("--books", default="Books.txt", help="The Books file to import.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Parsing processes.")
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_SIZE // 2 ** 20, help="Megabytes per parse task.")
+    parser.add_argument("--reject-file", help="Where to write the rejected Books rows.")
+    parser.add_argument("--work-dir", help="The directory for the temporary run files.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per batch.")
+    parser.add_argument(
+        "--hash-iterations", type=int, default=DEFAULT_HASH_ITERATIONS, help="PBKDF2 iterations per password."
+    )
+    args = parser.parse_args()
+
+    loader = ParallelLoader(
+        get_pool(args.db).connection(),
+        batch_size=args.batch_size,
+        hash_iterations=args.hash_iterations,
+        workers=args.workers,
+        chunk_size=args.chunk_mb * 2 ** 20,
+        reject_file=args.reject_file,
+        work_dir=args.work_dir,
+    )
+    for result in loader.load(users_file=args.users, books_file=args.books):
+        print(result)
+    if loader.timings:
+        print(
+            f"Books parsed in {loader.timings['parse_seconds']:.2f}s on {loader.workers} workers, "
+            f"written in {loader.timings['write_seconds']:.2f}s"
+        )
@@ -2,47 +2,47 @@
 Name: Pushwitha Krishnappa
 Course: CS-521
 Python3 Version: Python 3.9.6
-Description: Module to print the database at any given time.
+Description: Module to print the database at any given time. Rows are streamed in chunks, so large tables print in constant memory; use export_db.py to write them to files.
 """
 
 import sqlite3
 
+from export_db import DEFAULT_CHUNK_SIZE, iter_chunks, list_tables, table_columns
 
-def print_db_contents(db_name):
+
+def print_db_contents(db_name, chunk_size=DEFAULT_CHUNK_SIZE):
     """
     Prints the contents of all tables in the specified SQLite database.
 
+    Full-text index tables are skipped, as in export_db, since they hold binary index data.
+
     Args:
         db_name (str): The name of the SQLite database file.
+        chunk_size (int): The number of rows fetched at a time.
     """
     try:
         # Connect to the SQLite database
         conn = sqlite3.connect(db_name)
-        cursor = conn.cursor()
 
         # Fetch all table names
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
+        tables = list_tables(conn)
 
         if not tables:
             print("No tables found in the database.")
             return
 
         # Iterate through each table and print its contents
-        for table_name in tables:
-            table = table_name[0]
+        for table in tables:
             print(f"\nContents of table '{table}':")
-            cursor.execute(f"SELECT * FROM {table};")
-            rows = cursor.fetchall()
-
-            if rows:
-                # Fetch column names for better formatting
-                cursor.execute(f"PRAGMA table_info({table});")
-                column_names = [column[1] for column in cursor.fetchall()]
-                print(f"{', '.join(column_names)}")
+            column_names = table_columns(conn, table)
+            printed = False
+            for rows in iter_chunks(conn, table, column_names, chunk_size):
+                if not printed:
+                    print(f"{', '.join(column_names)}")
+                    printed = True
                 for row in rows:
                     print(row)
-            else:
+            if not printed:
                 print("No data found.")
 
         # Close the database connection
@@ -52,5 +52,6 @@ def print_db_contents(db_name):
         print(f"Error accessing the database: {error}")
 
 
-# Call the function with the .db file
-print_db_contents("book_management.db")
+if __name__ == "__main__":
+    # Call the function with the .db file
+    print_db_contents("book_management.db")
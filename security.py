@@ -0,0 +1,263 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for password hashing and session tokens in the Book Management System (BMS). Provides salted PBKDF2 password hashes, a cache of recent verifications and a signed session store with expiry and eviction.
+"""
+
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+
+from cache import LRUCache, MISSING
+
+HASH_ALGORITHM = "pbkdf2_sha256"
+DEFAULT_HASH_ITERATIONS = 200000
+SALT_BYTES = 16
+
+DEFAULT_SESSION_TTL = 8 * 60 * 60
+DEFAULT_MAX_SESSIONS = 100000
+DEFAULT_VERIFY_CACHE_SIZE = 4096
+DEFAULT_VERIFY_CACHE_TTL = 5 * 60
+
+
+def hash_password(password, iterations=DEFAULT_HASH_ITERATIONS):
+    """
+    Hashes a password with a random salt.
+
+    Args:
+        password (str): The plaintext password.
+        iterations (int): The number of PBKDF2 iterations, which sets the cost of every later check.
+
+    Returns:
+        str: The hash in the form pbkdf2_sha256$iterations$salt$digest.
+    """
+    salt = secrets.token_hex(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), iterations)
+    return f"{HASH_ALGORITHM}${iterations}${salt}${digest.hex()}"
+
+
+def is_password_hash(stored):
+    """
+    Checks whether a stored password is a hash rather than a legacy plaintext password.
+
+    Args:
+        stored (str): The value of the Users.password column.
+
+    Returns:
+        bool: True if the value was produced by hash_password.
+    """
+    return stored.startswith(HASH_ALGORITHM + "$") and stored.count("$") == 3
+
+
+def check_password(password, stored):
+    """
+    Compares a password against a stored hash or legacy plaintext password in constant time.
+
+    Args:
+        password (str): The plaintext password to check.
+        stored (str): The value of the Users.password column.
+
+    Returns:
+        bool: True if the password matches.
+    """
+    if not is_password_hash(stored):
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    _, iterations, salt, expected = stored.split("$")
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+class PasswordVerifier:
+    """
+    Hashes and checks passwords, remembering recent successful checks so that repeated logins skip the hash.
+    """
+
+    def __init__(
+        self,
+        iterations=DEFAULT_HASH_ITERATIONS,
+        cache_size=DEFAULT_VERIFY_CACHE_SIZE,
+        cache_ttl=DEFAULT_VERIFY_CACHE_TTL,
+    ):
+        """
+        Initializes the PasswordVerifier object.
+
+        Args:
+            iterations (int): The number of PBKDF2 iterations used for new hashes.
+            cache_size (int): The maximum number of successful checks remembered, or 0 to disable the cache.
+            cache_ttl (float): The number of seconds a successful check is remembered.
+        """
+        self.iterations = iterations
+        self.cache = LRUCache(max_size=cache_size, ttl=cache_ttl)
+        # Cache keys hold a keyed digest of the password, never the password itself.
+        self._key = secrets.token_bytes(32)
+
+    def hash(self, password):
+        """
+        Hashes a password at the configured cost.
+
+        Args:
+            password (str): The plaintext password.
+
+        Returns:
+            str: The encoded hash.
+        """
+        return hash_password(password, self.iterations)
+
+    def verify(self, password, stored):
+        """
+        Checks a password against the stored value, using the cache for recently verified pairs.
+
+        Args:
+            password (str): The plaintext password to check.
+            stored (str): The value of the Users.password column.
+
+        Returns:
+            bool: True if the password matches.
+        """
+        # The stored hash is part of the key, so a password change never matches an old entry.
+        key = (stored, hmac.new(self._key, password.encode("utf-8"), hashlib.sha256).digest())
+        if self.cache.get(key) is not MISSING:
+            return True
+        if not check_password(password, stored):
+            return False
+        self.cache.set(key, True)
+        return True
+
+    def needs_rehash(self, stored):
+        """
+        Checks whether a stored password should be rehashed at the configured cost.
+
+        Args:
+            stored (str): The value of the Users.password column.
+
+        Returns:
+            bool: True for plaintext passwords and hashes with a different iteration count.
+        """
+        return not is_password_hash(stored) or int(stored.split("$")[1]) != self.iterations
+
+
+class Session:
+    """
+    The user and role behind a session token.
+    """
+
+    __slots__ = ("username", "user_type", "expires_at")
+
+    def __init__(self, username, user_type, expires_at):
+        """
+        Initializes the Session object.
+
+        Args:
+            username (str): The username of the logged-in user.
+            user_type (str): The role of the user, "admin" or "user".
+            expires_at (float): The time.time() at which the session ends.
+        """
+        self.username = username
+        self.user_type = user_type
+        self.expires_at = expires_at
+
+    def user(self):
+        """
+        Returns the session's user in the (username, user_type) form used throughout the BMS.
+
+        Returns:
+            tuple: The (username, user_type) of the user.
+        """
+        return self.username, self.user_type
+
+
+class SessionStore:
+    """
+    Issues HMAC-signed session tokens and resolves them to users in memory, with expiry and LRU eviction.
+    """
+
+    def __init__(self, secret=None, ttl=DEFAULT_SESSION_TTL, max_sessions=DEFAULT_MAX_SESSIONS):
+        """
+        Initializes the SessionStore object.
+
+        Args:
+            secret (bytes): The signing key, or None for a random key that invalidates tokens on restart.
+            ttl (float): The number of seconds a session stays valid.
+            max_sessions (int): The maximum number of live sessions; the least recently used are evicted.
+        """
+        self.secret = secret or secrets.token_bytes(32)
+        self.ttl = ttl
+        self.sessions = LRUCache(max_size=max_sessions, ttl=ttl)
+        self.rejected = 0
+
+    def sign(self, session_id):
+        """
+        Computes the signature of a session id.
+
+        Args:
+            session_id (str): The random session id.
+
+        Returns:
+            str: The URL-safe signature.
+        """
+        digest = hmac.new(self.secret, session_id.encode("utf-8"), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+    def create(self, username, user_type):
+        """
+        Opens a session for a user.
+
+        Args:
+            username (str): The username of the user.
+            user_type (str): The role of the user.
+
+        Returns:
+            str: The signed session token.
+        """
+        session_id = secrets.token_urlsafe(24)
+        self.sessions.set(session_id, Session(username, user_type, time.time() + self.ttl))
+        return f"{session_id}.{self.sign(session_id)}"
+
+    def get(self, token):
+        """
+        Resolves a token to its session without touching the database.
+
+        Tokens with a bad signature are rejected before the store is consulted.
+
+        Args:
+            token (str): The token returned by create.
+
+        Returns:
+            Session: The live session, or None if the token is invalid, expired or evicted.
+        """
+        session_id, _, signature = (token or "").partition(".")
+        expected = self.sign(session_id).encode("ascii")
+        if not signature or not hmac.compare_digest(signature.encode("utf-8"), expected):
+            self.rejected += 1
+            return None
+        session = self.sessions.get(session_id, None)
+        if session is None or session.expires_at <= time.time():
+            return None
+        return session
+
+    def revoke(self, token):
+        """
+        Ends a session.
+
+        Args:
+            token (str): The token returned by create.
+
+        Returns:
+            bool: True if a live session was ended.
+        """
+        if self.get(token) is None:
+            return False
+        self.sessions.invalidate(token.partition(".")[0])
+        return True
+
+    def stats(self):
+        """
+        Returns the session counters.
+
+        Returns:
+            dict: The session cache counters and the number of rejected tokens.
+        """
+        return dict(self.sessions.stats(), rejected=self.rejected)
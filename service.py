@@ -0,0 +1,482 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for serving the Book Management System (BMS) over HTTP. Runs an asyncio server that handles many clients concurrently and runs the blocking SQLite work in a bounded thread pool.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from authentication import Authentication
+import book_management
+from book_management import BookManagement
+from instrumentation import metrics
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 8
+MAX_BODY_SIZE = 1024 * 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    202: "Accepted",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class ServiceError(Exception):
+    """
+    An error that is reported to the client with an HTTP status code.
+    """
+
+    def __init__(self, status, message):
+        """
+        Initializes the ServiceError object.
+
+        Args:
+            status (int): The HTTP status code to respond with.
+            message (str): The error message sent to the client.
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# HTTP status codes for the outcomes of BookManagement write operations
+OUTCOME_STATUS = {
+    book_management.INSERTED: 201,
+    book_management.DELETED: 200,
+    book_management.BORROWED: 201,
+    book_management.RETURNED: 200,
+    book_management.DUPLICATE: 409,
+    book_management.ON_LOAN: 409,
+    book_management.UNAVAILABLE: 409,
+    book_management.NOT_FOUND: 404,
+    book_management.NOT_BORROWED: 404,
+    book_management.UNKNOWN_USER: 404,
+    book_management.ACCEPTED: 202,
+}
+
+
+def outcome(status, **fields):
+    """
+    Converts the outcome of a write operation into a response, raising for failures.
+
+    Args:
+        status (str): The outcome returned by BookManagement.
+        **fields: Extra fields to include in a successful response.
+
+    Returns:
+        tuple: The HTTP status code and the response body.
+    """
+    code = OUTCOME_STATUS[status]
+    if code >= 400:
+        raise ServiceError(code, status)
+    return code, dict(fields, status=status)
+
+
+def book_to_dict(book):
+    """
+    Converts a Books row into a JSON-serializable dictionary.
+
+    Args:
+        book (tuple): An (id, title, author, year, isbn) tuple.
+
+    Returns:
+        dict: The book's fields keyed by column name.
+    """
+    return {"id": book[0], "title": book[1], "author": book[2], "year": book[3], "isbn": book[4]}
+
+
+class BookService:
+    """
+    Exposes login, search, add, delete, borrow, return and list-borrowed as coroutines over the blocking BMS classes.
+    """
+
+    def __init__(
+        self,
+        db_name="book_management.db",
+        workers=DEFAULT_WORKERS,
+        concurrency=book_management.SPLIT,
+    ):
+        """
+        Initializes the BookService object.
+
+        Args:
+            db_name (str): The name of the SQLite database file.
+            workers (int): The number of threads available for blocking database calls.
+            concurrency (str): The BookManagement concurrency mode, SHARED, SPLIT or LOGGED.
+                LOGGED writes are answered with 202 Accepted once they are durable.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bms-db")
+        self.auth = Authentication(db_name, verbose=False)
+        self.book_manager = BookManagement(db_name, verbose=False, concurrency=concurrency)
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """
+        Runs a blocking function in the worker thread pool.
+
+        Args:
+            func (callable): The function to run.
+            *args: Positional arguments for the function.
+            **kwargs: Keyword arguments for the function.
+
+        Returns:
+            object: The function's return value.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def require_user(self, token, role=None):
+        """
+        Looks up the user behind a session token.
+
+        Args:
+            token (str): The session token sent by the client.
+            role (str): The user type required for the operation, or None for any user.
+
+        Returns:
+            tuple: The (username, user_type) of the session's user.
+        """
+        user = self.auth.validate_token(token)
+        if user is None:
+            raise ServiceError(401, "Login required.")
+        if role and user[1] != role:
+            raise ServiceError(403, f"Only {role} users can do this.")
+        return user
+
+    async def login(self, username, password):
+        """
+        Validates credentials and opens a session.
+
+        Args:
+            username (str): The username of the user.
+            password (str): The password of the user.
+
+        Returns:
+            dict: The session token and the user's name and type.
+        """
+        token = await self.run_blocking(self.auth.authenticate, username, password)
+        if not token:
+            raise ServiceError(401, "Invalid username or password.")
+        user = self.auth.validate_token(token)
+        return {"token": token, "username": user[0], "user_type": user[1]}
+
+    async def logout(self, token):
+        """
+        Closes a session.
+
+        Args:
+            token (str): The session token sent by the client.
+
+        Returns:
+            dict: An empty acknowledgement.
+        """
+        self.require_user(token)
+        self.auth.revoke_token(token)
+        return {}
+
+    async def search(self, token, **criteria):
+        """
+        Searches the catalog.
+
+        Args:
+            token (str): The session token sent by the client.
+            **criteria: Arguments passed through to BookManagement.search_books.
+
+        Returns:
+            dict: The matching books, or their count when `count_only` is set.
+        """
+        self.require_user(token)
+        try:
+            books = await self.run_blocking(self.book_manager.search_books, **criteria)
+        except ValueError as error:
+            raise ServiceError(400, str(error))
+        if criteria.get("count_only"):
+            return {"count": books}
+        return {"books": [book_to_dict(book) for book in books]}
+
+    async def add_book(self, token, title, author, year, isbn, copies=1):
+        """
+        Adds a book to the catalog.
+
+        Args:
+            token (str): The session token of an admin user.
+            title (str): The title of the book.
+            author (str): The author of the book.
+            year (int): The publication year of the book.
+            isbn (str): The ISBN of the book.
+            copies (int): The number of copies the library holds.
+
+        Returns:
+            tuple: The HTTP status code and the ISBN of the added book.
+        """
+        self.require_user(token, "admin")
+        status = await self.run_blocking(self.book_manager.add_book, title, author, year, isbn, copies)
+        return outcome(status, isbn=isbn)
+
+    async def delete_book(self, token, isbn):
+        """
+        Deletes a book from the catalog.
+
+        Args:
+            token (str): The session token of an admin user.
+            isbn (str): The ISBN of the book to delete.
+
+        Returns:
+            tuple: The HTTP status code and the ISBN of the deleted book.
+        """
+        self.require_user(token, "admin")
+        status = await self.run_blocking(self.book_manager.delete_book, isbn)
+        return outcome(status, isbn=isbn)
+
+    async def borrow_book(self, token, isbn):
+        """
+        Borrows a book for the session's user.
+
+        Args:
+            token (str): The session token of a regular user.
+            isbn (str): The ISBN of the book to borrow.
+
+        Returns:
+            tuple: The HTTP status code, the borrowing user and the ISBN of the book.
+        """
+        username = self.require_user(token, "user")[0]
+        status = await self.run_blocking(self.book_manager.borrow_book, username, isbn)
+        return outcome(status, username=username, isbn=isbn)
+
+    async def return_book(self, token, isbn):
+        """
+        Returns a book borrowed by the session's user.
+
+        Args:
+            token (str): The session token of a regular user.
+            isbn (str): The ISBN of the book to return.
+
+        Returns:
+            tuple: The HTTP status code, the returning user and the ISBN of the book.
+        """
+        username = self.require_user(token, "user")[0]
+        status = await self.run_blocking(self.book_manager.return_book, username, isbn)
+        return outcome(status, username=username, isbn=isbn)
+
+    async def list_borrowed(self, token):
+        """
+        Lists every borrowed book.
+
+        Args:
+            token (str): The session token of an admin user.
+
+        Returns:
+            dict: The borrowing users and book titles.
+        """
+        self.require_user(token, "admin")
+        loans = await self.run_blocking(self.book_manager.list_borrowed_books)
+        return {"borrowed": [{"username": user, "title": title} for user, title in loans]}
+
+    async def metrics_snapshot(self, token):
+        """
+        Returns the instrumentation snapshot of this process.
+
+        Args:
+            token (str): The session token of an admin user.
+
+        Returns:
+            dict: The metrics snapshot.
+        """
+        self.require_user(token, "admin")
+        return metrics.snapshot()
+
+    async def dispatch(self, method, path, query, body, token):
+        """
+        Routes one HTTP request to the matching operation.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The request path without the query string.
+            query (dict): The query string parameters.
+            body (dict): The decoded JSON request body.
+            token (str): The bearer token from the Authorization header, if any.
+
+        Returns:
+            tuple: The HTTP status code and the JSON-serializable response body.
+        """
+        try:
+            if path == "/login" and method == "POST":
+                return 200, await self.login(body["username"], body["password"])
+            if path == "/logout" and method == "POST":
+                return 200, await self.logout(token)
+            if path == "/books" and method == "GET":
+                criteria = {
+                    key: query[key] for key in ("match", "title", "author", "isbn", "order_by") if key in query
+                }
+                for key in ("year", "year_min", "year_max", "limit", "after_id"):
+                    if key in query:
+                        criteria[key] = int(query[key])
+                if query.get("count") in ("1", "true"):
+                    criteria["count_only"] = True
+                return 200, await self.search(token, **criteria)
+            if path == "/books" and method == "POST":
+                return await self.add_book(
+                    token,
+                    body["title"],
+                    body["author"],
+                    int(body["year"]),
+                    body["isbn"],
+                    int(body.get("copies", 1)),
+                )
+            if path.startswith("/books/") and method == "DELETE":
+                return await self.delete_book(token, unquote(path[len("/books/"):]))
+            if path == "/borrow" and method == "POST":
+                return await self.borrow_book(token, body["isbn"])
+            if path == "/return" and method == "POST":
+                return await self.return_book(token, body["isbn"])
+            if path == "/borrowed" and method == "GET":
+                return 200, await self.list_borrowed(token)
+            if path == "/metrics" and method == "GET":
+                return 200, await self.metrics_snapshot(token)
+        except KeyError as error:
+            raise ServiceError(400, f"Missing field {error}.")
+        except (TypeError, ValueError) as error:
+            raise ServiceError(400, str(error))
+        if path in ("/login", "/logout", "/books", "/borrow", "/return", "/borrowed", "/metrics") or path.startswith("/books/"):
+            raise ServiceError(405, f"{method} is not supported on {path}.")
+        raise ServiceError(404, f"No endpoint at {path}.")
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves HTTP/1.1 requests on one client connection until it is closed.
+
+        Args:
+            reader (asyncio.StreamReader): The stream to read requests from.
+            writer (asyncio.StreamWriter): The stream to write responses to.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                length = int(headers.get("content-length", 0))
+                try:
+                    if length > MAX_BODY_SIZE:
+                        raise ServiceError(413, "Request body is too large.")
+                    raw_body = await reader.readexactly(length) if length else b""
+                    try:
+                        body = json.loads(raw_body) if raw_body else {}
+                    except ValueError:
+                        raise ServiceError(400, "Request body is not valid JSON.")
+                    url = urlsplit(target)
+                    authorization = headers.get("authorization", "")
+                    token = authorization[7:] if authorization.startswith("Bearer ") else None
+                    status, payload = await self.dispatch(
+                        method, url.path, dict(parse_qsl(url.query)), body, token
+                    )
+                except ServiceError as error:
+                    status, payload = error.status, {"error": error.message}
+                    keep_alive = keep_alive and error.status != 413
+                except Exception as error:  # Keep serving other requests after unexpected failures.
+                    status, payload = 500, {"error": str(error)}
+
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        """
+        Shuts down the worker thread pool.
+        """
+        self.executor.shutdown(wait=True)
+
+
+async def serve(
+    db_name="book_management.db",
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    workers=DEFAULT_WORKERS,
+    concurrency=book_management.SPLIT,
+):
+    """
+    Runs the HTTP service until it is cancelled.
+
+    Args:
+        db_name (str): The name of the SQLite database file.
+        host (str): The interface to listen on.
+        port (int): The TCP port to listen on.
+        workers (int): The number of threads available for blocking database calls.
+        concurrency (str): The BookManagement concurrency mode, SHARED, SPLIT or LOGGED.
+    """
+    service = BookService(db_name, workers=workers, concurrency=concurrency)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Serving the Book Management System on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Book Management System over HTTP.")
+    parser.add_argument("--db", default="book_management.db", help="The SQLite database file.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="The interface to listen on.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="The TCP port to listen on.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Database worker threads.")
+    parser.add_argument(
+        "--concurrency",
+        choices=(book_management.SHARED, book_management.SPLIT, book_management.LOGGED),
+        default=book_management.SPLIT,
+        help=(
+            "Read on per-thread read-write connections (shared) or read-only ones with a group-commit writer "
+            "(split), or acknowledge writes once they are fsynced to an operation log and apply them in the "
+            "background (logged)."
+        ),
+    )
+    parser.add_argument("--metrics", action="store_true", help="Record metrics, served at GET /metrics.")
+    parser.add_argument("--slow-query-ms", type=float, default=50.0, help="Slow-query log threshold.")
+    args = parser.parse_args()
+
+    if args.metrics:
+        metrics.enable(slow_query_ms=args.slow_query_ms)
+
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.workers, args.concurrency))
+    except KeyboardInterrupt:
+        print("Server stopped.")
@@ -0,0 +1,561 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for spreading the Book Management System (BMS) catalog over several SQLite files. Books and their loans are partitioned by ISBN hash or by branch, Users are replicated to every shard, point operations are routed by key and searches fan out to every shard in parallel.
+"""
+
+import argparse
+import heapq
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from book_management import DUPLICATE, INSERTED, NOT_FOUND, ORDER_FIELDS, SHARED, BookManagement
+from bulk_loader import DEFAULT_BATCH_SIZE, chunked, iter_csv_rows, parse_book
+from connection_pool import get_pool
+from database import DatabaseSetup
+from isbn import canonical_isbn
+from security import DEFAULT_HASH_ITERATIONS
+
+# Each shard hands out Books ids from its own range, so ids stay unique across shards and
+# results from several shards can be merged and paged by id like those of a single file.
+SHARD_ID_SPACING = 1 << 40
+
+
+def shard_for_isbn(book_isbn, shard_count):
+    """
+    Picks the shard that holds a book in ISBN-hash partitioning.
+
+    CRC-32 is stable across processes and Python versions, unlike the built-in hash(). The ISBN
+    is normalized first, so every spelling of it picks the same shard.
+
+    Args:
+        book_isbn (str): The ISBN of the book.
+        shard_count (int): The number of shards.
+
+    Returns:
+        int: The index of the shard.
+    """
+    return zlib.crc32(str(canonical_isbn(book_isbn)).encode("utf-8")) % shard_count
+
+
+def setup_shards(
+    shard_files,
+    users_file="Users.txt",
+    books_file="Books.txt",
+    batch_size=DEFAULT_BATCH_SIZE,
+    hash_iterations=DEFAULT_HASH_ITERATIONS,
+):
+    """
+    Creates the schema in every shard, replicates the users and distributes the books by ISBN hash.
+
+    Args:
+        shard_files (list): The SQLite database file of each shard.
+        users_file (str): The path of the file with the users, loaded into every shard.
+        books_file (str): The path of the file with the books, split across the shards.
+        batch_size (int): The number of books inserted per shard transaction.
+        hash_iterations (int): The PBKDF2 iteration count for stored passwords.
+
+    Returns:
+        dict: The number of books inserted, skipped as duplicates and rejected.
+    """
+    for index, shard_file in enumerate(shard_files):
+        setup = DatabaseSetup(
+            shard_file,
+            users_file=users_file if index == 0 else None,
+            books_file=None,
+            hash_iterations=hash_iterations,
+        )
+        setup.setup_database()
+        conn = setup.connect_db()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO sqlite_sequence (name, seq)
+                SELECT 'Books', ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'Books')
+                """,
+                (index * SHARD_ID_SPACING,),
+            )
+    replicate_users(shard_files)
+
+    counts = {"inserted": 0, "duplicates": 0, "rejected": 0}
+    catalog = ShardedBookManagement(shard_files, verbose=False)
+    try:
+        def parsed_rows():
+            for _, fields in iter_csv_rows(books_file):
+                try:
+                    yield parse_book(fields)
+                except ValueError:
+                    counts["rejected"] += 1
+
+        for batch in chunked(parsed_rows(), batch_size * len(shard_files)):
+            for _, status in catalog.add_books(batch):
+                counts["inserted" if status == INSERTED else "duplicates"] += 1
+    finally:
+        catalog.close()
+    return counts
+
+
+def replicate_users(shard_files):
+    """
+    Copies the Users table of the first shard into every other shard, keeping ids and password hashes.
+
+    Existing users are left alone, so the copy can be repeated after adding users to the first shard.
+
+    Args:
+        shard_files (list): The SQLite database file of each shard; the first one is the source.
+    """
+    source = get_pool(shard_files[0]).connection()
+    users = source.execute("SELECT id, username, password, user_type FROM Users ORDER BY id").fetchall()
+    for shard_file in shard_files[1:]:
+        conn = get_pool(shard_file).connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO Users (id, username, password, user_type) VALUES (?, ?, ?, ?)", users
+            )
+
+
+class ShardedBookManagement:
+    """
+    Offers the BookManagement operations over a catalog split across several database files.
+
+    With `branches`, each shard is one branch's catalog: new books are added to the branch
+    given by the caller and ISBN lookups ask every shard. Otherwise books are placed by ISBN
+    hash and every ISBN operation goes to exactly one shard.
+    """
+
+    def __init__(
+        self,
+        shard_files,
+        branches=None,
+        cache_size=1024,
+        cache_ttl=None,
+        verbose=True,
+        concurrency=SHARED,
+        workers=None,
+    ):
+        """
+        Initializes the ShardedBookManagement object.
+
+        Args:
+            shard_files (list): The SQLite database file of each shard.
+            branches (list): The branch name of each shard, or None to partition by ISBN hash.
+            cache_size (int): The maximum number of entries in each shard's ISBN and search caches.
+            cache_ttl (float): The number of seconds a cached entry stays valid, or None to never expire.
+            verbose (bool): Whether operations print their outcome for interactive use.
+            concurrency (str): The concurrency mode of each shard's BookManagement.
+            workers (int): The number of fan-out threads, or None for four per shard so that
+                several callers can fan out at once.
+        """
+        if branches is not None and len(branches) != len(shard_files):
+            raise ValueError("Give exactly one branch name per shard file.")
+        self.shards = [
+            BookManagement(shard_file, cache_size, cache_ttl, verbose=False, concurrency=concurrency)
+            for shard_file in shard_files
+        ]
+        self.branches = list(branches) if branches is not None else None
+        self.verbose = verbose
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or 4 * len(self.shards), thread_name_prefix="bms-shard"
+        )
+
+    def report(self, message):
+        """
+        Prints an operation's outcome when running interactively.
+
+        Args:
+            message (str): The message to print.
+        """
+        if self.verbose:
+            print(message)
+
+    def fan_out(self, operation, *args, **kwargs):
+        """
+        Runs the same BookManagement method on every shard in parallel.
+
+        SQLite releases the GIL while it executes a statement, so the shards' queries overlap.
+
+        Args:
+            operation (str): The name of the BookManagement method.
+            *args: Positional arguments for the method.
+            **kwargs: Keyword arguments for the method.
+
+        Returns:
+            list: Each shard's return value, in shard order.
+        """
+        futures = [
+            self.executor.submit(getattr(shard, operation), *args, **kwargs) for shard in self.shards[1:]
+        ]
+        # The calling thread queries the first shard itself instead of waiting idle.
+        first = getattr(self.shards[0], operation)(*args, **kwargs)
+        return [first] + [future.result() for future in futures]
+
+    def shard_index(self, book_isbn):
+        """
+        Finds the shard that holds, or in hash partitioning would hold, a book.
+
+        Args:
+            book_isbn (str): The ISBN of the book.
+
+        Returns:
+            int: The shard index, or None if no branch holds the book.
+        """
+        if self.branches is None:
+            return shard_for_isbn(book_isbn, len(self.shards))
+        for index, book in enumerate(self.fan_out("get_book", book_isbn)):
+            if book is not None:
+                return index
+        return None
+
+    def branch_index(self, branch):
+        """
+        Looks up the shard of a branch.
+
+        Args:
+            branch (str): The branch name.
+
+        Returns:
+            int: The shard index.
+        """
+        if branch not in self.branches:
+            raise ValueError(f"Unknown branch {branch!r}. Choose from {', '.join(self.branches)}.")
+        return self.branches.index(branch)
+
+    def get_book(self, book_isbn):
+        """
+        Looks up a single book by ISBN on the shard that holds it.
+
+        Args:
+            book_isbn (str): The ISBN of the book.
+
+        Returns:
+            tuple: The (id, title, author, year, isbn) tuple of the book, or None if it does not exist.
+        """
+        index = self.shard_index(book_isbn)
+        return None if index is None else self.shards[index].get_book(book_isbn)
+
+    def get_availability(self, book_isbn):
+        """
+        Looks up how many copies of a book the library holds and how many are on the shelf.
+
+        Args:
+            book_isbn (str): The ISBN of the book.
+
+        Returns:
+            tuple: The (copies, available) counts, or None if the book does not exist.
+        """
+        index = self.shard_index(book_isbn)
+        return None if index is None else self.shards[index].get_availability(book_isbn)
+
+    def add_book(self, book_title, book_author, publication_year, book_isbn, copies=1, branch=None):
+        """
+        Adds a new book to the shard it belongs to.
+
+        Args:
+            book_title (str): The title of the book.
+            book_author (str): The author of the book.
+            publication_year (int): The publication year of the book.
+            book_isbn (str): The ISBN of the book.
+            copies (int): The number of copies the library holds.
+            branch (str): The branch that holds the book; required when partitioning by branch.
+
+        Returns:
+            str: INSERTED, or DUPLICATE if the ISBN already exists.
+        """
+        if self.branches is None:
+            index = shard_for_isbn(book_isbn, len(self.shards))
+        elif self.shard_index(book_isbn) is not None:
+            return self.report_status(DUPLICATE, f"Book with ISBN {book_isbn} already exists.")
+        else:
+            index = self.branch_index(branch)
+        status = self.shards[index].add_book(book_title, book_author, publication_year, book_isbn, copies)
+        return self.report_status(status, f"Book '{book_title}': {status}.")
+
+    def report_status(self, status, message):
+        """
+        Prints the outcome of a routed operation and returns its status.
+
+        Args:
+            status (str): The status returned by the shard.
+            message (str): The message to print.
+
+        Returns:
+            str: The status.
+        """
+        self.report(message)
+        return status
+
+    def routed(self, operation, book_isbn, *args):
+        """
+        Runs an ISBN operation on the shard that holds the book.
+
+        Args:
+            operation (str): The name of the BookManagement method.
+            book_isbn (str): The ISBN of the book, passed as the method's last argument.
+            *args: Arguments passed before the ISBN.
+
+        Returns:
+            str: The operation's status, or NOT_FOUND if no branch holds the book.
+        """
+        index = self.shard_index(book_isbn)
+        if index is None:
+            return self.report_status(NOT_FOUND, f"No book found with ISBN {book_isbn}.")
+        status = getattr(self.shards[index], operation)(*args, book_isbn)
+        return self.report_status(status, f"{operation.replace('_', ' ').capitalize()} {book_isbn}: {status}.")
+
+    def delete_book(self, book_isbn):
+        """
+        Deletes a book from the shard that holds it.
+
+        Args:
+            book_isbn (str): The ISBN of the book to delete.
+
+        Returns:
+            str: DELETED, NOT_FOUND, or ON_LOAN if copies of the book are still borrowed.
+        """
+        return self.routed("delete_book", book_isbn)
+
+    def borrow_book(self, user_name, book_isbn):
+        """
+        Borrows a copy of a book from the shard that holds it.
+
+        Args:
+            user_name (str): The name of the user borrowing the book.
+            book_isbn (str): The ISBN of the book to borrow.
+
+        Returns:
+            str: BORROWED, NOT_FOUND, UNAVAILABLE or UNKNOWN_USER.
+        """
+        return self.routed("borrow_book", book_isbn, user_name)
+
+    def return_book(self, user_name, book_isbn):
+        """
+        Returns a copy of a book to the shard that holds it.
+
+        Args:
+            user_name (str): The name of the user returning the book.
+            book_isbn (str): The ISBN of the book being returned.
+
+        Returns:
+            str: RETURNED or NOT_BORROWED.
+        """
+        return self.routed("return_book", book_isbn, user_name)
+
+    def search_books(
+        self,
+        match=None,
+        limit=None,
+        after_id=None,
+        order_by=None,
+        count_only=False,
+        **kwargs,
+    ):
+        """
+        Searches every shard in parallel and merges the results.
+
+        Results are ordered by id, or by `order_by`, as on a single file. Keyword searches are
+        merged by their per-shard bm25 score, which ranks well when books are spread evenly
+        over the shards.
+
+        Args:
+            match (str): Optional keywords matched as word prefixes against titles and authors.
+            limit (int): The maximum number of books to return, or None for all of them.
+            after_id (int): Only return books whose id is greater than this value.
+            order_by (str): "id", "title", "author" or "year", prefixed with "-" for descending order.
+            count_only (bool): Whether to return the number of matching books instead of the books.
+            **kwargs: year_min, year_max and search criteria on title, author, year, or isbn.
+
+        Returns:
+            list: A list of (id, title, author, year, isbn) tuples, or an int when `count_only` is set.
+        """
+        if match and after_id is not None:
+            raise ValueError("after_id paging is not supported for keyword searches.")
+        if count_only:
+            return sum(self.fan_out("search_books", match, None, after_id, count_only=True, **kwargs))
+        if match and order_by is None:
+            ranked = [
+                future.result() for future in [
+                    self.executor.submit(ranked_search, shard, match, limit, kwargs) for shard in self.shards
+                ]
+            ]
+            merged = (row[1:] for row in heapq.merge(*ranked))
+        else:
+            key, reverse = merge_order(order_by)
+            pages = self.fan_out("search_books", match, limit, after_id, order_by=order_by, **kwargs)
+            merged = heapq.merge(*pages, key=key, reverse=reverse)
+        return list(islice(merged, limit))
+
+    def list_borrowed_books(self, user_name=None):
+        """
+        Lists the books that are currently borrowed on every shard.
+
+        Args:
+            user_name (str): Only list this user's loans, or None to list every loan.
+
+        Returns:
+            list: A list of tuples containing the username and book title.
+        """
+        borrowed_books = [row for rows in self.fan_out("list_borrowed_books", user_name) for row in rows]
+        if borrowed_books:
+            self.report("\nBorrowed Books:")
+            for borrower, book_title in borrowed_books:
+                self.report(f"User: {borrower}, Book: {book_title}")
+        else:
+            self.report("No books are currently borrowed.")
+        return borrowed_books
+
+    def batch_by_shard(self, operation, items, isbn_of, *args):
+        """
+        Splits a batch by shard, runs each part on its shard in parallel and restores the input order.
+
+        Args:
+            operation (str): The name of the BookManagement batch method.
+            items (iterable): The books or ISBNs of the batch.
+            isbn_of (callable): Returns the canonical ISBN of an item.
+            *args: Arguments passed before the items.
+
+        Returns:
+            list: The (isbn, status) pairs in input order.
+        """
+        items = list(items)
+        parts = [[] for _ in self.shards]
+        for item in items:
+            parts[shard_for_isbn(isbn_of(item), len(self.shards))].append(item)
+        futures = [
+            self.executor.submit(getattr(shard, operation), *args, part)
+            for shard, part in zip(self.shards, parts) if part
+        ]
+        outcomes = {}
+        for future in futures:
+            for isbn, status in future.result():
+                outcomes.setdefault(isbn, []).append(status)
+        # A repeated ISBN appears once per occurrence, so hand the statuses back in the same order.
+        return [(isbn_of(item), outcomes[isbn_of(item)].pop(0)) for item in items]
+
+    def require_hash_partitioning(self):
+        """
+        Rejects batch operations in branch partitioning, where a batch has no single target per ISBN.
+        """
+        if self.branches is not None:
+            raise ValueError("Batch operations need ISBN-hash partitioning.")
+
+    def add_books(self, books):
+        """
+        Adds many books, one transaction per shard.
+
+        Args:
+            books (iterable): (title, author, year, isbn) or (title, author, year, isbn, copies) tuples.
+
+        Returns:
+            list: An (isbn, status) pair per book.
+        """
+        self.require_hash_partitioning()
+        return self.batch_by_shard("add_books", books, lambda book: canonical_isbn(book[3]))
+
+    def delete_books(self, book_isbns):
+        """
+        Deletes many books, one transaction per shard.
+
+        Args:
+            book_isbns (iterable): The ISBNs of the books to delete.
+
+        Returns:
+            list: An (isbn, status) pair per ISBN.
+        """
+        self.require_hash_partitioning()
+        return self.batch_by_shard("delete_books", book_isbns, canonical_isbn)
+
+    def borrow_books(self, user_name, book_isbns):
+        """
+        Borrows many books for one user, one transaction per shard.
+
+        Args:
+            user_name (str): The name of the user borrowing the books.
+            book_isbns (iterable): The ISBNs of the books to borrow.
+
+        Returns:
+            list: An (isbn, status) pair per ISBN.
+        """
+        self.require_hash_partitioning()
+        return self.batch_by_shard("borrow_books", book_isbns, canonical_isbn, user_name)
+
+    def cache_stats(self):
+        """
+        Returns the cache counters of every shard.
+
+        Returns:
+            list: Each shard's cache_stats(), in shard order.
+        """
+        return [shard.cache_stats() for shard in self.shards]
+
+    def close(self):
+        """
+        Stops the fan-out threads.
+        """
+        self.executor.shutdown(wait=True)
+
+
+def merge_order(order_by):
+    """
+    Builds the heapq.merge key that reproduces a search order across shards.
+
+    SQLite sorts NULL years before every other value, so the key does the same.
+
+    Args:
+        order_by (str): A field name from ORDER_FIELDS, prefixed with "-" for descending
+            order, or None for id order.
+
+    Returns:
+        tuple: The key function and whether the order is descending.
+
+    Raises:
+        ValueError: If the field cannot be ordered by.
+    """
+    field = (order_by or "id").lstrip("-")
+    if field not in ORDER_FIELDS:
+        raise ValueError(f"Cannot order by {field!r}.")
+    position = ORDER_FIELDS[field]
+
+    def key(book):
+        return book[position] is not None, book[position], book[0]
+
+    return key, bool(order_by and order_by.startswith("-"))
+
+
+def ranked_search(shard, match, limit, criteria):
+    """
+    Runs a keyword search on one shard and keeps the bm25 score for merging.
+
+    Args:
+        shard (BookManagement): The shard to search.
+        match (str): The keywords matched as word prefixes against titles and authors.
+        limit (int): The maximum number of books to return, or None for all of them.
+        criteria (dict): Search criteria such as title, author, year, or isbn.
+
+    Returns:
+        list: (score, id, title, author, year, isbn) tuples, best first.
+    """
+    query, params = shard.build_search_query(match=match, **criteria)
+    query = query.replace("SELECT ", "SELECT bm25(BooksFTS), ", 1) + " ORDER BY bm25(BooksFTS)"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return shard.connect_db().execute(query, params).fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split a catalog across several database files.")
+    parser.add_argument("shards", nargs="+", help="The database file of each shard.")
+    parser.add_argument("--users", default="Users.txt", help="The Users file, replicated to every shard.")
+    parser.add_argument("--books", default="Books.txt", help="The Books file, split across the shards.")
+    parser.add_argument(
+        "--hash-iterations", type=int, default=DEFAULT_HASH_ITERATIONS, help="PBKDF2 iterations per password."
+    )
+    args = parser.parse_args()
+
+    result = setup_shards(args.shards, args.users, args.books, hash_iterations=args.hash_iterations)
+    print(
+        f"Books: {result['inserted']} inserted, {result['duplicates']} duplicates skipped, "
+        f"{result['rejected']} rejected across {len(args.shards)} shards"
+    )
@@ -0,0 +1,132 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for generating synthetic Books.txt and Users.txt style files of any size for benchmarking the Book Management System (BMS).
+"""
+
+import argparse
+import csv
+import random
+
+from isbn import isbn13_check_digit
+
+TITLE_WORDS = [
+    "Artificial", "Intelligence", "History", "Modern", "Approach", "Learning", "Deep", "Society",
+    "Science", "Revolution", "Machine", "Human", "Future", "Economics", "Mind", "Data", "Theory",
+    "Practice", "Guide", "Systems", "Power", "Knowledge", "Culture", "Nature", "Story", "World",
+]
+FIRST_NAMES = [
+    "Ada", "Alan", "Grace", "Stuart", "Peter", "Yuval", "Daniel", "Malcolm", "Cathy", "Nick",
+    "Max", "Jared", "Thomas", "Robert", "Kate", "Richard", "Gary", "Ernest", "Pedro", "Ian",
+]
+LAST_NAMES = [
+    "Lovelace", "Turing", "Hopper", "Russell", "Norvig", "Harari", "Kahneman", "Gladwell",
+    "O'Neil", "Bostrom", "Tegmark", "Diamond", "Kuhn", "Putnam", "Pickett", "Wilkinson",
+    "Marcus", "Davis", "Domingos", "Goodfellow",
+]
+
+
+def isbn13(number):
+    """
+    Builds a valid ISBN-13 in the 978 prefix range from a sequence number.
+
+    Args:
+        number (int): A number below 10**9 that identifies the book.
+
+    Returns:
+        str: A 13-digit ISBN with a correct check digit.
+    """
+    body = f"978{number:09d}"
+    return body + isbn13_check_digit(body)
+
+
+def iter_books(count, seed=0, author_count=None):
+    """
+    Generates synthetic book rows with unique ISBNs.
+
+    Args:
+        count (int): The number of books to generate.
+        seed (int): The random seed, so that runs are repeatable.
+        author_count (int): The number of distinct authors, or None for roughly one per 20 books.
+
+    Yields:
+        tuple: A (title, author, year, isbn) row.
+    """
+    rng = random.Random(seed)
+    author_count = author_count or max(1, count // 20)
+    authors = [
+        f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]} {i}"
+        for i in range(min(author_count, count))
+    ]
+    for number in range(count):
+        words = rng.sample(TITLE_WORDS, rng.randint(2, 6))
+        # Some titles contain a comma, which the import has to handle through CSV quoting.
+        title = " ".join(words) if rng.random() > 0.1 else f"{words[0]}, {' '.join(words[1:])}"
+        yield title, rng.choice(authors), rng.randint(1900, 2024), isbn13(number)
+
+
+def iter_users(count, seed=0, admin_ratio=0.05):
+    """
+    Generates synthetic user rows with unique usernames.
+
+    Args:
+        count (int): The number of users to generate.
+        seed (int): The random seed, so that runs are repeatable.
+        admin_ratio (float): The share of users with the admin role.
+
+    Yields:
+        tuple: A (username, password, user_type) row.
+    """
+    rng = random.Random(seed)
+    for number in range(count):
+        user_type = "admin" if rng.random() < admin_ratio else "user"
+        yield f"user{number}", f"pass{number}", user_type
+
+
+def write_csv(path, rows):
+    """
+    Streams rows into a CSV file.
+
+    Args:
+        path (str): The path of the file to write.
+        rows (iterable): The rows to write.
+
+    Returns:
+        int: The number of rows written.
+    """
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    return written
+
+
+def generate_files(books_path, users_path, book_count, user_count, seed=0):
+    """
+    Writes a synthetic catalog and user base.
+
+    Args:
+        books_path (str): The path of the Books.txt style file to write.
+        users_path (str): The path of the Users.txt style file to write.
+        book_count (int): The number of books to generate.
+        user_count (int): The number of users to generate.
+        seed (int): The random seed, so that runs are repeatable.
+    """
+    write_csv(books_path, iter_books(book_count, seed=seed))
+    write_csv(users_path, iter_users(user_count, seed=seed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic Books and Users files.")
+    parser.add_argument("--books", type=int, default=100000, help="The number of books to generate.")
+    parser.add_argument("--users", type=int, default=1000, help="The number of users to generate.")
+    parser.add_argument("--books-file", default="SyntheticBooks.txt", help="The books file to write.")
+    parser.add_argument("--users-file", default="SyntheticUsers.txt", help="The users file to write.")
+    parser.add_argument("--seed", type=int, default=0, help="The random seed.")
+    args = parser.parse_args()
+
+    generate_files(args.books_file, args.users_file, args.books, args.users, seed=args.seed)
+    print(f"Wrote {args.books} books to {args.books_file} and {args.users} users to {args.users_file}.")
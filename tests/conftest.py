@@ -0,0 +1,38 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Shared pytest setup for the Book Management System (BMS) tests. Makes the modules at the repository root importable and provides temporary databases.
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from connection_pool import close_all_pools  # noqa: E402
+from migrations import migrate  # noqa: E402
+
+
+@pytest.fixture
+def migrated_db(tmp_path):
+    """
+    Creates an empty database with the current schema and closes every pooled connection afterwards.
+
+    Args:
+        tmp_path (pathlib.Path): The test's temporary directory.
+
+    Yields:
+        str: The path of the database file.
+    """
+    db_name = str(tmp_path / "book_management.db")
+    conn = sqlite3.connect(db_name)
+    migrate(conn)
+    conn.commit()
+    conn.close()
+    yield db_name
+    close_all_pools()
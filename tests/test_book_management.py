@@ -0,0 +1,40 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Tests that adding a book tells a duplicate ISBN apart from other constraint failures, directly and through the HTTP service.
+"""
+
+import asyncio
+
+import pytest
+
+from book_management import DUPLICATE, INSERTED, SHARED, SPLIT, BookManagement
+from service import BookService, ServiceError
+from write_queue import close_all_write_queues
+
+
+@pytest.mark.parametrize("concurrency", [SHARED, SPLIT])
+def test_missing_title_is_invalid_rather_than_duplicate(migrated_db, concurrency):
+    book_manager = BookManagement(migrated_db, verbose=False, concurrency=concurrency)
+    try:
+        assert book_manager.add_book("Title", "Author", 2024, "9780131103627") == INSERTED
+        assert book_manager.add_book("Title", "Author", 2024, "9780131103627") == DUPLICATE
+        with pytest.raises(ValueError, match="NOT NULL constraint failed: Books.title"):
+            book_manager.add_book(None, "Author", 2024, "9780201633610")
+        assert book_manager.get_book("9780201633610") is None
+    finally:
+        close_all_write_queues()
+
+
+def test_service_answers_an_invalid_book_with_bad_request(migrated_db):
+    service = BookService(migrated_db, workers=1)
+    try:
+        token = service.auth.sessions.create("admin", "admin")
+        body = {"title": None, "author": "Author", "year": 2024, "isbn": "9780201633610"}
+        with pytest.raises(ServiceError) as raised:
+            asyncio.run(service.dispatch("POST", "/books", {}, body, token))
+        assert raised.value.status == 400
+    finally:
+        service.close()
+        close_all_write_queues()
@@ -0,0 +1,70 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Drives the interactive menu of book_management.py in a subprocess, so that every option runs against the module as a script.
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import REPO_ROOT
+
+
+def run_menu(db_name, choices):
+    """
+    Runs the book_management.py menu in the database's directory and feeds it the given input lines.
+
+    Args:
+        db_name (str): The path of the database file, named book_management.db.
+        choices (list): The lines typed at the prompts, ending with the Exit option.
+
+    Returns:
+        subprocess.CompletedProcess: The finished process with its captured output.
+    """
+    return subprocess.run(
+        [sys.executable, os.path.join(REPO_ROOT, "book_management.py")],
+        cwd=os.path.dirname(db_name),
+        input="\n".join(choices) + "\n",
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+
+def test_menu_runs_every_option(migrated_db):
+    conn = sqlite3.connect(migrated_db)
+    conn.execute("INSERT INTO Users (username, password, user_type) VALUES ('reader', 'unused', 'user')")
+    conn.commit()
+    conn.close()
+
+    result = run_menu(migrated_db, [
+        "1", "The C Programming Language", "Kernighan and Ritchie", "1988", "0-13-110362-8",
+        "3", "", "", "", "", "978-0-13-110362-7",
+        "4", "reader", "0131103628",
+        "6",
+        "2", "9780131103627",
+        "5", "reader", "978 0 13 110362 7",
+        "2", "9780131103627",
+        "7",
+    ])
+
+    assert result.returncode == 0, result.stderr
+    assert "Traceback" not in result.stderr
+    assert "Book 'The C Programming Language' added successfully!" in result.stdout
+    assert "ISBN: 9780131103627" in result.stdout
+    assert "reader has borrowed 'The C Programming Language'." in result.stdout
+    assert "User: reader, Book: The C Programming Language" in result.stdout
+    assert "Book with ISBN 9780131103627 still has copies on loan." in result.stdout
+    assert "reader has returned 'The C Programming Language'." in result.stdout
+    assert "Book with ISBN 9780131103627 deleted successfully." in result.stdout
+
+
+def test_menu_reports_missing_books(migrated_db):
+    result = run_menu(migrated_db, ["2", "9780131103627", "3", "", "", "", "", "0131103628", "7"])
+
+    assert result.returncode == 0, result.stderr
+    assert "No book found with ISBN 9780131103627." in result.stdout
+    assert "No books match your criteria." in result.stdout
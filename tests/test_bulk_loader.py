@@ -0,0 +1,79 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Tests for the bulk loader's choice between rebuilding and updating secondary indexes, and for skipping known users before hashing.
+"""
+
+import sqlite3
+
+import bulk_loader
+from bulk_loader import BulkLoader
+from synthetic_data import iter_books, iter_users, write_csv
+
+
+def load_books(db_name, books_file):
+    """
+    Loads a Books file and records the DROP INDEX statements the loader runs.
+
+    Args:
+        db_name (str): The path of the database file.
+        books_file (str): The path of the Books file.
+
+    Returns:
+        tuple: The LoadSummary of the Books file and the list of DROP INDEX statements.
+    """
+    conn = sqlite3.connect(db_name)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    summary = BulkLoader(conn).load(books_file=books_file)[0]
+    conn.close()
+    return summary, [statement for statement in statements if statement.startswith("DROP INDEX")]
+
+
+def test_indexes_are_rebuilt_for_a_load_into_an_empty_table(migrated_db, tmp_path):
+    books_file = str(tmp_path / "Books.txt")
+    write_csv(books_file, iter_books(200))
+
+    summary, drops = load_books(migrated_db, books_file)
+
+    assert summary.inserted == 200
+    assert drops
+
+
+def test_indexes_are_kept_for_a_small_load_into_a_large_table(migrated_db, tmp_path):
+    catalog_file = str(tmp_path / "Catalog.txt")
+    write_csv(catalog_file, iter_books(1000))
+    load_books(migrated_db, catalog_file)
+    books_file = str(tmp_path / "Books.txt")
+    write_csv(books_file, [("New Book", "New Author", 2024, "9780131103627")])
+
+    summary, drops = load_books(migrated_db, books_file)
+
+    assert summary.inserted == 1
+    assert drops == []
+    conn = sqlite3.connect(migrated_db)
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM Books WHERE author = 'New Author'").fetchall()
+    assert "idx_books_author" in plan[0][3]
+
+
+def test_only_new_users_are_hashed_on_a_reload(migrated_db, tmp_path, monkeypatch):
+    users_file = str(tmp_path / "Users.txt")
+    write_csv(users_file, iter_users(20))
+    conn = sqlite3.connect(migrated_db)
+    BulkLoader(conn, hash_iterations=1000).load(users_file=users_file)
+    hashed = []
+    real_hash = bulk_loader.hash_password
+
+    def counting_hash(password, iterations):
+        hashed.append(password)
+        return real_hash(password, iterations)
+
+    monkeypatch.setattr(bulk_loader, "hash_password", counting_hash)
+    write_csv(users_file, list(iter_users(21)) + list(iter_users(21))[-1:])
+
+    summary = BulkLoader(conn, hash_iterations=1000).load(users_file=users_file)[0]
+    conn.close()
+
+    assert (summary.inserted, summary.duplicates) == (1, 21)
+    assert len(hashed) == 1
@@ -0,0 +1,56 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Tests that incremental syncs keep books added outside the feed unless deletion is requested.
+"""
+
+import os
+
+from book_management import BookManagement
+from database import DatabaseSetup
+from synthetic_data import isbn13, iter_books, write_csv
+
+
+def setup(db_name, books_file, delete_missing=False):
+    """
+    Runs an incremental database setup from a books file and no users file.
+
+    Args:
+        db_name (str): The path of the database file.
+        books_file (str): The path of the books file.
+        delete_missing (bool): Whether books missing from the file are deleted.
+    """
+    users_file = os.path.join(os.path.dirname(db_name), "NoUsers.txt")
+    DatabaseSetup(db_name, users_file=users_file, books_file=books_file).setup_database(
+        incremental=True, delete_missing=delete_missing
+    )
+
+
+def test_books_added_through_the_app_survive_an_incremental_setup(migrated_db, tmp_path):
+    books_file = str(tmp_path / "Books.txt")
+    write_csv(books_file, iter_books(10))
+    setup(migrated_db, books_file)
+    book_manager = BookManagement(migrated_db, verbose=False, cache_size=0)
+    book_manager.add_book("Added In The App", "An Admin", 2024, isbn13(500))
+
+    write_csv(books_file, iter_books(11))
+    setup(migrated_db, books_file)
+
+    assert book_manager.get_book(isbn13(500)) is not None
+    assert book_manager.get_book(isbn13(10)) is not None
+
+
+def test_missing_books_are_deleted_only_on_request(migrated_db, tmp_path):
+    books_file = str(tmp_path / "Books.txt")
+    write_csv(books_file, iter_books(10))
+    setup(migrated_db, books_file)
+    book_manager = BookManagement(migrated_db, verbose=False, cache_size=0)
+    book_manager.add_book("Added In The App", "An Admin", 2024, isbn13(500))
+
+    write_csv(books_file, iter_books(9))
+    setup(migrated_db, books_file, delete_missing=True)
+
+    assert book_manager.get_book(isbn13(500)) is None
+    assert book_manager.get_book(isbn13(9)) is None
+    assert book_manager.get_book(isbn13(8)) is not None
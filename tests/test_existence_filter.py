@@ -0,0 +1,59 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Tests that rebuilding an existence filter keeps the values added while the table was being read.
+"""
+
+import sqlite3
+
+from existence_filter import ExistenceFilter
+
+
+class AddingConnection:
+    """
+    Stands in for a pooled connection, adding a value to the filter just after the rebuild starts reading values.
+    """
+
+    def __init__(self, conn, existence_filter, value):
+        """
+        Initializes the AddingConnection object.
+
+        Args:
+            conn (sqlite3.Connection): The real connection.
+            existence_filter (ExistenceFilter): The filter being rebuilt.
+            value (str): The value to add during the rebuild.
+        """
+        self.conn = conn
+        self.existence_filter = existence_filter
+        self.value = value
+
+    def execute(self, sql, *args):
+        """
+        Runs a statement, adding the value once the values query has started.
+
+        Args:
+            sql (str): The statement.
+            *args: The statement parameters.
+
+        Returns:
+            sqlite3.Cursor: The cursor of the statement.
+        """
+        cursor = self.conn.execute(sql, *args)
+        if sql.startswith("SELECT isbn "):
+            self.existence_filter.add([self.value])
+        return cursor
+
+
+def test_values_added_during_a_rebuild_are_kept(migrated_db):
+    conn = sqlite3.connect(migrated_db)
+    conn.execute("INSERT INTO Books (title, author, year, isbn) VALUES ('Old', 'Author', 2024, '9780131103627')")
+    conn.commit()
+    existence_filter = ExistenceFilter(migrated_db, "Books", "isbn")
+    existence_filter.connect_db = lambda: AddingConnection(conn, existence_filter, "9780201633610")
+
+    existence_filter.refresh()
+    conn.close()
+
+    assert existence_filter.might_contain("9780131103627")
+    assert existence_filter.might_contain("9780201633610")
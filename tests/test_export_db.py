@@ -0,0 +1,77 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Tests for exporting and printing tables stored with and without rowids.
+"""
+
+import csv
+import sqlite3
+
+from export_db import export_database, list_tables, row_order
+from print_db import print_db_contents
+
+
+def create_database(db_name):
+    """
+    Creates a database with a rowid table, a WITHOUT ROWID table and a full-text index.
+
+    Args:
+        db_name (str): The path of the database file.
+    """
+    conn = sqlite3.connect(db_name)
+    conn.executescript(
+        """
+        CREATE TABLE Notes (id INTEGER PRIMARY KEY, body TEXT);
+        CREATE VIRTUAL TABLE NotesFTS USING fts5(body, content='Notes', content_rowid='id');
+        CREATE TABLE Tallies (day TEXT, shelf INTEGER, count INTEGER, PRIMARY KEY (shelf, day)) WITHOUT ROWID;
+        CREATE TABLE Tags (name TEXT);
+        INSERT INTO Notes (id, body) VALUES (2, 'second'), (1, 'first');
+        INSERT INTO NotesFTS (NotesFTS) VALUES ('rebuild');
+        INSERT INTO Tallies VALUES ('2024-01-02', 1, 5), ('2024-01-01', 2, 7), ('2024-01-01', 1, 3);
+        INSERT INTO Tags VALUES ('fiction');
+        """
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_without_rowid_tables_are_read_in_primary_key_order(tmp_path):
+    db_name = str(tmp_path / "export.db")
+    create_database(db_name)
+    conn = sqlite3.connect(db_name)
+
+    assert row_order(conn, "Notes") == "ORDER BY rowid"
+    assert row_order(conn, "Tallies") == 'ORDER BY "shelf", "day"'
+    assert list_tables(conn) == ["Notes", "Tallies", "Tags"]
+    conn.close()
+
+
+def test_export_includes_without_rowid_tables(tmp_path):
+    db_name = str(tmp_path / "export.db")
+    create_database(db_name)
+
+    exported = export_database(db_name, str(tmp_path / "out"))
+
+    assert sorted(rows for rows in exported.values()) == [1, 2, 3]
+    with open(tmp_path / "out" / "Tallies.csv", newline="") as file:
+        assert list(csv.reader(file)) == [
+            ["day", "shelf", "count"],
+            ["2024-01-01", "1", "3"],
+            ["2024-01-02", "1", "5"],
+            ["2024-01-01", "2", "7"],
+        ]
+
+
+def test_print_db_skips_full_text_tables_and_prints_every_other_table(tmp_path, capsys):
+    db_name = str(tmp_path / "export.db")
+    create_database(db_name)
+
+    print_db_contents(db_name)
+
+    output = capsys.readouterr().out
+    assert "Error" not in output
+    assert "NotesFTS" not in output
+    for table in ("Notes", "Tallies", "Tags"):
+        assert f"Contents of table '{table}':" in output
+    assert "('fiction',)" in output
@@ -0,0 +1,92 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Exports a database migrated to the current schema, with loans recorded in the summary tables, end to end.
+"""
+
+import csv
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from book_management import BookManagement
+from conftest import REPO_ROOT
+from export_db import FORMATS, export_database, list_tables, read_binary
+from print_db import print_db_contents
+
+
+@pytest.fixture
+def library_db(migrated_db):
+    """
+    Fills a migrated database with a user, books and a borrowed and returned loan.
+
+    Args:
+        migrated_db (str): The path of an empty database with the current schema.
+
+    Returns:
+        str: The path of the database file.
+    """
+    conn = sqlite3.connect(migrated_db)
+    conn.execute("INSERT INTO Users (username, password, user_type) VALUES ('reader', 'unused', 'user')")
+    conn.commit()
+    conn.close()
+    book_manager = BookManagement(migrated_db, verbose=False)
+    book_manager.add_book("The C Programming Language", "Kernighan and Ritchie", 1988, "0131103628")
+    book_manager.add_book("Structure and Interpretation", "Abelson and Sussman", 1996, "0262510871")
+    book_manager.borrow_book("reader", "0131103628")
+    book_manager.return_book("reader", "0131103628")
+    book_manager.borrow_book("reader", "0262510871")
+    return migrated_db
+
+
+def test_command_line_export_covers_every_table(library_db, tmp_path):
+    out_dir = tmp_path / "exp"
+    result = subprocess.run(
+        [
+            sys.executable,
+            os.path.join(REPO_ROOT, "export_db.py"),
+            "--db", library_db,
+            "--out", str(out_dir),
+            "--quiet",
+        ],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+    assert result.returncode == 0, result.stderr
+    conn = sqlite3.connect(library_db)
+    tables = list_tables(conn)
+    conn.close()
+    assert "DailyLoanStats" in tables
+    assert sorted(os.listdir(out_dir)) == sorted(f"{table}.csv" for table in tables)
+    with open(out_dir / "DailyLoanStats.csv", newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["day", "borrows", "returns"]
+    assert [row[1:] for row in rows[1:]] == [["2", "1"]]
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_every_format_exports_the_summary_tables(library_db, tmp_path, fmt):
+    exported = export_database(
+        library_db, str(tmp_path / fmt), fmt=fmt, tables=["BookLoanStats", "DailyLoanStats"]
+    )
+
+    assert sorted(exported.values()) == [1, 2]
+    if fmt == "binary":
+        columns, rows = read_binary(str(tmp_path / fmt / "BookLoanStats.bms"))
+        assert columns[0] == "book_id"
+        assert len(list(rows)) == 2
+
+
+def test_print_db_prints_a_migrated_database(library_db, capsys):
+    print_db_contents(library_db)
+
+    output = capsys.readouterr().out
+    assert "Error" not in output
+    assert "Contents of table 'DailyLoanStats':" in output
+    assert "Contents of table 'OplogCheckpoint':" in output
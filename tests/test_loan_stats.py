@@ -0,0 +1,42 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Tests that the Loans triggers keep the loan summary tables equal to a rebuild from Loans.
+"""
+
+import sqlite3
+
+from migrations import rebuild_loan_stats
+
+SUMMARY_TABLES = ("BookLoanStats", "UserLoanStats", "DailyLoanStats")
+
+
+def summaries(conn):
+    """
+    Reads every loan summary table.
+
+    Args:
+        conn (sqlite3.Connection): A connection to the database.
+
+    Returns:
+        dict: The sorted rows of each summary table keyed by table name.
+    """
+    return {table: sorted(conn.execute(f"SELECT * FROM {table}").fetchall()) for table in SUMMARY_TABLES}
+
+
+def test_returned_loan_inserted_directly_is_summarized_like_a_rebuild(migrated_db):
+    conn = sqlite3.connect(migrated_db)
+    conn.execute("INSERT INTO Users (id, username, password, user_type) VALUES (1, 'reader', 'x', 'user')")
+    conn.execute("INSERT INTO Books (id, title, author, year, isbn) VALUES (1, 'Title', 'Author', 2024, '1')")
+    conn.execute(
+        "INSERT INTO Loans (user_id, book_id, borrowed_at, returned_at) "
+        "VALUES (1, 1, '2024-01-01 10:00:00', '2024-01-02 10:00:00')"
+    )
+    triggered = summaries(conn)
+
+    rebuild_loan_stats(conn.cursor())
+
+    assert triggered["DailyLoanStats"] == [("2024-01-01", 1, 0), ("2024-01-02", 0, 1)]
+    assert triggered == summaries(conn)
+    conn.close()
@@ -0,0 +1,151 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Tests for the interactive menus of main.py when a login session expires, and for malformed batch mode commands.
+"""
+
+import io
+import json
+import sqlite3
+import time
+
+import security
+from main import BatchRunner, BookManagementSystem
+from security import DEFAULT_SESSION_TTL, hash_password
+
+
+class LaterClock:
+    """
+    Stands in for the time module in security, reporting a moment after every session has expired.
+    """
+
+    @staticmethod
+    def time():
+        """
+        Returns the current time plus the session lifetime.
+
+        Returns:
+            float: Seconds since the epoch, one TTL and a minute from now.
+        """
+        return time.time() + DEFAULT_SESSION_TTL + 60
+
+
+def add_user(db_name, user_type):
+    """
+    Adds a user named "reader" with the password "secret".
+
+    Args:
+        db_name (str): The path of the database file.
+        user_type (str): "admin" or "user".
+    """
+    conn = sqlite3.connect(db_name)
+    conn.execute(
+        "INSERT INTO Users (username, password, user_type) VALUES (?, ?, ?)",
+        ("reader", hash_password("secret", 1000), user_type),
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_batch(db_name, commands):
+    """
+    Runs batch mode commands logged in as an admin named "reader".
+
+    Args:
+        db_name (str): The path of the database file.
+        commands (list): The commands to run after the login, as dictionaries.
+
+    Returns:
+        list: The decoded result lines of the commands, without the login's.
+    """
+    add_user(db_name, "admin")
+    login = {"op": "login", "username": "reader", "password": "secret"}
+    lines = [json.dumps(command) for command in [login] + commands]
+    output = io.StringIO()
+    BatchRunner(db_name).run(lines, output)
+    return [json.loads(line) for line in output.getvalue().splitlines()[1:]]
+
+
+def logged_in_system(db_name, user_type):
+    """
+    Creates a BookManagementSystem with a user of the given role logged in.
+
+    Args:
+        db_name (str): The path of the database file.
+        user_type (str): "admin" or "user".
+
+    Returns:
+        BookManagementSystem: The system, logged in as "reader".
+    """
+    add_user(db_name, user_type)
+    system = BookManagementSystem(db_name)
+    assert system.auth.login("reader", "secret")
+    system.is_logged_in = True
+    return system
+
+
+def test_expired_session_returns_to_the_login_menu(migrated_db, monkeypatch, capsys):
+    system = logged_in_system(migrated_db, "user")
+    monkeypatch.setattr(security, "time", LaterClock)
+
+    system.display_menu()
+
+    output = capsys.readouterr().out
+    assert "Your session has expired. Please log in again." in output
+    assert "Main Menu:" in output
+    assert not system.is_logged_in
+
+
+def test_expired_session_ignores_the_pending_choice(migrated_db, monkeypatch, capsys):
+    system = logged_in_system(migrated_db, "user")
+    system.display_menu()
+    monkeypatch.setattr(security, "time", LaterClock)
+    monkeypatch.setattr("builtins.input", lambda prompt="": "9780131103627")
+
+    system.handle_choice("2")
+
+    assert "Your session has expired. Please log in again." in capsys.readouterr().out
+    assert not system.is_logged_in
+    assert system.auth.current_user is None
+
+
+def test_malformed_batch_commands_fail_alone(migrated_db):
+    book = {"op": "add", "title": "Kept", "author": "An Author", "year": 2024, "isbn": "9780131103627"}
+    results = run_batch(migrated_db, [
+        {"op": "search", "order_by": 5},
+        {"op": "search", "limit": "abc"},
+        book,
+        dict(book, title=None, isbn="9780201633610"),
+        {"op": "search", "isbn": "9780131103627"},
+    ])
+
+    assert [result.get("error") for result in results] == [
+        "The order_by field must be a string.",
+        "The limit field must be an integer.",
+        None,
+        "The title field must be a string.",
+        None,
+    ]
+    assert results[2]["status"] == "inserted"
+    assert [found["title"] for found in results[4]["books"]] == ["Kept"]
+
+
+def test_failed_batch_is_retried_one_command_at_a_time(migrated_db):
+    conn = sqlite3.connect(migrated_db)
+    conn.execute(
+        "CREATE TRIGGER reject_book BEFORE INSERT ON Books WHEN new.title = 'Rejected' "
+        "BEGIN SELECT RAISE(ABORT, 'rejected by trigger'); END"
+    )
+    conn.commit()
+    conn.close()
+    book = {"op": "add", "author": "An Author", "year": 2024}
+
+    results = run_batch(migrated_db, [
+        dict(book, title="First", isbn="9780131103627"),
+        dict(book, title="Rejected", isbn="9780201633610"),
+        dict(book, title="Third", isbn="9780596007126"),
+    ])
+
+    assert [result.get("status") for result in results] == ["inserted", None, "inserted"]
+    assert results[1]["error"] == "rejected by trigger"
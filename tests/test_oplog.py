@@ -0,0 +1,79 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Tests that LOGGED writes are acknowledged once they are durable and applied in the background, directly and through the HTTP service, and that only one process opens a log.
+"""
+
+import asyncio
+import fcntl
+import sqlite3
+
+import pytest
+
+from book_management import ACCEPTED, LOGGED, BookManagement
+from oplog import OperationLog, close_all_operation_logs, read_records
+from service import BookService
+from synthetic_data import isbn13
+
+
+@pytest.fixture
+def logged_db(migrated_db):
+    """
+    Provides a migrated database and stops its operation log afterwards.
+
+    Args:
+        migrated_db (str): The path of the database file.
+
+    Yields:
+        str: The path of the database file.
+    """
+    yield migrated_db
+    close_all_operation_logs()
+
+
+def test_logged_write_is_acknowledged_before_it_is_applied(logged_db):
+    book_manager = BookManagement(logged_db, verbose=False, concurrency=LOGGED)
+    added = []
+    book_manager.add_listener(lambda status, book_isbns: added.extend(book_isbns))
+    assert book_manager.get_book(isbn13(1)) is None
+
+    # Hold the write lock so the applier cannot apply anything yet.
+    blocker = sqlite3.connect(logged_db, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        assert book_manager.add_book("Logged", "An Author", 2024, isbn13(1)) == ACCEPTED
+        records, _ = read_records(logged_db + "-oplog")
+        assert records[-1][1:] == ("insert_book", (("Logged", "An Author", 2024, isbn13(1)), 1))
+        assert not book_manager.wait_for_writes(timeout=0.1)
+        assert added == []
+    finally:
+        blocker.rollback()
+        blocker.close()
+
+    assert book_manager.wait_for_writes(timeout=5)
+    assert added == [isbn13(1)]
+    assert book_manager.get_book(isbn13(1))[4] == isbn13(1)
+
+
+def test_service_answers_logged_writes_with_accepted(logged_db):
+    service = BookService(logged_db, workers=2, concurrency=LOGGED)
+    try:
+        token = service.auth.sessions.create("admin", "admin")
+        status, body = asyncio.run(service.add_book(token, "Served", "An Author", 2024, isbn13(2)))
+        assert (status, body["status"]) == (202, ACCEPTED)
+        assert service.book_manager.wait_for_writes(timeout=5)
+        assert service.book_manager.get_book(isbn13(2)) is not None
+    finally:
+        service.close()
+
+
+def test_log_held_by_another_process_is_refused(logged_db):
+    # A second open file description conflicts with flock like another process would.
+    with open(logged_db + "-oplog", "ab") as other:
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        with pytest.raises(RuntimeError, match="in use by another process"):
+            OperationLog(logged_db)
+
+    log = OperationLog(logged_db)
+    log.close()
@@ -0,0 +1,47 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Query plan regression checks. Every search shape supported by search_books must be answered through an index on a synthetic catalog, never by a full scan of Books.
+"""
+
+import pytest
+
+from benchmark import FULL_SCAN, search_shapes
+from book_management import BookManagement
+from connection_pool import close_all_pools
+from database import DatabaseSetup
+from synthetic_data import generate_files, isbn13
+
+BOOK_COUNT = 2000
+SHAPES = sorted(search_shapes((0, "Placeholder Title", "Placeholder Author", 2000, isbn13(0))))
+
+
+@pytest.fixture(scope="module")
+def book_manager(tmp_path_factory):
+    """
+    Builds a small synthetic catalog shared by every plan check in this module.
+
+    Args:
+        tmp_path_factory (pytest.TempPathFactory): The factory for temporary directories.
+
+    Yields:
+        BookManagement: A book manager over the catalog.
+    """
+    work_dir = tmp_path_factory.mktemp("plans")
+    books_file = str(work_dir / "Books.txt")
+    users_file = str(work_dir / "Users.txt")
+    db_name = str(work_dir / "plans.db")
+    generate_files(books_file, users_file, BOOK_COUNT, 10)
+    DatabaseSetup(db_name, users_file=users_file, books_file=books_file, hash_iterations=1000).setup_database()
+    yield BookManagement(db_name, verbose=False)
+    close_all_pools()
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+def test_search_shape_uses_an_index(book_manager, shape):
+    book = book_manager.search_books(limit=1)[0]
+    plan = book_manager.explain_search(**search_shapes(book)[shape])
+
+    full_scans = [step for step in plan if FULL_SCAN.match(step)]
+    assert not full_scans, f"{shape} scans every book: {'; '.join(plan)}"
@@ -0,0 +1,233 @@
+"""
+Name: Pushwitha Krishnappa
+Course: CS-521
+Python3 Version: Python 3.9.6
+Description: Module for serializing writes to the Book Management System (BMS) database through one writer thread. Small writes queued by many threads are applied together as group commits, each in its own savepoint.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from connection_pool import get_pool
+
+DEFAULT_MAX_BATCH = 64
+# Seconds the writer waits for more work before committing a batch. With no delay a batch holds
+# whatever queued up while the previous one was committing, which costs single writers nothing.
+DEFAULT_MAX_DELAY = 0.0
+
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    Runs write operations on a single dedicated connection, committing queued operations together.
+
+    Each operation runs inside its own SAVEPOINT, so one that fails is rolled back on its own
+    and the rest of its batch still commits. Callers are only answered once their batch is
+    committed, so a successful result is always durable.
+    """
+
+    def __init__(
+        self,
+        db_name="book_management.db",
+        max_batch=DEFAULT_MAX_BATCH,
+        max_delay=DEFAULT_MAX_DELAY,
+    ):
+        """
+        Initializes the WriteQueue object and starts its writer thread.
+
+        Args:
+            db_name (str): The name of the SQLite database file.
+            max_batch (int): The maximum number of operations committed together.
+            max_delay (float): The number of seconds to wait for more operations before committing.
+        """
+        self.db_name = db_name
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pool = get_pool(db_name)
+        self.batches = 0
+        self.operations = 0
+        self.largest_batch = 0
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._startup_error = None
+        self._thread = threading.Thread(target=self._run, name="bms-writer", daemon=True)
+        self._thread.start()
+        # Opening the writer connection switches the file to WAL, which read-only connections need.
+        self._ready.wait()
+        if self._startup_error is not None:
+            raise self._startup_error
+
+    def submit(self, operation, *args):
+        """
+        Queues a write operation.
+
+        Args:
+            operation (callable): Called on the writer thread with a cursor followed by `args`.
+            *args: The arguments passed to the operation.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the operation's return value once committed.
+        """
+        if not self._thread.is_alive():
+            raise RuntimeError("The write queue is closed.")
+        future = Future()
+        self._queue.put((operation, args, future))
+        return future
+
+    def run(self, operation, *args):
+        """
+        Queues a write operation and waits for it to be committed.
+
+        Args:
+            operation (callable): Called on the writer thread with a cursor followed by `args`.
+            *args: The arguments passed to the operation.
+
+        Returns:
+            object: The operation's return value.
+        """
+        return self.submit(operation, *args).result()
+
+    def next_batch(self):
+        """
+        Waits for the next operation and gathers the ones queued right behind it.
+
+        Returns:
+            list: Up to max_batch (operation, args, future) items, or None when the queue is closing.
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def apply_batch(self, conn, batch):
+        """
+        Runs a batch of operations in one transaction and answers their callers.
+
+        Args:
+            conn (sqlite3.Connection): The writer thread's connection.
+            batch (list): The (operation, args, future) items to apply.
+        """
+        outcomes = []
+        cursor = conn.cursor()
+        try:
+            if conn.in_transaction:
+                conn.commit()
+            cursor.execute("BEGIN IMMEDIATE")
+            for operation, args, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                cursor.execute("SAVEPOINT operation")
+                try:
+                    outcomes.append((future, operation(cursor, *args), None))
+                except Exception as error:
+                    cursor.execute("ROLLBACK TO operation")
+                    outcomes.append((future, None, error))
+                cursor.execute("RELEASE operation")
+            conn.commit()
+        except BaseException as error:
+            if conn.in_transaction:
+                conn.rollback()
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            if not isinstance(error, Exception):
+                raise
+            return
+
+        self.batches += 1
+        self.operations += len(outcomes)
+        self.largest_batch = max(self.largest_batch, len(outcomes))
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _run(self):
+        """
+        The writer thread's loop.
+        """
+        try:
+            conn = self.pool.connection()
+        except Exception as error:
+            self._startup_error = error
+            return
+        finally:
+            self._ready.set()
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                return
+            self.apply_batch(conn, batch)
+
+    def stats(self):
+        """
+        Returns the group commit counters.
+
+        Returns:
+            dict: The number of batches and operations committed, the largest batch and the queue length.
+        """
+        return {
+            "batches": self.batches,
+            "operations": self.operations,
+            "largest_batch": self.largest_batch,
+            "queued": self._queue.qsize(),
+        }
+
+    def close(self):
+        """
+        Applies the operations already queued and stops the writer thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_write_queue(db_name="book_management.db"):
+    """
+    Returns the shared WriteQueue for a database file, starting it on first use.
+
+    Args:
+        db_name (str): The name of the SQLite database file.
+
+    Returns:
+        WriteQueue: The queue shared by every caller writing to the same database file.
+    """
+    key = os.path.abspath(db_name)
+    with _queues_lock:
+        write_queue = _queues.get(key)
+        if write_queue is None or not write_queue._thread.is_alive():
+            write_queue = WriteQueue(db_name)
+            _queues[key] = write_queue
+        return write_queue
+
+
+def close_all_write_queues():
+    """
+    Stops every shared write queue after applying the operations already queued.
+    """
+    with _queues_lock:
+        queues = list(_queues.values())
+        _queues.clear()
+    for write_queue in queues:
+        write_queue.close()